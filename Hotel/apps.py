@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class HotelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Hotel'
+
+    def ready(self):
+        # Sincroniza el índice de búsqueda de texto completo, genera las variantes de las imágenes y
+        # cuenta las referencias a los blobs
+        from . import search, images, blobs  # noqa: F401
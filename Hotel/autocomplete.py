@@ -0,0 +1,109 @@
+"""
+Índice de prefijos para autocompletar destinos (ciudades y estados) y nombres de hotel.
+
+El índice se construye con una sola consulta agregada y se guarda en la caché bajo una versión
+que cambia con cualquier edición de `Hotel`. Cada proceso conserva además la última versión ya
+deserializada, así que una petición normal solo lee el token de versión y hace una búsqueda binaria
+sobre las claves ordenadas.
+"""
+from bisect import bisect_left
+from itertools import islice
+from django.core.cache import cache
+from django.db.models import Count
+from .cache import AUTOCOMPLETE_VERSION_KEY, get_autocomplete_version
+from .models import Hotel
+import unicodedata
+
+# (versión, índice) ya deserializado en este proceso
+_memo = {"index": (None, None)}
+
+
+def normalize(text: str) -> str:
+    """
+    normalize("Mérida, Yucatán") == "merida, yucatan"\n
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).strip()
+
+
+def index_key(version: str) -> str:
+    return f"{AUTOCOMPLETE_VERSION_KEY}:{version}:index"
+
+
+def prefix_keys(suggestions: list, label) -> list:
+    """
+    Claves `(texto normalizado, posición)` ordenadas. Cada palabra de la etiqueta genera una clave,
+    así que "cabo" encuentra "San José del Cabo".
+    """
+    keys = []
+    for position, suggestion in enumerate(suggestions):
+        words = normalize(label(suggestion)).split()
+        keys.extend((" ".join(words[start:]), position) for start in range(len(words)))
+    keys.sort()
+    return keys
+
+
+def build_index() -> dict:
+    cities, states = [], {}
+    for row in Hotel.objects.values("city", "state").annotate(hotels=Count("id")).order_by():
+        cities.append({"type": "city", "city": row["city"], "state": row["state"], "hotels": row["hotels"]})
+        states[row["state"]] = states.get(row["state"], 0) + row["hotels"]
+
+    destinations = cities + [{"type": "state", "state": state, "hotels": hotels} for state, hotels in states.items()]
+    # Más hoteles primero: las posiciones ya dan el orden de las sugerencias
+    destinations.sort(key=lambda destination: (-destination["hotels"], destination.get("city") or destination["state"]))
+    hotels = [
+        {"type": "hotel", "id": str(pk), "name": name, "city": city, "state": state}
+        for pk, name, city, state in Hotel.objects.values_list("id", "name", "city", "state").order_by("name")
+    ]
+
+    return {
+        "destinations": destinations,
+        "destination_keys": prefix_keys(destinations, lambda destination: destination.get("city") or destination["state"]),
+        "hotels": hotels,
+        "hotel_keys": prefix_keys(hotels, lambda hotel: hotel["name"]),
+    }
+
+
+def get_index() -> dict:
+    version = get_autocomplete_version()
+    memo_version, index = _memo["index"]
+    if memo_version == version:
+        return index
+
+    index = cache.get(index_key(version))
+    if index is None:
+        index = build_index()
+        cache.set(index_key(version), index, timeout=None)
+
+    _memo["index"] = (version, index)
+    return index
+
+
+def matching_positions(keys: list, prefix: str, limit: int = None) -> list:
+    positions = set()
+    for key, position in islice(keys, bisect_left(keys, (prefix,)), None):
+        if not key.startswith(prefix) or (limit and len(positions) >= limit):
+            break
+        positions.add(position)
+    return sorted(positions)
+
+
+def suggest(query: str, limit: int = 8, names: bool = False) -> list:
+    """
+    suggestions = suggest("canc", limit=8, names=True)\n
+    Destinos cuyo nombre (o alguna de sus palabras) empieza con `query`, con más hoteles primero;
+    con `names` completa hasta `limit` con nombres de hotel.
+    """
+    prefix = normalize(query)
+    if not prefix:
+        return []
+
+    index = get_index()
+    # Hay pocos destinos: se recorren todas las coincidencias para ordenarlas por número de hoteles
+    suggestions = [index["destinations"][position] for position in matching_positions(index["destination_keys"], prefix)]
+    suggestions = suggestions[:limit]
+    if names and len(suggestions) < limit:
+        remaining = limit - len(suggestions)
+        suggestions += [index["hotels"][position] for position in matching_positions(index["hotel_keys"], prefix, remaining)]
+    return suggestions
@@ -0,0 +1,111 @@
+"""
+Conteo de referencias de los blobs de `Hotel.storage`.
+
+Cada `Hotel.image` e `Image.image` que apunta a un blob cuenta como una referencia. Los blobs que se
+quedan sin referencias no se borran al momento (otra subida del mismo contenido podría reutilizarlos
+en ese instante); `collect_media_blobs` los borra pasado `MEDIA_BLOB_GRACE_PERIOD`.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Hotel, Image, MediaBlob
+from .storage import BLOB_PREFIX, is_blob_name
+
+
+def acquire(name: str) -> None:
+    blob, created = MediaBlob.objects.get_or_create(name=name, defaults={"references": 1})
+    if not created:
+        MediaBlob.objects.filter(name=name).update(references=F("references") + 1, updated_at=timezone.now())
+
+
+def release(name: str) -> None:
+    MediaBlob.objects.filter(name=name, references__gt=0).update(references=F("references") - 1, updated_at=timezone.now())
+
+
+def loaded_image_name(instance):
+    """
+    Nombre de la imagen tal como se cargó, sin consultar la base de datos si el campo está diferido.
+    """
+    if "image" not in instance.__dict__:
+        return None
+    image = instance.__dict__["image"]
+    return image if isinstance(image, str) or image is None else image.name
+
+
+@receiver(post_init, sender=Hotel)
+@receiver(post_init, sender=Image)
+def remember_image(sender, instance, **kwargs):
+    instance._stored_image = loaded_image_name(instance)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_save, sender=Image)
+def count_image_reference(sender, instance, **kwargs):
+    name, previous = loaded_image_name(instance), instance._stored_image
+    # Un campo diferido no se guardó, así que no cambió
+    if name is None or name == previous:
+        return
+    if is_blob_name(name):
+        acquire(name)
+    if is_blob_name(previous):
+        release(previous)
+    instance._stored_image = name
+
+
+@receiver(post_delete, sender=Hotel)
+@receiver(post_delete, sender=Image)
+def release_image_reference(sender, instance, **kwargs):
+    name = loaded_image_name(instance)
+    if is_blob_name(name):
+        release(name)
+
+
+def collect_blobs(grace_period: timedelta = None, orphans: bool = False) -> dict:
+    """
+    {"blobs": 3, "files": 9} = collect_blobs()\n
+    Borra los blobs sin referencias desde hace más de `grace_period` junto con sus variantes. Con
+    `orphans` también borra los blobs que no tienen registro (subidas cuya transacción no se confirmó).
+    """
+    grace_period = settings.MEDIA_BLOB_GRACE_PERIOD if grace_period is None else grace_period
+    cutoff = timezone.now() - grace_period
+    names = list(MediaBlob.objects.filter(references=0, updated_at__lte=cutoff).values_list("name", flat=True))
+    if orphans:
+        names += [name for name in stored_blobs() if default_storage.get_modified_time(name) <= cutoff]
+
+    removed = files = 0
+    for name in names:
+        with transaction.atomic():
+            # Se vuelve a comprobar con la fila bloqueada: pudo recibir una referencia o reutilizarse
+            # (`storage.pin_blob`) mientras tanto. Una subida que llega después espera el bloqueo y,
+            # como el archivo ya no está, lo vuelve a escribir.
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and (blob.references or blob.updated_at > cutoff):
+                continue
+            for path in [name, *default_storage.variants(name)]:
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                    files += 1
+            if blob is not None:
+                blob.delete()
+        removed += 1
+    return {"blobs": removed, "files": files}
+
+
+def stored_blobs() -> list[str]:
+    """
+    Blobs guardados que no tienen registro en `MediaBlob`.
+    """
+    if not default_storage.exists(BLOB_PREFIX):
+        return []
+    names = []
+    for first in default_storage.listdir(BLOB_PREFIX)[0]:
+        for second in default_storage.listdir(f"{BLOB_PREFIX}/{first}")[0]:
+            directory = f"{BLOB_PREFIX}/{first}/{second}"
+            names += [f"{directory}/{filename}" for filename in default_storage.listdir(directory)[1]]
+    known = set(MediaBlob.objects.filter(name__in=names).values_list("name", flat=True))
+    return [name for name in names if name not in known]
@@ -0,0 +1,103 @@
+"""
+Caché de las representaciones serializadas de los hoteles.
+
+Cada hotel tiene una clave de versión (un token aleatorio) que cambia con cualquier edición del
+hotel o de sus filas relacionadas, y hay una versión global del catálogo para los modelos compartidos
+(servicios y categorías de imagen). La clave de la representación incluye ambas versiones, así que
+cambiar una versión invalida las representaciones viejas sin tener que buscarlas: simplemente dejan
+de leerse y el backend las desaloja por TTL o por tamaño.
+
+Para los GET condicionales también se guarda cuándo ocurrió el último cambio que no mueve ningún
+`updated_at` (borrados y ediciones del catálogo), ver `mark_changed`.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+import uuid
+
+CATALOG_VERSION_KEY = "hotels:catalog:version"
+AUTOCOMPLETE_VERSION_KEY = "hotels:autocomplete:version"
+
+
+def hotel_version_key(hotel_id) -> str:
+    return f"hotels:{hotel_id}:version"
+
+
+def bump_hotel_version(hotel_id) -> None:
+    cache.set(hotel_version_key(hotel_id), uuid.uuid4().hex, timeout=None)
+
+
+def bump_catalog_version() -> None:
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def bump_autocomplete_version() -> None:
+    cache.set(AUTOCOMPLETE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def get_autocomplete_version() -> str:
+    version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(AUTOCOMPLETE_VERSION_KEY, version, timeout=None)
+        version = cache.get(AUTOCOMPLETE_VERSION_KEY, version)
+    return version
+
+
+def get_versions(hotel_ids) -> tuple[str, dict]:
+    """
+    catalog_version, {hotel_id: version} = get_versions(hotel_ids)\n
+    Las versiones que no están en caché (nuevas o desalojadas) se crean con un token nuevo, lo que
+    nunca puede devolver una representación vieja.
+    """
+    keys = {hotel_version_key(hotel_id): hotel_id for hotel_id in hotel_ids}
+    stored = cache.get_many([CATALOG_VERSION_KEY, *keys])
+
+    missing = {key: uuid.uuid4().hex for key in [CATALOG_VERSION_KEY, *keys] if key not in stored}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        stored.update(missing)
+
+    return stored[CATALOG_VERSION_KEY], {hotel_id: stored[key] for key, hotel_id in keys.items()}
+
+
+def changed_at_key(name: str) -> str:
+    return f"hotels:changed:{name}"
+
+
+def mark_changed(name: str) -> None:
+    """
+    mark_changed("hotels")\n
+    Registra la hora de un cambio que no se ve en ningún `updated_at`: un borrado (`"hotels"`,
+    `"reservations"`) o una edición del catálogo (`"catalog"`).
+    """
+    cache.set(changed_at_key(name), timezone.now(), timeout=None)
+
+
+def get_changed_at(names) -> list:
+    """
+    [datetime] = get_changed_at(["hotels", "catalog"])\n
+    Si una marca no está en caché (nunca se escribió o se desalojó) se crea con la hora actual: a lo
+    más obliga a los clientes a descargar otra vez, nunca a quedarse con una respuesta vieja.
+    """
+    keys = [changed_at_key(name) for name in names]
+    stored = cache.get_many(keys)
+    missing = {key: timezone.now() for key in keys if key not in stored}
+    for key, value in missing.items():
+        cache.add(key, value, timeout=None)
+    if missing:
+        stored.update(cache.get_many(list(missing)))
+    return [stored.get(key, missing.get(key)) for key in keys]
+
+
+def payload_key(hotel_id, version: str, catalog_version: str, base_url: str) -> str:
+    # Las URLs de las imágenes son absolutas, así que la representación depende del host de la petición
+    return f"hotels:{hotel_id}:payload:{version}:{catalog_version}:{base_url}"
+
+
+def get_payloads(keys) -> dict:
+    return cache.get_many(keys)
+
+
+def set_payloads(payloads: dict) -> None:
+    cache.set_many(payloads, timeout=settings.HOTEL_CACHE_TIMEOUT)
@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Q
+from .models import LocationCoordinates
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Distancia en kilómetros sobre la esfera terrestre entre dos puntos (grados decimales).
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = math.radians(lat2 - lat1), math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_decimal(value: float) -> Decimal:
+    return Decimal(str(round(value, 6)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Q:
+    """
+    Filtro de `LocationCoordinates` para la caja que contiene el círculo de `radius_km` alrededor
+    del punto. Es un rango sobre el índice (latitude, longitude); cerca de los polos la caja abarca
+    todas las longitudes y si cruza el antimeridiano se parte en dos rangos.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    condition = Q(latitude__range=(to_decimal(max(min_lat, -90)), to_decimal(min(max_lat, 90))))
+
+    if min_lat <= -90 or max_lat >= 90:
+        return condition
+
+    delta_lng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(latitude)))
+    if delta_lng >= 180:
+        return condition
+
+    min_lng, max_lng = longitude - delta_lng, longitude + delta_lng
+    if min_lng < -180:
+        longitudes = Q(longitude__gte=to_decimal(min_lng + 360)) | Q(longitude__lte=to_decimal(max_lng))
+    elif max_lng > 180:
+        longitudes = Q(longitude__gte=to_decimal(min_lng)) | Q(longitude__lte=to_decimal(max_lng - 360))
+    else:
+        longitudes = Q(longitude__range=(to_decimal(min_lng), to_decimal(max_lng)))
+    return condition & longitudes
+
+
+def nearby_hotels(latitude: float, longitude: float, radius_km: float = None, limit: int = 20) -> list:
+    """
+    hotels = nearby_hotels(21.1619, -86.8515, radius_km=5, limit=20)\n
+    Devuelve los hoteles (con `distance_km`) ordenados por distancia. Sin `radius_km` busca los
+    `limit` más cercanos ampliando la caja desde `NEARBY_HOTELS_INITIAL_RADIUS_KM` hasta encontrar
+    suficientes candidatos, sin pasar de `NEARBY_HOTELS_MAX_RADIUS_KM` (en una zona sin hoteles no
+    se termina cargando toda la tabla). Solo se calcula la distancia exacta de los candidatos dentro de la caja.
+    """
+    max_radius = settings.NEARBY_HOTELS_MAX_RADIUS_KM
+    search_radius = radius_km or min(settings.NEARBY_HOTELS_INITIAL_RADIUS_KM, max_radius)
+    while True:
+        candidates = LocationCoordinates.objects.filter(
+            bounding_box(latitude, longitude, search_radius)
+        ).select_related("hotel")
+
+        hotels = []
+        for coordinates in candidates:
+            distance = haversine_km(latitude, longitude, float(coordinates.latitude), float(coordinates.longitude))
+            if distance <= search_radius:
+                coordinates.hotel.distance_km = round(distance, 3)
+                hotels.append(coordinates.hotel)
+
+        # Con `limit` hoteles dentro del círculo, cualquier hotel fuera de él está más lejos
+        if radius_km or len(hotels) >= limit or search_radius >= max_radius:
+            break
+        search_radius = min(search_radius * 4, max_radius)
+
+    hotels.sort(key=lambda hotel: hotel.distance_km)
+    return hotels[:limit]
@@ -0,0 +1,214 @@
+"""
+Variantes de las imágenes de hoteles.
+
+La petición solo valida la imagen (tamaño, formato y dimensiones leyendo la cabecera, sin
+decodificarla) y la guarda tal cual; con la misma transacción se encola la tarea
+`Hotel.generate_image_variants` (`Hotel.tasks`), que un worker de `manage.py run_tasks` ejecuta:
+genera las variantes de `IMAGE_VARIANTS` en WebP y JPEG junto al original (en `variants/`) y las
+registra en `image_variants`. Si el proceso se reinicia la tarea sigue en la cola.
+"""
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from PIL import Image as PillowImage, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from tasks.queue import enqueue
+from .cache import bump_hotel_version
+from .models import Hotel, Image
+import base64, binascii, hashlib, io, json, os, uuid
+
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+# Formatos que se aceptan al subir (`PIL.Image.format`)
+UPLOAD_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+
+def validate_image_size(image) -> None:
+    """
+    Rechaza archivos demasiado grandes, que no son imágenes de `UPLOAD_FORMATS` o con demasiados
+    píxeles leyendo solo la cabecera, antes de guardarlos.
+    """
+    if image is None:
+        return
+    if image.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(_("The image exceeds the maximum size of %(size)s MB.") % {
+            "size": settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+        })
+    image.seek(0)
+    try:
+        header = PillowImage.open(image)
+    except (UnidentifiedImageError, OSError):
+        raise ValidationError(_("Upload a valid image."))
+    finally:
+        image.seek(0)
+    if header.format not in UPLOAD_FORMATS:
+        raise ValidationError(_("Upload a valid image."))
+    width, height = header.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(_("The image dimensions are too large."))
+
+
+class UploadedImageField(serializers.FileField):
+    """
+    Imagen subida en multipart. A diferencia de `ImageField` no la decodifica completa con Pillow
+    para validarla: de eso se encarga `validate_image_size` leyendo la cabecera.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("validators", [validate_image_size])
+        super().__init__(**kwargs)
+
+
+class Base64UploadedImageField(UploadedImageField):
+    """
+    Imagen en base64 (también como data URL). Se rechaza por tamaño antes de decodificar nada y por
+    tipo con el primer bloque; solo entonces se decodifica, por bloques, a un archivo temporal.
+    """
+    # Caracteres base64 por bloque (múltiplo de 4)
+    chunk_size = 64 * 1024
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        encoded = data.partition(";base64,")[2] if data.startswith("data:") else data
+        # Sin espacios ni saltos de línea (base64 partido a 76 columnas, estilo MIME), para que los
+        # bloques queden alineados a 4 caracteres
+        encoded = "".join(encoded.split())
+        if len(encoded) * 3 // 4 > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise ValidationError(_("The image exceeds the maximum size of %(size)s MB.") % {
+                "size": settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+            })
+
+        chunks = (encoded[start:start + self.chunk_size] for start in range(0, len(encoded), self.chunk_size))
+        try:
+            head = base64.b64decode(next(chunks, ""), validate=True)
+        except binascii.Error:
+            raise ValidationError(_("Upload a valid image."))
+        try:
+            format = PillowImage.open(io.BytesIO(head)).format
+        except (UnidentifiedImageError, OSError):
+            raise ValidationError(_("Upload a valid image."))
+        if format not in UPLOAD_FORMATS:
+            raise ValidationError(_("Upload a valid image."))
+
+        upload = TemporaryUploadedFile(f"{uuid.uuid4().hex}.{UPLOAD_FORMATS[format]}", PillowImage.MIME[format], 0, None)
+        try:
+            upload.write(head)
+            for chunk in chunks:
+                upload.write(base64.b64decode(chunk, validate=True))
+        except binascii.Error:
+            upload.close()
+            raise ValidationError(_("Upload a valid image."))
+        upload.size = upload.tell()
+        upload.seek(0)
+        return super().to_internal_value(upload)
+
+
+def variant_spec(variant: str, extension: str) -> str:
+    """
+    Hash corto de lo que determina los bytes de una variante (tamaño, formato y opciones). Va en el
+    nombre, así que con otra configuración la variante tiene otro nombre y el anterior nunca cambia
+    de contenido (se sirve como inmutable, `Hotel.media`).
+    """
+    format, options = FORMATS[extension]
+    spec = json.dumps([list(settings.IMAGE_VARIANTS[variant]), format, options, PillowImage.__version__], sort_keys=True)
+    return hashlib.sha256(spec.encode()).hexdigest()[:10]
+
+
+def variant_name(name: str, variant: str, extension: str) -> str:
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, "variants", f"{stem}-{variant}-{variant_spec(variant, extension)}.{extension}")
+
+
+def render_variants(name: str) -> dict:
+    """
+    {"thumbnail": {"webp": "blobs/ab/cd/variants/abcd...-thumbnail-<spec>.webp", "jpeg": ...}, ...} = render_variants(name)\n
+    """
+    with default_storage.open(name, "rb") as source:
+        original = ImageOps.exif_transpose(PillowImage.open(source))
+        original.load()
+
+    variants = {}
+    for variant, size in settings.IMAGE_VARIANTS.items():
+        resized = original.copy()
+        resized.thumbnail(size, PillowImage.LANCZOS)
+        variants[variant] = {}
+        for extension, (format, options) in FORMATS.items():
+            path = variant_name(name, variant, extension)
+            # Mismo nombre, misma especificación: no se sobrescribe lo que ya se pudo haber servido
+            if not default_storage.exists(path):
+                image = resized.convert("RGB") if format == "JPEG" else resized
+                buffer = io.BytesIO()
+                image.save(buffer, format=format, **options)
+                path = default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants[variant][extension] = path
+    return variants
+
+
+def stored_variants(name: str) -> dict:
+    """
+    Variantes ya guardadas de un blob (`Hotel.storage`): el mismo contenido subido otra vez no se
+    vuelve a procesar. Vacío si falta alguna o si el almacenamiento no es direccionado por contenido.
+    """
+    if not getattr(default_storage, "content_addressed", False):
+        return {}
+    variants = {
+        variant: {extension: variant_name(name, variant, extension) for extension in FORMATS}
+        for variant in settings.IMAGE_VARIANTS
+    }
+    paths = [path for formats in variants.values() for path in formats.values()]
+    return variants if all(default_storage.exists(path) for path in paths) else {}
+
+
+def generate_variants(model, pk, name: str) -> bool:
+    """
+    Genera y registra las variantes de la imagen `name` de `model` (Hotel o Image). Si la imagen
+    cambió mientras se procesaba no se registra nada: la nueva imagen tiene su propia tarea.
+    """
+    if not default_storage.exists(name):
+        return False
+    instance = model.objects.filter(pk=pk, image=name).first()
+    if instance is None:
+        return False
+
+    variants = {"source": name, **(stored_variants(name) or render_variants(name))}
+    if not model.objects.filter(pk=pk, image=name).update(image_variants=variants):
+        return False
+
+    hotel_id = pk if model is Hotel else instance.hotel_id
+    Hotel.objects.filter(pk=hotel_id).update(updated_at=timezone.now())
+    bump_hotel_version(hotel_id)
+    return True
+
+
+def variants_outdated(instance) -> bool:
+    return bool(instance.image) and instance.image_variants.get("source") != instance.image.name
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_save, sender=Image)
+def schedule_variants(sender, instance, **kwargs):
+    # La tarea se guarda en la misma transacción que la imagen: si se revierte, tampoco queda la tarea
+    if variants_outdated(instance):
+        enqueue("Hotel.generate_image_variants", {
+            "model": sender._meta.label, "pk": str(instance.pk), "name": instance.image.name,
+        })
+
+
+def variant_urls(instance, request=None) -> dict:
+    """
+    URLs de las variantes de la imagen actual; vacío mientras no se han generado.
+    """
+    if variants_outdated(instance) or not instance.image_variants:
+        return {}
+    build = request.build_absolute_uri if request else (lambda url: url)
+    return {
+        variant: {extension: build(default_storage.url(path)) for extension, path in formats.items()}
+        for variant, formats in instance.image_variants.items() if variant != "source"
+    }
@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from Hotel.blobs import collect_blobs
+
+
+class Command(BaseCommand):
+    help = "Deletes content-addressed media blobs (and their variants) that have had no references for the grace period."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=float, default=None, help="Defaults to MEDIA_BLOB_GRACE_PERIOD.")
+        parser.add_argument("--orphans", action="store_true", help="Also delete stored blobs that have no MediaBlob row.")
+
+    def handle(self, *args, **options):
+        grace_period = timedelta(hours=options["grace_hours"]) if options["grace_hours"] is not None else None
+        result = collect_blobs(grace_period, orphans=options["orphans"])
+        self.stdout.write(self.style.SUCCESS(f"{result['blobs']} blobs collected, {result['files']} files deleted."))
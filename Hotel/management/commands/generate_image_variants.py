@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from Hotel.images import generate_variants, variants_outdated
+from Hotel.models import Hotel, Image
+
+
+class Command(BaseCommand):
+    help = "Generates the thumbnail/WebP variants of hotel images that do not have them yet (or all with --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenerate the variants of every image.")
+
+    def handle(self, *args, **options):
+        for model in (Hotel, Image):
+            generated = failed = 0
+            for instance in model.objects.only("pk", "image", "image_variants").iterator():
+                if not (options["all"] and instance.image) and not variants_outdated(instance):
+                    continue
+                try:
+                    generated += generate_variants(model, instance.pk, instance.image.name)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {instance.pk}: {error}")
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {generated} images processed, {failed} failed."))
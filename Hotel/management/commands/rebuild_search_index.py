@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from Hotel.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the hotel full-text search index from the hotels and their services."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{type(backend).__name__}: {indexed} hotels indexed."))
@@ -0,0 +1,59 @@
+"""
+Entrega de los archivos de `MEDIA_ROOT`.
+
+Los blobs (`Hotel.storage`) y sus variantes (cuyo nombre incluye el hash de su especificación,
+`Hotel.images.variant_spec`) nunca cambian de contenido, así que se entregan con
+`Cache-Control: immutable` y su nombre como ETag. Con `MEDIA_SENDFILE` Django solo responde las
+cabeceras y el servidor web envía el archivo (`X-Accel-Redirect` en nginx, `X-Sendfile` en
+Apache/lighttpd). Sin él los archivos solo se entregan con `DEBUG`: en producción no se
+transmiten desde los workers de Django.
+"""
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from urllib.parse import quote
+from .storage import is_blob_name
+import mimetypes, os, posixpath
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@require_safe
+def serve_media(request, path):
+    if not (settings.DEBUG or settings.MEDIA_SENDFILE):
+        raise Http404
+    name = posixpath.normpath(path).lstrip("/")
+    try:
+        full_path = default_storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    immutable = is_blob_name(name)
+    etag = quote_etag(os.path.splitext(posixpath.basename(name))[0]) if immutable else None
+    last_modified = os.stat(full_path).st_mtime
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is None:
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        if settings.MEDIA_SENDFILE == "x-accel-redirect":
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(name)
+        elif settings.MEDIA_SENDFILE == "x-sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = full_path
+        else:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+
+    response["Last-Modified"] = http_date(last_modified)
+    if etag:
+        response["ETag"] = etag
+    if immutable:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:49
+
+import Hotel.models
+import django.core.validators
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hotel',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre del hotel')),
+                ('image', models.ImageField(upload_to=Hotel.models.Hotel.path_to_images, verbose_name='Imagen')),
+                ('description', models.TextField(verbose_name='Descripción')),
+                ('phone', models.CharField(max_length=20, verbose_name='Teléfono')),
+                ('address', models.TextField(verbose_name='Dirección')),
+                ('city', models.CharField(max_length=50, verbose_name='Ciudad')),
+                ('state', models.CharField(max_length=50, verbose_name='Estado')),
+                ('rating', models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(5)], verbose_name='Calificación')),
+            ],
+            options={
+                'verbose_name': 'Hotel',
+                'verbose_name_plural': 'Hoteles',
+                'ordering': ['-rating', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Image',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('image', models.ImageField(upload_to=Hotel.models.Image.path_to_images, verbose_name='Imagen')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Descripción')),
+            ],
+            options={
+                'verbose_name': 'Imagen',
+                'verbose_name_plural': 'Imágenes',
+            },
+        ),
+        migrations.CreateModel(
+            name='LocationCoordinates',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, validators=[django.core.validators.MinValueValidator(Decimal('-90')), django.core.validators.MaxValueValidator(Decimal('90'))], verbose_name='Latitud')),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, validators=[django.core.validators.MinValueValidator(Decimal('-180')), django.core.validators.MaxValueValidator(Decimal('180'))], verbose_name='Longitud')),
+            ],
+            options={
+                'verbose_name': 'coordenadas de la ubicación',
+                'verbose_name_plural': 'coordenadas de las ubicaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomType',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type', models.CharField(max_length=50, verbose_name='Tipo de habitación')),
+                ('capacity', models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(20)], verbose_name='Capacidad de personas')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Precio por noche')),
+                ('rooms', models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(50)], verbose_name='Total de habitaciones')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Descripción')),
+            ],
+            options={
+                'verbose_name': 'Habitación',
+                'verbose_name_plural': 'Habitaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='ServicesHotel',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Precio')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Descripción')),
+            ],
+            options={
+                'verbose_name': 'Inclusión del servicio en el hotel',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('Hotel', '0001_initial'),
+        ('administrator', '0001_initial'),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='hotelier',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='hotels', to='authentication.hotelier'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='administrator.imagecategory', verbose_name='Categorías'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='hotel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='Hotel.hotel'),
+        ),
+        migrations.AddField(
+            model_name='locationcoordinates',
+            name='hotel',
+            field=models.OneToOneField(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='coordinates', to='Hotel.hotel'),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='hotel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_types', to='Hotel.hotel'),
+        ),
+        migrations.AddField(
+            model_name='serviceshotel',
+            name='hotel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='services', to='Hotel.hotel'),
+        ),
+        migrations.AddField(
+            model_name='serviceshotel',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='administrator.services'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='serviceshotel',
+            unique_together={('service', 'hotel')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0003_hotel_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='locationcoordinates',
+            index=models.Index(fields=['latitude', 'longitude'], name='hotel_coords_lat_lng_idx'),
+        ),
+    ]
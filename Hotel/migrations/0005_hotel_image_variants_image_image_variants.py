@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0004_locationcoordinates_hotel_coords_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes de la imagen'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0005_hotel_image_variants_image_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Nombre')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Referencias')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado el')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Actualizado el')),
+            ],
+            options={
+                'verbose_name': 'Archivo',
+                'verbose_name_plural': 'Archivos',
+            },
+        ),
+    ]
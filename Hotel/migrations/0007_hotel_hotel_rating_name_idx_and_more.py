@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0006_mediablob'),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-rating', 'name'], name='hotel_rating_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['hotelier', '-rating', 'name'], name='hotel_hotelier_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(django.db.models.functions.text.Upper('city'), django.db.models.functions.text.Upper('state'), name='hotel_city_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomtype',
+            index=models.Index(fields=['hotel', 'capacity', 'price'], name='room_type_hotel_capacity_idx'),
+        ),
+    ]
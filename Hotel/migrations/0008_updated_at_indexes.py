@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0007_hotel_hotel_rating_name_idx_and_more'),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['updated_at'], name='hotel_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['hotelier', 'updated_at'], name='hotel_hotelier_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+TABLE = "hotel_search_index"
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Crea el índice FTS5 de `Hotel.search.SQLiteFTS5SearchBackend` (las migraciones no conocen tablas
+    virtuales) y lo llena con los hoteles que ya existían, igual que `manage.py rebuild_search_index`.
+    En otras bases de datos no hace nada: ahí se usa `DatabaseSearchBackend`.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Hotel = apps.get_model("Hotel", "Hotel")
+    ServicesHotel = apps.get_model("Hotel", "ServicesHotel")
+
+    services = {}
+    for hotel_id, service in ServicesHotel.objects.values_list("hotel_id", "service__name").iterator():
+        services.setdefault(hotel_id, []).append(service)
+    documents = [
+        (hotel_id.hex, name, city, state, description, " ".join(services.get(hotel_id, [])))
+        for hotel_id, name, city, state, description in
+        Hotel.objects.values_list("id", "name", "city", "state", "description").iterator()
+    ]
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "hotel_id UNINDEXED, name, city, state, description, services, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.executemany(f"INSERT INTO {TABLE} VALUES (%s, %s, %s, %s, %s, %s)", documents)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0008_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
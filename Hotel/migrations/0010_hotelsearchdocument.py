@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0009_hotel_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelSearchDocument',
+            fields=[
+                ('hotel', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='Hotel.hotel')),
+                ('document', models.TextField(db_column='hotel_search_index')),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+                'db_table': 'hotel_search_index',
+                'managed': False,
+            },
+        ),
+    ]
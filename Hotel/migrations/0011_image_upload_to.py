@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0010_hotelsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hotel',
+            name='image',
+            field=models.ImageField(upload_to='', verbose_name='Imagen'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(upload_to='', verbose_name='Imagen'),
+        ),
+    ]
@@ -1,27 +1,79 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, Max, Value, FilteredRelation, Prefetch
+from django.db.models.functions import Coalesce, Upper
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext as _
 from authentication.models import Hotelier
 from administrator.models import Services, ImageCategory
+from .cache import bump_hotel_version, bump_catalog_version, bump_autocomplete_version, mark_changed
 from decimal import Decimal
+from functools import partial
 import uuid
 
 # Create your models here.
+class HotelQuerySet(models.QuerySet):
+
+    def with_related(self):
+        """
+        Carga de una vez las relaciones anidadas de `HotelSerializer` (coordenadas, servicios,
+        imágenes y tipos de habitación), de modo que serializar cualquier número de hoteles cueste
+        un número constante de consultas.
+        """
+        return self.select_related("coordinates").prefetch_related(
+            Prefetch("services", queryset=ServicesHotel.objects.select_related("service")),
+            Prefetch("images", queryset=Image.objects.select_related("category")),
+            "room_types",
+        )
+
+
+class HotelRelatedMixin:
+    """
+    Para los modelos que pertenecen a un hotel: recuerda el `hotel_id` con el que se cargó la fila
+    para que, si se mueve a otro hotel, los receptores de señales también refresquen el anterior.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_hotel_id = instance.__dict__.get("hotel_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Las señales ya vieron el hotel anterior; a partir de aquí la fila pertenece al nuevo
+        self._loaded_hotel_id = self.hotel_id
+
+    @property
+    def affected_hotel_ids(self) -> set:
+        """
+        El hotel actual y, si la fila se movió desde que se cargó, el anterior.
+        """
+        return {self.hotel_id, getattr(self, "_loaded_hotel_id", None)} - {None}
+
+
 class Hotel(models.Model):
 
     def path_to_images(instance, filename):
+        # Solo la usa la migración 0001; los nombres de los archivos los pone `Hotel.storage`
         return f"images/{instance.id}/{filename}"
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     hotelier = models.ForeignKey(Hotelier, on_delete=models.CASCADE, related_name="hotels", editable=False)
     name = models.CharField(max_length=100, verbose_name="Nombre del hotel")
-    image = models.ImageField(upload_to=path_to_images, verbose_name="Imagen", null=False, blank=False)
+    image = models.ImageField(verbose_name="Imagen", null=False, blank=False)
     description = models.TextField(verbose_name="Descripción")
     phone = models.CharField(max_length=20, verbose_name='Teléfono')
     address = models.TextField(verbose_name="Dirección")
     city = models.CharField(max_length=50, verbose_name="Ciudad")
     state = models.CharField(max_length=50, verbose_name="Estado")
     rating = models.PositiveSmallIntegerField(validators=[MaxValueValidator(5)], verbose_name="Calificación")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes de la imagen")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Actualizado el")
+
+    objects = HotelQuerySet.as_manager()
 
     def check_room_availability(self, checkin: str, checkout: str) -> dict[list[dict]]:
         """
@@ -30,20 +82,32 @@ class Hotel(models.Model):
         Devuelve una lista de habitaciones disponibles en el rango de fechas indicado por los parámetros.
         Si no hay habitación disponible para alguna fecha devuelve una lista vacía.
         """
-        rts = self.room_types.all()
-        room_availability = [rt.get_rooms_available(checkin, checkout) for rt in rts]
+        rts = self.room_types.with_rooms_available(checkin, checkout)
+        room_availability = [
+            {"id": str(rt.id), "rooms_available": rt.rooms_available, "type": rt.type} for rt in rts
+        ]
         return {"id": str(self.id), "name": self.name, "room_types": room_availability}
 
     class Meta:
         verbose_name = "Hotel"
         verbose_name_plural = "Hoteles"
         ordering = ["-rating", "name"]
+        indexes = [
+            # Orden por omisión de los listados paginados
+            models.Index(fields=["-rating", "name"], name="hotel_rating_name_idx"),
+            models.Index(fields=["hotelier", "-rating", "name"], name="hotel_hotelier_rating_idx"),
+            # Búsqueda por destino (`city__iexact`/`state__iexact` compara con UPPER en PostgreSQL)
+            models.Index(Upper("city"), Upper("state"), name="hotel_city_state_idx"),
+            # Última modificación para los GET condicionales de hotels/ y all_hotels/
+            models.Index(fields=["updated_at"], name="hotel_updated_idx"),
+            models.Index(fields=["hotelier", "updated_at"], name="hotel_hotelier_updated_idx"),
+        ]
 
     def  __str__(self):
         return str(self.name)
 
 
-class LocationCoordinates(models.Model):
+class LocationCoordinates(HotelRelatedMixin, models.Model):
     hotel = models.OneToOneField(Hotel, on_delete=models.CASCADE, related_name="coordinates", editable=False)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, validators=[MinValueValidator(Decimal("-90")), MaxValueValidator(Decimal("90"))], verbose_name="Latitud")
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, validators=[MinValueValidator(Decimal("-180")), MaxValueValidator(Decimal("180"))], verbose_name="Longitud")
@@ -51,12 +115,35 @@ class LocationCoordinates(models.Model):
     class Meta:
         verbose_name = "coordenadas de la ubicación"
         verbose_name_plural = "coordenadas de las ubicaciones"
+        indexes = [
+            # Prefiltro por caja de `Hotel.geo.nearby_hotels`
+            models.Index(fields=["latitude", "longitude"], name="hotel_coords_lat_lng_idx"),
+        ]
 
     def __str__(self):
         return f'{self.latitude}, {self.longitude}'
 
 
-class RoomType(models.Model):
+class RoomTypeQuerySet(models.QuerySet):
+
+    def with_rooms_available(self, checkin, checkout):
+        """
+        Anota cada tipo de habitación con `booked_rooms` y `rooms_available` para el rango [checkin, checkout).
+
+        Se lee del inventario por noche (`payments.RoomNightInventory`): las habitaciones ocupadas
+        de la estancia son el máximo de las noches del rango, por lo que el costo no depende del
+        historial de reservas.
+        """
+        stay_nights = FilteredRelation(
+            "night_inventory",
+            condition=Q(night_inventory__night__gte=checkin, night_inventory__night__lt=checkout),
+        )
+        return self.annotate(stay_nights=stay_nights).annotate(
+            booked_rooms=Coalesce(Max("stay_nights__booked"), Value(0)),
+        ).annotate(rooms_available=models.F("rooms") - models.F("booked_rooms"))
+
+
+class RoomType(HotelRelatedMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     hotel = models.ForeignKey(
         Hotel, on_delete=models.CASCADE, related_name="room_types", editable=True
@@ -75,32 +162,29 @@ class RoomType(models.Model):
     )
     description = models.TextField(null=True, blank=True, verbose_name="Descripción")
 
+    objects = RoomTypeQuerySet.as_manager()
+
     def get_rooms_available(self, checkin: str, checkout: str) -> dict:
         """
         Devuelve el número total de habitaciones disponibles en una fecha determinada.
         El formato de entrada es un string con la forma 'YYYY-MM-DD'.
         """
-        room_reservations = self.room_reservations.all()
-        reservations = 0
-
-        for room_reservation in room_reservations:
-            reservation = room_reservation.customer_reservation
-            if reservation.status == "RE":
-                if (reservation.checkin <= checkin and reservation.checkout > checkin) or (reservation.checkin < checkout and reservation.checkout > checkout):
-                    # Si hay alguna reserva activa (en curso) en las fechas dadas, se suma a las reservas totales
-                    reservations += 1
-
-        return {"id": str(self.id), "rooms_available": self.rooms - reservations, "type": self.type}
+        room_type = RoomType.objects.with_rooms_available(checkin, checkout).get(pk=self.pk)
+        return {"id": str(self.id), "rooms_available": room_type.rooms_available, "type": self.type}
 
     class Meta:
         verbose_name = "Habitación"
         verbose_name_plural = "Habitaciones"
+        indexes = [
+            # Tipos de habitación del hotel que caben al grupo, del más barato al más caro (hotel_search/)
+            models.Index(fields=["hotel", "capacity", "price"], name="room_type_hotel_capacity_idx"),
+        ]
 
     def __str__(self):
         return str(self.type)
 
 
-class ServicesHotel(models.Model):
+class ServicesHotel(HotelRelatedMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     service = models.ForeignKey(Services, on_delete=models.PROTECT, editable=True)
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='services', editable=True)
@@ -115,17 +199,84 @@ class ServicesHotel(models.Model):
         return f'{self.service} | {self.hotel}'
 
 
-class Image(models.Model):
+class Image(HotelRelatedMixin, models.Model):
 
     def path_to_images(instance, filename):
+        # Solo la usa la migración 0001; los nombres de los archivos los pone `Hotel.storage`
         return f"images/{instance.hotel.id}/{filename}"
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     category = models.ForeignKey(ImageCategory, on_delete=models.PROTECT, verbose_name="Categorías")
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to=path_to_images, verbose_name="Imagen")
+    image = models.ImageField(verbose_name="Imagen")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes de la imagen")
     description = models.TextField(verbose_name="Descripción", null=True, blank=True)
 
     class Meta:
         verbose_name = "Imagen"
         verbose_name_plural = "Imágenes"
+
+
+class MediaBlob(models.Model):
+    """
+    Archivo guardado por contenido (`Hotel.storage`) y cuántos registros lo usan.
+    """
+    name = models.CharField(max_length=100, primary_key=True, verbose_name="Nombre")
+    references = models.PositiveIntegerField(default=0, verbose_name="Referencias")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado el")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = "Archivo"
+        verbose_name_plural = "Archivos"
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class HotelSearchDocument(models.Model):
+    """
+    Fila del índice FTS5 de `Hotel.search.SQLiteFTS5SearchBackend`, solo para unirla a `Hotel` en las
+    consultas. La tabla virtual la crea la migración `0009_hotel_search_index`, no Django.
+    """
+    hotel = models.OneToOneField(
+        Hotel, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="search_document",
+    )
+    # Columna oculta con el nombre de la tabla: `search_document__document=query` es un MATCH de FTS5
+    document = models.TextField(db_column="hotel_search_index")
+
+    class Meta:
+        managed = False
+        db_table = "hotel_search_index"
+        verbose_name = "Documento de búsqueda"
+        verbose_name_plural = "Documentos de búsqueda"
+
+
+@receiver([post_save, post_delete], sender=Hotel)
+def invalidate_hotel_cache(sender, instance, **kwargs):
+    hotel_id = instance.pk
+    transaction.on_commit(lambda: bump_hotel_version(hotel_id))
+    transaction.on_commit(bump_autocomplete_version)
+
+
+@receiver(post_delete, sender=Hotel)
+def mark_hotel_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(mark_changed, "hotels"))
+
+
+@receiver([post_save, post_delete], sender=LocationCoordinates)
+@receiver([post_save, post_delete], sender=RoomType)
+@receiver([post_save, post_delete], sender=ServicesHotel)
+@receiver([post_save, post_delete], sender=Image)
+def invalidate_hotel_cache_from_related(sender, instance, **kwargs):
+    hotel_ids = instance.affected_hotel_ids
+    Hotel.objects.filter(pk__in=hotel_ids).update(updated_at=timezone.now())
+    for hotel_id in hotel_ids:
+        transaction.on_commit(partial(bump_hotel_version, hotel_id))
+
+
+@receiver([post_save, post_delete], sender=Services)
+@receiver([post_save, post_delete], sender=ImageCategory)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+    transaction.on_commit(partial(mark_changed, "catalog"))
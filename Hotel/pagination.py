@@ -0,0 +1,130 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import json
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre un orden total `ordering`.
+
+    El cursor guarda los valores del orden de la última (o primera) fila entregada y la siguiente
+    página se pide con `WHERE (campos) > (valores) ORDER BY ... LIMIT n`, que el índice resuelve
+    sin recorrer las páginas anteriores: una página profunda cuesta lo mismo que la primera.
+    El último campo de `ordering` debe ser único para que el orden sea total.
+    """
+    ordering = ("-rating", "name", "id")
+    page_size = 9
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = _("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.has_cursor = bool(request.query_params.get(self.cursor_query_param))
+        position, self.reverse = self.decode_cursor(request)
+
+        ordering = [self.invert(field) for field in self.ordering] if self.reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position, ordering))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        has_next = self.has_cursor if self.reverse else self.has_more
+        if not self.page or not has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        has_previous = self.has_more if self.reverse else self.has_cursor
+        if not self.page or not has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def invert(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def after(position: list, ordering: list) -> Q:
+        """
+        (a, b, c) > (x, y, z) => a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        con `<` en los campos descendentes.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, instance, reverse: bool) -> str:
+        position = [getattr(instance, field.lstrip("-")) for field in self.ordering]
+        cursor = urlsafe_b64encode(json.dumps({"p": position, "r": reverse}, default=str).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request) -> tuple:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor["p"], bool(cursor["r"])
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class HotelSearchPagination(PageNumberPagination):
+    """
+    Páginas de `hotel_search/`, con su propio tamaño en lugar del global de `PageNumberPagination`.
+    """
+    page_size = 9
@@ -0,0 +1,196 @@
+"""
+Búsqueda de texto completo de hoteles.
+
+El backend se elige con `HOTEL_SEARCH_BACKEND`, o según la base de datos si no está definido.
+`SQLiteFTS5SearchBackend` mantiene un índice FTS5 (nombre, ciudad, estado, descripción y nombres de
+servicios) con ranking bm25 y búsqueda por prefijo; `DatabaseSearchBackend` es el filtro `icontains`
+de siempre, para bases de datos sin FTS5. Otro motor tiene que implementar los métodos abstractos de
+`BaseSearchBackend`.
+
+La tabla FTS5 la crea y la llena la migración `Hotel.0009_hotel_search_index`; en las peticiones
+solo se lee y se escribe en ella. La búsqueda une el índice (`HotelSearchDocument`) al queryset de la
+vista, así que el MATCH ya ve el alcance de la vista (p. ej. los hoteles de un hotelero) y la paginación
+cuenta todos los resultados.
+"""
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from administrator.models import Services
+from .models import Hotel, ServicesHotel
+import re, uuid
+
+# Backend por `connection.vendor` cuando `HOTEL_SEARCH_BACKEND` no está definido
+DEFAULT_BACKENDS = {"sqlite": "Hotel.search.SQLiteFTS5SearchBackend"}
+
+
+def split_terms(terms: str) -> list[str]:
+    return re.findall(r"\w+", terms or "")
+
+
+class BaseSearchBackend(ABC):
+
+    @abstractmethod
+    def filter_queryset(self, queryset, terms: str):
+        """
+        `queryset` reducido a los hoteles que coinciden con `terms`, del más al menos relevante.
+        """
+
+    @abstractmethod
+    def index_hotels(self, hotel_ids) -> None:
+        pass
+
+    @abstractmethod
+    def remove_hotels(self, hotel_ids) -> None:
+        pass
+
+    @abstractmethod
+    def rebuild(self, batch_size: int = 500) -> int:
+        """
+        Vuelve a indexar todos los hoteles; devuelve cuántos se indexaron.
+        """
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Filtra directamente las tablas, así que no mantiene ningún índice.
+    """
+    fields = ("name", "city", "state", "description", "services__service__name")
+
+    def filter_queryset(self, queryset, terms: str):
+        for term in split_terms(terms):
+            queryset = queryset.filter(
+                pk__in=Hotel.objects.filter(
+                    Q(*[Q(**{f"{field}__icontains": term}) for field in self.fields], _connector=Q.OR)
+                ).values("pk")
+            )
+        return queryset
+
+    def index_hotels(self, hotel_ids) -> None:
+        pass
+
+    def remove_hotels(self, hotel_ids) -> None:
+        pass
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        return 0
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    table = "hotel_search_index"
+    # Pesos bm25 por columna: hotel_id, name, city, state, description, services
+    weights = (0.0, 10.0, 5.0, 5.0, 1.0, 2.0)
+
+    def __init__(self):
+        if connection.vendor != "sqlite":
+            raise ImproperlyConfigured(
+                f"SQLiteFTS5SearchBackend needs SQLite, the database is {connection.vendor}; "
+                "set HOTEL_SEARCH_BACKEND to Hotel.search.DatabaseSearchBackend."
+            )
+
+    @staticmethod
+    def build_query(terms: str) -> str:
+        # Cada palabra como prefijo entre comillas (sin operadores FTS5 del usuario); todas deben aparecer
+        return " ".join(f'"{term}"*' for term in split_terms(terms))
+
+    def filter_queryset(self, queryset, terms: str):
+        query = self.build_query(terms)
+        if not query:
+            return queryset
+        # INNER JOIN con el índice: SQLite recorre el MATCH y busca cada hotel por pk dentro del queryset
+        ranking = RawSQL(f"bm25({self.table}, {', '.join(map(str, self.weights))})", [])
+        return queryset.filter(search_document__document=query).order_by(ranking.asc())
+
+    def documents(self, hotel_ids) -> list[tuple]:
+        services = {}
+        for hotel_id, service in ServicesHotel.objects.filter(hotel_id__in=hotel_ids).values_list("hotel_id", "service__name"):
+            services.setdefault(hotel_id, []).append(service)
+        hotels = Hotel.objects.filter(pk__in=hotel_ids).values_list("id", "name", "city", "state", "description")
+        return [
+            (hotel_id.hex, name, city, state, description, " ".join(services.get(hotel_id, [])))
+            for hotel_id, name, city, state, description in hotels
+        ]
+
+    def index_hotels(self, hotel_ids) -> None:
+        hotel_ids = list(hotel_ids)
+        documents = self.documents(hotel_ids)
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.delete_rows(cursor, hotel_ids)
+            cursor.executemany(f"INSERT INTO {self.table} VALUES (%s, %s, %s, %s, %s, %s)", documents)
+
+    def remove_hotels(self, hotel_ids) -> None:
+        with connection.cursor() as cursor:
+            self.delete_rows(cursor, list(hotel_ids))
+
+    def delete_rows(self, cursor, hotel_ids) -> None:
+        if hotel_ids:
+            placeholders = ", ".join(["%s"] * len(hotel_ids))
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE hotel_id IN ({placeholders})",
+                [uuid.UUID(str(hotel_id)).hex for hotel_id in hotel_ids],
+            )
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        # En una transacción para que las búsquedas no vean el índice a medio llenar
+        indexed = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table}")
+            hotel_ids = list(Hotel.objects.order_by("pk").values_list("pk", flat=True))
+            for start in range(0, len(hotel_ids), batch_size):
+                batch = hotel_ids[start:start + batch_size]
+                with connection.cursor() as cursor:
+                    cursor.executemany(f"INSERT INTO {self.table} VALUES (%s, %s, %s, %s, %s, %s)", self.documents(batch))
+                indexed += len(batch)
+        return indexed
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> BaseSearchBackend:
+    path = settings.HOTEL_SEARCH_BACKEND or DEFAULT_BACKENDS.get(connection.vendor, "Hotel.search.DatabaseSearchBackend")
+    return import_string(path)()
+
+
+class FullTextSearchFilter(filters.BaseFilterBackend):
+    """
+    `?search=` sobre el backend de búsqueda configurado; los resultados quedan ordenados por relevancia.
+    """
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, "")
+        if not terms.strip():
+            return queryset
+        return get_search_backend().filter_queryset(queryset, terms)
+
+
+@receiver(post_save, sender=Hotel)
+def index_hotel(sender, instance, **kwargs):
+    hotel_id = instance.pk
+    transaction.on_commit(lambda: get_search_backend().index_hotels([hotel_id]))
+
+
+@receiver(post_delete, sender=Hotel)
+def remove_hotel(sender, instance, **kwargs):
+    hotel_id = instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove_hotels([hotel_id]))
+
+
+@receiver([post_save, post_delete], sender=ServicesHotel)
+def index_hotel_services(sender, instance, **kwargs):
+    hotel_ids = list(instance.affected_hotel_ids)
+    transaction.on_commit(lambda: get_search_backend().index_hotels(hotel_ids))
+
+
+@receiver(post_save, sender=Services)
+def index_service_hotels(sender, instance, **kwargs):
+    hotel_ids = list(ServicesHotel.objects.filter(service=instance).values_list("hotel_id", flat=True).distinct())
+    if hotel_ids:
+        transaction.on_commit(lambda: get_search_backend().index_hotels(hotel_ids))
@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from django.utils.translation import gettext as _
 from administrator.serializers import ServicesSerializer, ImageCategorySerializer
-from drf_extra_fields.fields import Base64ImageField
 from .models import *
+from .images import UploadedImageField, Base64UploadedImageField, variant_urls
+
+
+class ImageVariantsMixin(serializers.Serializer):
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, obj) -> dict:
+        return variant_urls(obj, self.context.get("request"))
 
 
 class ServicesHotelSerializer(serializers.ModelSerializer):
@@ -11,14 +19,18 @@ class ServicesHotelSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ImageSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(required=True)
+class ImageSerializer(ImageVariantsMixin, serializers.ModelSerializer):
+    image = Base64UploadedImageField(required=True)
 
     class Meta:
         model = Image
         fields = "__all__"
 
 
+class ImageUploadSerializer(ImageSerializer):
+    image = UploadedImageField(required=True)
+
+
 class RoomTypeSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -33,8 +45,8 @@ class CoordinateSerializer(serializers.ModelSerializer):
         fields = ('latitude', 'longitude')
 
 
-class HotelSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(required=True)
+class HotelSerializer(ImageVariantsMixin, serializers.ModelSerializer):
+    image = Base64UploadedImageField(required=True)
 
     class Meta:
         model = Hotel
@@ -43,6 +55,7 @@ class HotelSerializer(serializers.ModelSerializer):
             'hotelier',
             'name',
             'image',
+            'image_variants',
             'description',
             'phone',
             'address',
@@ -62,12 +75,12 @@ class HotelSerializer(serializers.ModelSerializer):
             model = ServicesHotel
             fields = ('id', 'price', 'description', 'service')
 
-    class NestedImageSerializer(serializers.ModelSerializer):
+    class NestedImageSerializer(ImageVariantsMixin, serializers.ModelSerializer):
         category = ImageCategorySerializer(read_only=True)
 
         class Meta:
             model = Image
-            fields = ('id', 'image', 'description', 'category')
+            fields = ('id', 'image', 'image_variants', 'description', 'category')
 
     coordinates = CoordinateSerializer()
     services = NestedServicesHotelSerializer(read_only=True, many=True)
@@ -102,3 +115,56 @@ class HotelSerializer(serializers.ModelSerializer):
 
     def partial_update(self, instance, validated_data):
         self.update(instance, validated_data)
+
+
+class HotelImageUploadSerializer(ImageVariantsMixin, serializers.ModelSerializer):
+    image = UploadedImageField(required=True)
+
+    class Meta:
+        model = Hotel
+        fields = ('id', 'image', 'image_variants')
+
+
+class HotelSearchParamsSerializer(serializers.Serializer):
+    city = serializers.CharField(required=False)
+    state = serializers.CharField(required=False)
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1, max_value=20, default=1)
+
+    def validate(self, attrs):
+        if not attrs.get("city") and not attrs.get("state"):
+            raise serializers.ValidationError(_("At least one of `city` or `state` is required."))
+        if attrs["date_from"] >= attrs["date_to"]:
+            raise serializers.ValidationError(_("`date_from` must be before `date_to`."))
+        return attrs
+
+
+class HotelSearchSerializer(serializers.ModelSerializer):
+    min_price = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Hotel
+        fields = ('id', 'name', 'image', 'city', 'state', 'rating', 'min_price')
+
+
+class NearbyHotelsParamsSerializer(serializers.Serializer):
+    lat = serializers.DecimalField(max_digits=9, decimal_places=6, min_value=Decimal("-90"), max_value=Decimal("90"))
+    lng = serializers.DecimalField(max_digits=9, decimal_places=6, min_value=Decimal("-180"), max_value=Decimal("180"))
+    radius = serializers.FloatField(min_value=0.1, max_value=500, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class AutocompleteParamsSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    names = serializers.BooleanField(default=False)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=8)
+
+
+class NearbyHotelSerializer(serializers.ModelSerializer):
+    coordinates = CoordinateSerializer(read_only=True)
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Hotel
+        fields = ('id', 'name', 'image', 'city', 'state', 'rating', 'coordinates', 'distance_km')
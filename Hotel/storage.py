@@ -0,0 +1,95 @@
+"""
+Almacenamiento de archivos direccionado por contenido.
+
+Cada archivo se guarda como `blobs/<aa>/<bb>/<sha256><ext>`, sin importar el nombre con el que se
+subió: un archivo idéntico ya guardado no se vuelve a escribir y ambos registros apuntan al mismo
+blob. Como el contenido de un nombre nunca cambia, sus URLs se pueden cachear para siempre. Los
+archivos derivados de un blob (sus variantes) conservan el nombre que se les pide.
+
+Antes de reutilizar un blob se toca su fila de `MediaBlob` (que queda bloqueada hasta el final de
+la transacción) y se vuelve a comprobar que el archivo existe, así `collect_media_blobs` no lo
+puede borrar entre que se encuentra y se cuenta la referencia (`Hotel.blobs`).
+"""
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+import hashlib, os, re
+
+BLOB_PREFIX = "blobs"
+BLOB_NAME = re.compile(rf"^{BLOB_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(variants/)?(?P<digest>[0-9a-f]{{64}})(-[\w-]+)?\.\w+$")
+EXTENSIONS = {".jpeg": ".jpg"}
+
+
+class BlobExists(Exception):
+    pass
+
+
+def is_blob_name(name) -> bool:
+    return bool(name) and BLOB_NAME.match(name) is not None
+
+
+def blob_digest(name: str) -> str:
+    return BLOB_NAME.match(name)["digest"]
+
+
+def is_variant_name(name: str) -> bool:
+    return is_blob_name(name) and BLOB_NAME.match(name)[1] is not None
+
+
+def pin_blob(name: str) -> None:
+    """
+    Marca el blob como recién usado: `collect_blobs` solo borra los que llevan
+    `MEDIA_BLOB_GRACE_PERIOD` sin referencias ni uso. El UPDATE bloquea la fila hasta el final de la transacción.
+    """
+    from .models import MediaBlob
+    if not MediaBlob.objects.filter(name=name).update(updated_at=timezone.now()):
+        MediaBlob.objects.get_or_create(name=name)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    content_addressed = True
+
+    def blob_name(self, name: str, content) -> str:
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{EXTENSIONS.get(extension, extension)}"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        if not is_blob_name(name):
+            name = self.blob_name(name, content)
+
+        with transaction.atomic():
+            if not is_variant_name(name):
+                pin_blob(name)
+            # Con la fila bloqueada: si `collect_blobs` acababa de borrar el archivo, se vuelve a escribir
+            if self.exists(name):
+                return name
+            try:
+                return self._save(name, content)
+            except BlobExists:
+                # Otra petición guardó el mismo contenido al mismo tiempo
+                return name
+
+    def get_available_name(self, name, max_length=None):
+        # Solo se llama si el archivo apareció entre `exists` y la escritura
+        raise BlobExists(name)
+
+    def variants(self, name: str) -> list[str]:
+        """
+        Nombres de los archivos derivados del blob `name`.
+        """
+        directory = f"{os.path.dirname(name)}/variants"
+        if not self.exists(directory):
+            return []
+        digest = blob_digest(name)
+        return [f"{directory}/{filename}" for filename in self.listdir(directory)[1] if filename.startswith(digest)]
@@ -0,0 +1,12 @@
+from django.apps import apps
+from tasks.queue import task
+from .images import generate_variants
+
+
+@task("Hotel.generate_image_variants")
+def generate_image_variants(model: str, pk: str, name: str) -> None:
+    """
+    Variantes de la imagen `name` de `model` ("Hotel.Hotel" o "Hotel.Image"). Un error la deja en la
+    cola para reintentarla; si la imagen cambió desde que se encoló no hace nada.
+    """
+    generate_variants(apps.get_model(model), pk, name)
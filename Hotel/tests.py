@@ -1,3 +1,629 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image as PillowImage
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.test import APIClient
+from administrator.models import Services, ImageCategory
+from .models import Hotel, LocationCoordinates, RoomType, ServicesHotel, Image, MediaBlob
+from .tests_utils import build_hotel, create_hotel, create_hotelier
+from .search import get_search_backend, DatabaseSearchBackend, SQLiteFTS5SearchBackend
+from .images import Base64UploadedImageField, generate_variants, variant_name, variant_spec
+from .blobs import collect_blobs
+from .cache import changed_at_key
+from .geo import EARTH_RADIUS_KM, bounding_box, haversine_km, nearby_hotels
+from payments.models import RoomNightInventory
+from tasks.models import Task
+from tasks.queue import claim, run_task
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+import base64, importlib, io, json, math, tempfile, uuid
 
 # Create your tests here.
+class HotelQueryCountTests(TestCase):
+    """
+    Fija el número de consultas de los listados de hoteles para que no vuelva a crecer con el número de hoteles.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotelier = create_hotelier()
+        cls.services = [Services.objects.create(name=name) for name in ("Wifi", "Alberca")]
+        cls.category = ImageCategory.objects.create(name="Fachada")
+        cls.hotels = [cls.create_hotel(index) for index in range(3)]
+
+    @classmethod
+    def create_hotel(cls, index):
+        hotel = create_hotel(cls.hotelier, name=f"Hotel {index}", image=f"images/{index}.jpg", rating=index % 5)
+        LocationCoordinates.objects.create(hotel=hotel, latitude="21.161900", longitude="-86.851500")
+        for service in cls.services:
+            ServicesHotel.objects.create(hotel=hotel, service=service, price="10.00")
+        for image in range(2):
+            Image.objects.create(hotel=hotel, category=cls.category, image=f"images/{index}-{image}.jpg")
+        for room_type in ("Sencilla", "Doble"):
+            RoomType.objects.create(hotel=hotel, type=room_type, capacity=2, price="100.00", rooms=5)
+        return hotel
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_hotel_list(self):
+        # estado (ETag), conteo y página; sin caché además hoteles, servicios, imágenes y tipos de habitación
+        with self.assertNumQueries(7):
+            response = self.client.get("/api/v1/hotels/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+
+        with self.assertNumQueries(3):
+            self.client.get("/api/v1/hotels/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_hotel(3)
+        with self.assertNumQueries(7):
+            self.client.get("/api/v1/hotels/")
+
+    def test_hotel_detail(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(f"/api/v1/hotels/{self.hotels[0].id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["services"]), 2)
+        self.assertIn(response.data["services"][0]["service"]["name"], ("Wifi", "Alberca"))
+
+        with self.assertNumQueries(2):
+            self.client.get(f"/api/v1/hotels/{self.hotels[0].id}/")
+
+    def test_all_hotels_list(self):
+        # la paginación por cursor no cuenta filas
+        with self.assertNumQueries(6):
+            response = self.client.get("/api/v1/all_hotels/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_hotel(3)
+        with self.assertNumQueries(6):
+            self.client.get("/api/v1/all_hotels/")
+        with self.assertNumQueries(2):
+            self.client.get("/api/v1/all_hotels/")
+
+    def test_all_hotels_detail(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(f"/api/v1/all_hotels/{self.hotels[1].id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(self.hotels[1].id))
+
+    def test_conditional_get(self):
+        url = f"/api/v1/all_hotels/{self.hotels[1].id}/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Image.objects.filter(hotel=self.hotels[1]).first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_conditional_get_sees_catalog_changes(self):
+        url = "/api/v1/all_hotels/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Renombrar un servicio no toca ningún hotel, pero cambia la respuesta
+        service = self.services[0]
+        service.name = "Wi-Fi"
+        with self.captureOnCommitCallbacks(execute=True):
+            service.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Wi-Fi", response.content.decode())
+
+    def test_conditional_get_sees_deletions(self):
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Hotel.objects.update(updated_at=an_hour_ago)
+        cache.set_many({changed_at_key(name): an_hour_ago for name in ("hotels", "catalog")})
+        url = "/api/v1/all_hotels/"
+        last_modified = self.client.get(url)["Last-Modified"]
+        self.assertEqual(last_modified, http_date(an_hour_ago.timestamp()))
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # Con solo If-Modified-Since, borrar un hotel también cuenta como cambio
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hotels[2].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_conditional_get_of_a_missing_hotel(self):
+        url = f"/api/v1/all_hotels/{self.hotels[1].id}/"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hotels[1].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        self.assertEqual(self.client.get(f"/api/v1/all_hotels/{uuid.uuid4()}/", HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+    def test_moved_related_row_refreshes_both_hotels(self):
+        source, target = self.hotels[0], self.hotels[1]
+        for hotel in (source, target):
+            self.client.get(f"/api/v1/hotels/{hotel.id}/")
+
+        room_type = RoomType.objects.filter(hotel=source).first()
+        image = Image.objects.filter(hotel=source).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            for row in (room_type, image):
+                row.hotel = target
+                row.save()
+
+        source_data = self.client.get(f"/api/v1/hotels/{source.id}/").data
+        target_data = self.client.get(f"/api/v1/hotels/{target.id}/").data
+        self.assertNotIn(str(room_type.id), [item["id"] for item in source_data["room_types"]])
+        self.assertIn(str(room_type.id), [item["id"] for item in target_data["room_types"]])
+        self.assertEqual((len(source_data["images"]), len(target_data["images"])), (1, 3))
+
+    @override_settings(HOTEL_EXPORT_CHUNK_SIZE=2)
+    def test_export_streams_every_hotel(self):
+        self.create_hotel(3)
+        expected = sorted(str(hotel.pk) for hotel in Hotel.objects.all())
+
+        response = self.client.get("/api/v1/all_hotels/export/")
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "application/json"))
+        self.assertTrue(response.streaming)
+        hotels = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(sorted(hotel["id"] for hotel in hotels), expected)
+        self.assertEqual(len(hotels[0]["room_types"]), 2)
+
+        response = self.client.get("/api/v1/all_hotels/export/", {"mode": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(sorted(json.loads(line)["id"] for line in lines), expected)
+        self.assertEqual([json.loads(line) for line in lines], hotels)
+
+        self.assertEqual(self.client.get("/api/v1/all_hotels/export/", {"mode": "xml"}).status_code, 400)
+
+    def test_export_of_an_empty_catalog(self):
+        Hotel.objects.all().delete()
+        self.assertEqual(json.loads(b"".join(self.client.get("/api/v1/all_hotels/export/").streaming_content)), [])
+        self.assertEqual(b"".join(self.client.get("/api/v1/all_hotels/export/", {"mode": "ndjson"}).streaming_content), b"")
+
+    def test_related_edit_invalidates_cached_hotel(self):
+        url = f"/api/v1/hotels/{self.hotels[0].id}/"
+        self.client.get(url)
+
+        room_type = self.hotels[0].room_types.first()
+        room_type.price = "250.00"
+        with self.captureOnCommitCallbacks(execute=True):
+            room_type.save()
+
+        response = self.client.get(url)
+        prices = {item["id"]: item["price"] for item in response.data["room_types"]}
+        self.assertEqual(prices[str(room_type.id)], "250.00")
+
+
+class AllHotelsKeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hotelier = create_hotelier()
+        for index in range(7):
+            create_hotel(hotelier, name=f"Hotel {index % 3}", rating=index % 2)
+        cls.expected = [str(pk) for pk in Hotel.objects.order_by("-rating", "name", "id").values_list("id", flat=True)]
+
+    def test_walk_forward_and_back(self):
+        client = APIClient()
+        pages, url = [], "/api/v1/all_hotels/?page_size=3"
+        while url:
+            response = client.get(url)
+            pages.append([hotel["id"] for hotel in response.data["results"]])
+            url = response.data["next"]
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertIsNone(client.get("/api/v1/all_hotels/?page_size=3").data["previous"])
+
+        previous = client.get(response.data["previous"])
+        self.assertEqual([hotel["id"] for hotel in previous.data["results"]], pages[-2])
+
+    def test_invalid_cursor(self):
+        response = APIClient().get("/api/v1/all_hotels/?cursor=invalid")
+        self.assertEqual(response.status_code, 404)
+
+
+class HotelSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hotelier = create_hotelier()
+        cls.hotels = []
+        for index in range(12):
+            hotel = create_hotel(
+                hotelier, name=f"Hotel {index:02}", city="Tulum" if index < 11 else "Mérida",
+                state="Quintana Roo" if index < 11 else "Yucatán",
+            )
+            RoomType.objects.create(hotel=hotel, type="Doble", capacity=2, price="200.00", rooms=2)
+            RoomType.objects.create(hotel=hotel, type="Familiar", capacity=4, price="350.00", rooms=1)
+            cls.hotels.append(hotel)
+
+        # Hotel 00: la habitación doble está agotada la segunda noche, solo queda la familiar
+        # Hotel 01: todo agotado. Hotel 11: otra ciudad
+        for room_type in RoomType.objects.filter(hotel__in=cls.hotels[:2]):
+            if room_type.hotel_id == cls.hotels[0].id and room_type.type == "Familiar":
+                continue
+            RoomNightInventory.objects.create(room_type=room_type, night=date(2030, 4, 2), booked=room_type.rooms)
+
+    def search(self, **params):
+        return APIClient().get("/api/v1/hotel_search/", {"date_from": "2030-04-01", "date_to": "2030-04-03", **params})
+
+    def test_available_hotels_with_min_price(self):
+        with self.assertNumQueries(2):
+            response = self.search(city="tulum", guests=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 10)
+        self.assertEqual(len(response.data["results"]), 9)
+        prices = {hotel["name"]: hotel["min_price"] for hotel in response.data["results"]}
+        self.assertEqual(prices["Hotel 00"], "350.00")
+        self.assertEqual(prices["Hotel 02"], "200.00")
+        self.assertNotIn("Hotel 01", prices)
+
+        names = [hotel["name"] for hotel in response.data["results"]]
+        names += [hotel["name"] for hotel in self.search(city="tulum", guests=2, page=2).data["results"]]
+        self.assertEqual(names, [f"Hotel {index:02}" for index in [0] + list(range(2, 11))])
+
+        # Nadie ocupó esas noches y el grupo solo cabe en la habitación familiar
+        self.assertEqual(self.search(city="tulum", date_from="2030-04-03", date_to="2030-04-04").data["count"], 11)
+        self.assertEqual(self.search(state="yucatán", guests=4).data["results"][0]["min_price"], "350.00")
+        self.assertEqual(self.search(state="yucatán", guests=5).data["count"], 0)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.search().status_code, 400)
+        self.assertEqual(self.search(city="Tulum", date_to="2030-04-01").status_code, 400)
+
+
+class NearbyHotelsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hotelier = create_hotelier()
+        cls.hotels = {}
+        for name, latitude, longitude in [
+            ("Cancún", "21.161900", "-86.851500"), ("Playa del Carmen", "20.629600", "-87.073900"),
+            ("Mérida", "20.967400", "-89.592600"), ("Tokio", "35.676200", "139.650300"),
+            # A los dos lados del antimeridiano, en Fiyi
+            ("Suva", "-18.141600", "178.441900"), ("Taveuni", "-18.000000", "-179.800000"),
+        ]:
+            hotel = create_hotel(hotelier, name=name, city=name, state=name)
+            LocationCoordinates.objects.create(hotel=hotel, latitude=latitude, longitude=longitude)
+            cls.hotels[name] = hotel
+
+    def nearby(self, **params):
+        response = APIClient().get("/api/v1/hotels_nearby/", params)
+        self.assertEqual(response.status_code, 200)
+        return [(hotel["name"], round(hotel["distance_km"])) for hotel in response.data]
+
+    def test_haversine(self):
+        self.assertEqual(haversine_km(21.1619, -86.8515, 21.1619, -86.8515), 0)
+        self.assertAlmostEqual(haversine_km(21.1619, -86.8515, 20.9674, -89.5926), 285.25, places=1)
+        self.assertAlmostEqual(haversine_km(20.9674, -89.5926, 21.1619, -86.8515), haversine_km(21.1619, -86.8515, 20.9674, -89.5926))
+        # Media vuelta al mundo sobre el ecuador
+        self.assertAlmostEqual(haversine_km(0, 0, 0, 180), math.pi * EARTH_RADIUS_KM)
+
+    def test_bounding_box(self):
+        def names(condition):
+            return set(LocationCoordinates.objects.filter(condition).values_list("hotel__name", flat=True))
+
+        self.assertEqual(names(bounding_box(21.1619, -86.8515, 100)), {"Cancún", "Playa del Carmen"})
+        self.assertEqual(names(bounding_box(21.1619, -86.8515, 300)), {"Cancún", "Playa del Carmen", "Mérida"})
+        # Cruza ±180°: se parte en dos rangos de longitud
+        self.assertEqual(names(bounding_box(-18.1, 179.9, 200)), {"Suva", "Taveuni"})
+        self.assertEqual(names(bounding_box(-18.1, -179.9, 200)), {"Suva", "Taveuni"})
+        # Cerca del polo la caja abarca todas las longitudes
+        self.assertEqual(names(bounding_box(89.9, 0, 8000)), {"Cancún", "Playa del Carmen", "Mérida", "Tokio"})
+
+    def test_nearby_with_radius(self):
+        self.assertEqual(self.nearby(lat="21.1619", lng="-86.8515", radius=100), [("Cancún", 0), ("Playa del Carmen", 64)])
+        self.assertEqual(self.nearby(lat="-18.1416", lng="179.9", radius=200), [("Taveuni", 35), ("Suva", 154)])
+
+    def test_nearest_across_the_antimeridian(self):
+        self.assertEqual(self.nearby(lat="-18.0", lng="-179.9", limit=2), [("Taveuni", 11), ("Suva", 176)])
+
+    @override_settings(NEARBY_HOTELS_INITIAL_RADIUS_KM=10, NEARBY_HOTELS_MAX_RADIUS_KM=500)
+    def test_expansion_is_capped(self):
+        # 10, 40, 160 y 500 km: no se llega a cargar la tabla completa para buscar hoteles al otro lado del mundo
+        with self.assertNumQueries(4):
+            hotels = nearby_hotels(21.1619, -86.8515, limit=20)
+        self.assertEqual([hotel.name for hotel in hotels], ["Cancún", "Playa del Carmen", "Mérida"])
+
+        # En medio del océano no hay nada dentro del tope
+        self.assertEqual(self.nearby(lat="0", lng="-150"), [])
+
+
+class HotelFullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotelier = create_hotelier()
+        spa = Services.objects.create(name="Spa")
+        hotels = [
+            ("Playa Azul", "Cancún", "Quintana Roo", "Frente al mar"),
+            ("Casa Colonial", "Mérida", "Yucatán", "Centro histórico, cerca de Cancún"),
+            ("Sierra Alta", "Monterrey", "Nuevo León", "Montaña"),
+        ]
+        cls.hotels = {}
+        for name, city, state, description in hotels:
+            cls.hotels[name] = create_hotel(cls.hotelier, name=name, description=description, city=city, state=state)
+        ServicesHotel.objects.create(hotel=cls.hotels["Sierra Alta"], service=spa, price="10.00")
+        get_search_backend().rebuild()
+
+    def search(self, terms, user=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/api/v1/hotels/", {"search": terms})
+        return [hotel["name"] for hotel in response.data["results"]]
+
+    def test_ranked_prefix_search(self):
+        # el nombre de la ciudad pesa más que la descripción; sin acentos y por prefijo
+        self.assertEqual(self.search("canc"), ["Playa Azul", "Casa Colonial"])
+        self.assertEqual(self.search("merida centro"), ["Casa Colonial"])
+        self.assertEqual(self.search("spa"), ["Sierra Alta"])
+        self.assertEqual(self.search('"playa" ('), ["Playa Azul"])
+
+    def test_index_follows_edits(self):
+        hotel = self.hotels["Sierra Alta"]
+        hotel.city = "Saltillo"
+        with self.captureOnCommitCallbacks(execute=True):
+            hotel.save()
+        self.assertEqual(self.search("saltillo"), ["Sierra Alta"])
+        self.assertEqual(self.search("monterrey"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hotel.delete()
+        self.assertEqual(self.search("spa"), [])
+
+    def test_search_within_the_hoteliers_hotels(self):
+        # Los hoteles de otro hotelero son más relevantes, pero el MATCH se une a los del hotelero
+        other = create_hotelier("other")
+        Hotel.objects.bulk_create([build_hotel(other, name=f"Cancún {index}", description="Cancún") for index in range(12)])
+        get_search_backend().rebuild()
+
+        self.assertEqual(self.search("canc", self.hotelier.user), ["Playa Azul", "Casa Colonial"])
+        self.assertEqual(len(self.search("canc", other.user)), 9)
+        client = APIClient()
+        client.force_authenticate(other.user)
+        self.assertEqual(client.get("/api/v1/hotels/", {"search": "canc"}).data["count"], 12)
+
+    def test_rebuild_is_atomic(self):
+        with mock.patch.object(type(get_search_backend()), "documents", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                get_search_backend().rebuild()
+        self.assertEqual(self.search("canc"), ["Playa Azul", "Casa Colonial"])
+
+    def test_backend_follows_the_database(self):
+        get_search_backend.cache_clear()
+        self.addCleanup(get_search_backend.cache_clear)
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            self.assertIsInstance(get_search_backend(), DatabaseSearchBackend)
+            with self.assertRaises(ImproperlyConfigured):
+                SQLiteFTS5SearchBackend()
+        get_search_backend.cache_clear()
+        self.assertIsInstance(get_search_backend(), SQLiteFTS5SearchBackend)
+
+    def test_no_ddl_on_the_request_path(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search("canc")
+        self.assertFalse([query["sql"] for query in queries if query["sql"].lstrip().upper().startswith("CREATE")])
+
+    def test_migration_fills_the_index(self):
+        # La tabla ya existe y tiene los hoteles al desplegar, sin correr `rebuild_search_index`
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM hotel_search_index")
+        self.assertEqual(self.search("canc"), [])
+        migration = importlib.import_module("Hotel.migrations.0009_hotel_search_index")
+        migration.create_search_index(django_apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.search("canc"), ["Playa Azul", "Casa Colonial"])
+
+
+class DestinationsAutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotelier = create_hotelier()
+        for name, city, state in (
+            ("Playa Azul", "Cancún", "Quintana Roo"), ("Coral", "Cancún", "Quintana Roo"),
+            ("Arcos", "San José del Cabo", "Baja California Sur"), ("Cactus", "Campeche", "Campeche"),
+        ):
+            cls.create_hotel(name, city, state)
+
+    @classmethod
+    def create_hotel(cls, name, city, state):
+        return create_hotel(cls.hotelier, name=name, city=city, state=state)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_suggestions(self):
+        response = self.client.get("/api/v1/destinations_autocomplete/", {"q": "ca"})
+        self.assertEqual(
+            [(item["type"], item.get("city") or item["state"], item["hotels"]) for item in response.data],
+            [
+                ("city", "Cancún", 2), ("state", "Baja California Sur", 1), ("city", "Campeche", 1),
+                ("state", "Campeche", 1), ("city", "San José del Cabo", 1),
+            ],
+        )
+
+        response = self.client.get("/api/v1/destinations_autocomplete/", {"q": "CAC", "names": "true"})
+        self.assertEqual([item.get("name") for item in response.data], ["Cactus"])
+
+        # el índice ya está en memoria: no hay consultas
+        with self.assertNumQueries(0):
+            self.client.get("/api/v1/destinations_autocomplete/", {"q": "quin"})
+
+    def test_rebuilt_after_hotel_changes(self):
+        self.client.get("/api/v1/destinations_autocomplete/", {"q": "tul"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_hotel("Ruinas", "Tulum", "Quintana Roo")
+        response = self.client.get("/api/v1/destinations_autocomplete/", {"q": "tul"})
+        self.assertEqual([item["city"] for item in response.data], ["Tulum"])
+
+
+class ImageUploadTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        cache.clear()
+
+        buffer = io.BytesIO()
+        PillowImage.new("RGB", (2000, 1500), "navy").save(buffer, format="PNG")
+        self.png = buffer.getvalue()
+        hotelier = create_hotelier()
+        self.user = hotelier.user
+        self.hotel = build_hotel(hotelier, image="")
+        self.hotel.image.save("fachada.png", ContentFile(self.png))
+        self.blob = self.hotel.image.name
+
+    def test_variants_generated_and_exposed(self):
+        url = f"/api/v1/all_hotels/{self.hotel.id}/"
+        self.assertEqual(APIClient().get(url).data["image_variants"], {})
+
+        self.assertTrue(generate_variants(Hotel, self.hotel.pk, self.hotel.image.name))
+        self.hotel.refresh_from_db()
+        thumbnail = self.hotel.image_variants["thumbnail"]
+        directory, digest = self.blob[:len("blobs/ab/cd")], self.blob[len("blobs/ab/cd/"):-len(".png")]
+        self.assertEqual(thumbnail["webp"], f"{directory}/variants/{digest}-thumbnail-{variant_spec('thumbnail', 'webp')}.webp")
+        with PillowImage.open(self.hotel.image.storage.path(thumbnail["webp"])) as image:
+            self.assertEqual(image.size, (320, 240))
+
+        variants = APIClient().get(url).data["image_variants"]
+        self.assertTrue(variants["medium"]["jpeg"].endswith(f"/media/{self.hotel.image_variants['medium']['jpeg']}"))
+
+    def test_variant_names_follow_their_spec(self):
+        generate_variants(Hotel, self.hotel.pk, self.blob)
+        self.hotel.refresh_from_db()
+        before = self.hotel.image_variants["thumbnail"]["webp"]
+
+        # Otra configuración genera otro archivo: el que ya se sirvió como inmutable no cambia
+        with override_settings(IMAGE_VARIANTS={"thumbnail": (160, 120), "medium": (1024, 768)}):
+            call_command("generate_image_variants", "--all", stdout=io.StringIO())
+            self.hotel.refresh_from_db()
+            after = self.hotel.image_variants["thumbnail"]["webp"]
+        self.assertNotEqual(before, after)
+        self.assertEqual(self.hotel.image_variants["medium"]["webp"], variant_name(self.blob, "medium", "webp"))
+        with PillowImage.open(default_storage.path(before)) as image:
+            self.assertEqual(image.size, (320, 240))
+        with PillowImage.open(default_storage.path(after)) as image:
+            self.assertEqual(image.size, (160, 120))
+
+    def test_variants_are_queued_as_a_task(self):
+        task = Task.objects.get(name="Hotel.generate_image_variants")
+        self.assertEqual(task.payload, {"model": "Hotel.Hotel", "pk": str(self.hotel.pk), "name": self.blob})
+        self.assertEqual(self.hotel.image_variants, {})
+
+        self.assertTrue(run_task(claim(1)[0]))
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.image_variants["source"], self.blob)
+        self.assertEqual(set(self.hotel.image_variants), {"source", "thumbnail", "medium"})
+
+    def test_base64_upload(self):
+        field = Base64UploadedImageField()
+        field.chunk_size = 1024
+        encoded = base64.b64encode(self.png).decode()
+        image = field.run_validation(f"data:image/png;base64,{encoded}")
+        self.assertTrue(image.name.endswith(".png"))
+        self.assertEqual(image.read(), self.png)
+
+        # Partido a 76 columnas, como lo hace `base64.encodebytes`
+        wrapped = base64.encodebytes(self.png).decode()
+        self.assertIn("\n", wrapped[:1024])
+        self.assertEqual(field.run_validation(f"data:image/png;base64,{wrapped}").read(), self.png)
+
+        # Demasiado grande: se rechaza sin decodificar nada
+        with override_settings(IMAGE_MAX_UPLOAD_SIZE=1024), mock.patch("Hotel.images.base64.b64decode") as decode:
+            with self.assertRaises(DRFValidationError):
+                field.run_validation(encoded)
+        decode.assert_not_called()
+
+        for invalid in (base64.b64encode(b"no es una imagen" * 100).decode(), "%%%%", encoded[:-8] + "!!!!!!!!"):
+            with self.assertRaises(DRFValidationError):
+                field.run_validation(invalid)
+
+    def test_multipart_upload_deduplicates(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        category = ImageCategory.objects.create(name="Alberca")
+
+        response = client.post("/api/v1/hotel_images/upload/", {
+            "hotel": str(self.hotel.id), "category": category.id, "image": SimpleUploadedFile("alberca.png", self.png),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 201, response.data)
+        image = Image.objects.get(pk=response.data["id"])
+        self.assertEqual(image.image.name, self.hotel.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=image.image.name).references, 2)
+
+        buffer = io.BytesIO()
+        PillowImage.new("RGB", (800, 600), "teal").save(buffer, format="JPEG")
+        response = client.put(f"/api/v1/hotels/{self.hotel.id}/image/", {
+            "image": SimpleUploadedFile("nueva.jpeg", buffer.getvalue()),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.hotel.refresh_from_db()
+        self.assertRegex(self.hotel.image.name, r"^blobs/../../[0-9a-f]{64}\.jpg$")
+        self.assertEqual(MediaBlob.objects.get(name=image.image.name).references, 1)
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_upload_size_limit(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.put(f"/api/v1/hotels/{self.hotel.id}/image/", {
+            "image": SimpleUploadedFile("grande.png", self.png),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 413)
+
+    def test_reused_blob_is_not_collected(self):
+        self.hotel.delete()
+        MediaBlob.objects.filter(name=self.blob).update(updated_at=timezone.now() - timedelta(days=2))
+
+        # Subir el mismo contenido toca la fila del blob antes de devolver su nombre
+        self.assertEqual(default_storage.save("otra.png", ContentFile(self.png)), self.blob)
+        self.assertEqual(collect_blobs(timedelta(hours=1)), {"blobs": 0, "files": 0})
+        self.assertTrue(default_storage.exists(self.blob))
+
+        # Si el recolector lo borró primero, se vuelve a escribir
+        self.assertEqual(collect_blobs(timedelta(0)), {"blobs": 1, "files": 1})
+        self.assertEqual(default_storage.save("otra.png", ContentFile(self.png)), self.blob)
+        self.assertTrue(default_storage.exists(self.blob))
+
+    def test_unreferenced_blobs_collected(self):
+        name = self.hotel.image.name
+        generate_variants(Hotel, self.hotel.pk, name)
+        self.hotel.delete()
+        self.assertEqual(MediaBlob.objects.get(name=name).references, 0)
+
+        self.assertEqual(collect_blobs(timedelta(0)), {"blobs": 1, "files": 5})
+        self.assertFalse(default_storage.exists(name))
+
+    def test_media_headers(self):
+        # Sin DEBUG ni MEDIA_SENDFILE, Django no entrega archivos
+        self.assertEqual(self.client.get(f"/media/{self.hotel.image.name}").status_code, 404)
+
+        with self.settings(DEBUG=True):
+            response = self.client.get(f"/media/{self.hotel.image.name}")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("immutable", response["Cache-Control"])
+            self.assertEqual(self.client.get(f"/media/{self.hotel.image.name}", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+            generate_variants(Hotel, self.hotel.pk, self.blob)
+            self.hotel.refresh_from_db()
+            variant = self.client.get(f"/media/{self.hotel.image_variants['thumbnail']['webp']}")
+            self.assertIn("immutable", variant["Cache-Control"])
+            self.assertNotEqual(variant["ETag"], response["ETag"])
+
+        with self.settings(MEDIA_SENDFILE="x-accel-redirect"):
+            response = self.client.get(f"/media/{self.hotel.image.name}")
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.hotel.image.name}")
+        self.assertEqual(response.content, b"")
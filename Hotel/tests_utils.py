@@ -0,0 +1,39 @@
+"""
+Datos de prueba compartidos por las pruebas de las apps (`Hotel`, `payments`, `administrator`).
+
+Los usuarios se crean con `bulk_create`, que no envía `post_save`: así no se encolan cuentas en Stripe.
+"""
+from authentication.models import CustomUser, Customer, Hotelier
+from .models import Hotel
+
+HOTEL_FIELDS = {
+    "name": "Hotel", "image": "images/hotel.jpg", "description": "Descripción", "phone": "9981234567",
+    "address": "Dirección", "city": "Cancún", "state": "Quintana Roo", "rating": 3,
+}
+
+
+def create_hotelier(username: str = "hotelier") -> Hotelier:
+    user = CustomUser.objects.bulk_create([
+        CustomUser(email=f"{username}@example.com", username=username, is_hotelier=True, is_customer=False)
+    ])[0]
+    return Hotelier.objects.create(user=user)
+
+
+def create_customer(username: str = "customer") -> Customer:
+    user = CustomUser.objects.bulk_create([CustomUser(email=f"{username}@example.com", username=username)])[0]
+    return Customer.objects.create(user=user)
+
+
+def build_hotel(hotelier: Hotelier, **fields) -> Hotel:
+    """
+    Hotel sin guardar, para `bulk_create` o para guardar la imagen con el archivo.
+    """
+    return Hotel(hotelier=hotelier, **{**HOTEL_FIELDS, **fields})
+
+
+def create_hotel(hotelier: Hotelier, **fields) -> Hotel:
+    """
+    create_hotel(hotelier, name="Playa Azul", city="Tulum")\n
+    Los campos que no se pasan toman los valores de `HOTEL_FIELDS`.
+    """
+    return Hotel.objects.create(hotelier=hotelier, **{**HOTEL_FIELDS, **fields})
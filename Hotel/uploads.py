@@ -0,0 +1,55 @@
+"""
+Subida de imágenes por multipart sin pasar el archivo por memoria.
+
+El archivo se escribe por bloques a un temporal (`TemporaryFileUploadHandler`) y el límite de tamaño
+se aplica mientras llega, así que una petición nunca retiene más de un bloque aunque el archivo sea
+grande. Al guardar, `FileSystemStorage` mueve el temporal a su destino en lugar de copiarlo.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Margen para los demás campos y las cabeceras del multipart al comparar el Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("The uploaded file is too large.")
+    default_code = "upload_too_large"
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    chunk_size = 64 * 1024
+
+    def __init__(self, request=None, max_size: int = None):
+        super().__init__(request)
+        self.max_size = max_size or settings.IMAGE_MAX_UPLOAD_SIZE
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Rechaza antes de leer el cuerpo si el Content-Length ya excede el límite
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise UploadTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class StreamingUploadMixin:
+    """
+    Usa `LimitedTemporaryFileUploadHandler` en las acciones de `upload_actions`.
+    """
+    upload_actions = ()
+
+    def initialize_request(self, request, *args, **kwargs):
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action in self.upload_actions:
+            request.upload_handlers = [LimitedTemporaryFileUploadHandler(request)]
+        return drf_request
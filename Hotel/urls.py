@@ -1,8 +1,12 @@
 from django.urls import path
-from .views import CoordinateViewSet, AllHotelsViewSet
+from .views import CoordinateViewSet, AllHotelsViewSet, HotelSearchViewSet, NearbyHotelsViewSet, DestinationsAutocompleteViewSet
 
 urlpatterns = [
     path("hotel_coordinates/", CoordinateViewSet.as_view({"get": "list"}), name="hotel_coordinates"),
     path("all_hotels/", AllHotelsViewSet.as_view({"get": "list"}), name="all_hotels"),
+    path("all_hotels/export/", AllHotelsViewSet.as_view({"get": "export"}), name="all_hotels_export"),
     path("all_hotels/<slug:pk>/", AllHotelsViewSet.as_view({"get": "retrieve"}), name="all_hotels"),
+    path("hotels_nearby/", NearbyHotelsViewSet.as_view({"get": "list"}), name="hotels_nearby"),
+    path("destinations_autocomplete/", DestinationsAutocompleteViewSet.as_view({"get": "list"}), name="destinations_autocomplete"),
+    path("hotel_search/", HotelSearchViewSet.as_view({"get": "list"}), name="hotel_search"),
 ]
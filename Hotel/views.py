@@ -1,12 +1,28 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import OuterRef, Subquery, Max
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.utils.translation import gettext as _
-from rest_framework import viewsets, permissions, status, filters
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.encoders import JSONEncoder
 from authentication.models import Hotelier
 from .serializers import *
 from .models import *
+from .pagination import KeysetPagination, HotelSearchPagination
+from .cache import get_versions, get_changed_at, payload_key, get_payloads, set_payloads
+from .geo import nearby_hotels
+from .search import FullTextSearchFilter
+from .autocomplete import suggest
+from .uploads import StreamingUploadMixin
+from functools import wraps
+import hashlib
 
 # Create your views here.
 class IsHotelier(permissions.BasePermission):
@@ -20,6 +36,7 @@ class IsHotelier(permissions.BasePermission):
 
 
 def capture_validation_error(func):
+    @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
@@ -35,6 +52,64 @@ def capture_validation_error(func):
     return wrapper
 
 
+def conditional_get(func):
+    """
+    Responde `304 Not Modified` a los GET condicionales (If-None-Match / If-Modified-Since) de
+    `list` y `retrieve` sin serializar nada.
+
+    El estado del recurso es el máximo de `conditional_timestamps` de la vista sobre su queryset
+    base (sin búsqueda ni filtros, que solo pueden reducirlo), una sola consulta que resuelven los
+    índices sobre `updated_at`, más las marcas de `conditional_markers` para los borrados y cambios
+    del catálogo que no mueven ningún `updated_at` (`Hotel.cache.mark_changed`) y las versiones de
+    caché que devuelva `get_conditional_versions`. Un `retrieve` de una fila que no existe responde 404.
+    """
+    @wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        pk = kwargs.get("pk")
+        queryset = self.get_queryset()
+        fields = self.conditional_timestamps
+        try:
+            if pk is not None:
+                queryset = queryset.filter(pk=pk)
+            state = queryset.order_by().aggregate(**{f"max_{index}": Max(field) for index, field in enumerate(fields)})
+        except (ValueError, DjangoValidationError):
+            return func(self, request, *args, **kwargs)
+        if pk is not None and state["max_0"] is None:
+            raise Http404
+
+        timestamps = [value for value in state.values() if value is not None]
+        timestamps += get_changed_at(self.conditional_markers)
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        fingerprint = "|".join([
+            request.get_full_path(), request.META.get("HTTP_ACCEPT", ""), str(request.user.pk),
+            *(value.isoformat() for value in timestamps), *self.get_conditional_versions(pk),
+        ])
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = func(self, request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response.headers["ETag"] = etag
+            if last_modified:
+                response.headers["Last-Modified"] = http_date(last_modified)
+        return response
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """
+    Configuración de `conditional_get` para la vista.
+    """
+    # Campos cuyo máximo cambia cuando cambia la respuesta; el primero es de la propia fila
+    conditional_timestamps = ("updated_at",)
+    # Marcas de `Hotel.cache.mark_changed` que también cambian la respuesta
+    conditional_markers = ()
+
+    def get_conditional_versions(self, pk) -> list:
+        return []
+
+
 def validate_hotelier(data=None, is_destroy=False):
     def decorator(func):
         def wrapper(self, obj, *args, **kwargs):
@@ -59,16 +134,57 @@ def validate_hotelier(data=None, is_destroy=False):
     return decorator
 
 
-class HotelViewSet(viewsets.ModelViewSet):
+class CachedHotelMixin(ConditionalGetMixin):
+    """
+    Sirve `list` y `retrieve` desde la caché de representaciones de hoteles (`Hotel.cache`).
+
+    La consulta de la página solo lee las filas de `Hotel`; las relaciones anidadas se cargan
+    (con `with_related`) únicamente para los hoteles que no están en caché.
+    """
+    conditional_markers = ("hotels", "catalog")
+
+    def get_conditional_versions(self, pk) -> list:
+        catalog_version, versions = get_versions([pk] if pk is not None else [])
+        return [catalog_version, *versions.values()]
+
+    def serialize_hotels(self, hotels) -> list:
+        context = self.get_serializer_context()
+        base_url = self.request.build_absolute_uri("/")
+        catalog_version, versions = get_versions([hotel.pk for hotel in hotels])
+        keys = {hotel.pk: payload_key(hotel.pk, versions[hotel.pk], catalog_version, base_url) for hotel in hotels}
+
+        payloads = get_payloads(keys.values())
+        missing = [pk for pk, key in keys.items() if key not in payloads]
+        if missing:
+            loaded = Hotel.objects.with_related().in_bulk(missing)
+            fresh = {keys[pk]: HotelSerializer(hotel, context=context).data for pk, hotel in loaded.items()}
+            set_payloads(fresh)
+            payloads.update(fresh)
+
+        return [payloads[keys[hotel.pk]] for hotel in hotels if keys[hotel.pk] in payloads]
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_hotels(page))
+        return Response(self.serialize_hotels(list(queryset)))
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.serialize_hotels([self.get_object()])[0])
+
+
+class HotelViewSet(StreamingUploadMixin, CachedHotelMixin, viewsets.ModelViewSet):
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
     permission_classes = (IsHotelier,)
     pagination_class = PageNumberPagination
     pagination_class.page_size = 9
 
-    filter_backends = [filters.SearchFilter]
-
-    search_fields = ['name', 'city', 'state']
+    filter_backends = [FullTextSearchFilter]
+    upload_actions = ("image",)
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
@@ -80,28 +196,137 @@ class HotelViewSet(viewsets.ModelViewSet):
         hotelier_id = self.request.user.id
         serializer.save(hotelier=Hotelier.objects.get(user_id=hotelier_id))
 
+    @action(detail=True, methods=["put"], parser_classes=[MultiPartParser], serializer_class=HotelImageUploadSerializer)
+    def image(self, request, *args, **kwargs):
+        """
+        Reemplaza la imagen principal del hotel con un archivo multipart (`image`).
+        """
+        serializer = self.get_serializer(self.get_object(), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
 
-class AllHotelsViewSet(viewsets.ReadOnlyModelViewSet):
+class AllHotelsViewSet(CachedHotelMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
     permission_classes = (IsHotelier,)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
             if self.request.user.is_hotelier:
                 return Hotel.objects.filter(hotelier_id=self.request.user.hoteliers.user_id)
         return super().get_queryset()
-    
+
+    def export(self, request, *args, **kwargs):
+        """
+        Exporta el catálogo completo como arreglo JSON (`?mode=json`, por defecto) o NDJSON (`?mode=ndjson`).
+
+        La respuesta se genera por bloques de `HOTEL_EXPORT_CHUNK_SIZE` hoteles: cada bloque se
+        serializa (desde la caché o cargando sus relaciones de una vez) y se envía antes de leer el
+        siguiente, así que la memoria no depende del tamaño del catálogo.
+        """
+        mode = request.query_params.get("mode", "json")
+        if mode not in ("json", "ndjson"):
+            return Response({"detail": _("`mode` must be `json` or `ndjson`.")}, status=status.HTTP_400_BAD_REQUEST)
+
+        encoder = JSONEncoder(ensure_ascii=False)
+        hotels = (encoder.encode(hotel) for hotel in self.__iter_serialized_hotels())
+        if mode == "ndjson":
+            content, content_type = (f"{hotel}\n" for hotel in hotels), "application/x-ndjson"
+        else:
+            content, content_type = self.__json_array(hotels), "application/json"
+        return StreamingHttpResponse(content, content_type=content_type)
+
+    def __iter_serialized_hotels(self):
+        queryset = self.get_queryset().order_by("pk")
+        last_pk = None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(chunk[:settings.HOTEL_EXPORT_CHUNK_SIZE])
+            if not chunk:
+                return
+            yield from self.serialize_hotels(chunk)
+            last_pk = chunk[-1].pk
+
+    @staticmethod
+    def __json_array(items):
+        yield "["
+        for index, item in enumerate(items):
+            yield item if index == 0 else f",{item}"
+        yield "]"
+
+
+class HotelSearchViewSet(viewsets.GenericViewSet):
+    serializer_class = HotelSearchSerializer
+    pagination_class = HotelSearchPagination
+
+    def get_queryset(self):
+        """
+        Hoteles de la ciudad/estado con al menos un tipo de habitación disponible para el grupo,
+        anotados con `min_price`, el precio más bajo disponible. Disponibilidad y precio se
+        resuelven en una subconsulta correlacionada, así que cada página cuesta dos consultas
+        (conteo y resultados) sin importar el número de hoteles.
+        """
+        params = HotelSearchParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        search = params.validated_data
+
+        available_room_types = (
+            RoomType.objects.with_rooms_available(search["date_from"], search["date_to"])
+            .filter(hotel=OuterRef("pk"), capacity__gte=search["guests"], rooms_available__gt=0)
+            .order_by("price")
+            .values("price")[:1]
+        )
+        queryset = Hotel.objects.all()
+        if search.get("city"):
+            queryset = queryset.filter(city__iexact=search["city"])
+        if search.get("state"):
+            queryset = queryset.filter(state__iexact=search["state"])
+
+        # `pk` desempata el orden por omisión para que las páginas no se repitan ni salten hoteles
+        return (
+            queryset.annotate(min_price=Subquery(available_room_types))
+            .filter(min_price__isnull=False)
+            .order_by("-rating", "name", "pk")
+        )
+
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-    def retrieve(self, request, pk, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
 
-        return Response(serializer.data)
+class NearbyHotelsViewSet(viewsets.GenericViewSet):
+    serializer_class = NearbyHotelSerializer
+
+    def list(self, request, *args, **kwargs):
+        params = NearbyHotelsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        hotels = nearby_hotels(
+            latitude=float(params.validated_data["lat"]),
+            longitude=float(params.validated_data["lng"]),
+            radius_km=params.validated_data.get("radius"),
+            limit=params.validated_data["limit"],
+        )
+        return Response(self.get_serializer(hotels, many=True).data)
+
+
+class DestinationsAutocompleteViewSet(viewsets.GenericViewSet):
+    """
+    Sugerencias de ciudades y estados (y con `names=true` nombres de hotel) con su número de
+    hoteles, servidas desde el índice de prefijos en caché (`Hotel.autocomplete`).
+    """
+
+    def list(self, request, *args, **kwargs):
+        params = AutocompleteParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(suggest(
+            params.validated_data["q"],
+            limit=params.validated_data["limit"],
+            names=params.validated_data["names"],
+        ))
 
 
 class CoordinateViewSet(viewsets.ModelViewSet):
@@ -147,10 +372,11 @@ class ServicesHotelViewSet(viewsets.ModelViewSet):
         super().perform_destroy(instance)
 
 
-class ImageViewSet(viewsets.ModelViewSet):
+class ImageViewSet(StreamingUploadMixin, viewsets.ModelViewSet):
     queryset = Image.objects.select_related("hotel", "category")
     serializer_class = ImageSerializer
     permission_classes = (IsHotelier,)
+    upload_actions = ("upload",)
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
@@ -169,6 +395,14 @@ class ImageViewSet(viewsets.ModelViewSet):
         current_image_category = kwargs.get("image_category")
         serializer.save(hotel=current_hotel, category=current_image_category)
 
+    @action(detail=False, methods=["post"], parser_classes=[MultiPartParser], serializer_class=ImageUploadSerializer)
+    @capture_validation_error
+    def upload(self, request, *args, **kwargs):
+        """
+        Igual que `create`, pero con el archivo en multipart (`image`) en lugar de base64.
+        """
+        return super().create(request, *args, **kwargs)
+
     @capture_validation_error
     def update(self, request, *args, **kwargs):
         return super().update(request, *args, **kwargs)
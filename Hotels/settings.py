@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
 from dotenv import load_dotenv
 import os
@@ -38,7 +40,29 @@ STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
 STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
 CURRENCY_CODE = "MXN"
 PAYMENT_INTENT_SETUP_FUTURE_USED = "off_session"
-APPLICATION_FEE_AMOUNT = 0.1
+# Fracción del precio que se cobra como comisión de la plataforma (payments.pricing)
+APPLICATION_FEE_AMOUNT = Decimal("0.10")
+# Segundos que se guardan en caché el cliente de Stripe y su lista de métodos de pago (authentication.stripe_cache)
+STRIPE_CUSTOMER_CACHE_TIMEOUT = 24 * 60 * 60
+STRIPE_PAYMENT_METHODS_CACHE_TIMEOUT = 10 * 60
+# Cliente HTTP de Stripe (payments.stripe_client): timeouts en segundos, reintentos y conexiones del pool
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', 3.05))
+STRIPE_READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', 20))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', 2))
+STRIPE_POOL_MAXSIZE = int(os.getenv('STRIPE_POOL_MAXSIZE', 20))
+# Llamadas más lentas que esto (segundos) se registran como warning
+STRIPE_SLOW_CALL_SECONDS = 2
+# Cada cuántos segundos cada proceso registra (INFO) el resumen de sus llamadas a Stripe
+STRIPE_METRICS_LOG_INTERVAL = int(os.getenv('STRIPE_METRICS_LOG_INTERVAL', 5 * 60))
+# URL base de la API; p. ej. http://127.0.0.1:12111 para `manage.py stripe_standin`
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE')
+# Eventos del webhook (payments.events, `manage.py process_stripe_events`): tamaño de lote, intentos
+# antes de quedar como dead letter, segundos que un proceso conserva un lote y espera sin eventos.
+# Los reintentos usan el mismo backoff que la cola de tareas (TASK_RETRY_BACKOFF)
+STRIPE_EVENT_BATCH_SIZE = 100
+STRIPE_EVENT_MAX_ATTEMPTS = 8
+STRIPE_EVENT_LEASE_SECONDS = 300
+STRIPE_EVENT_POLL_INTERVAL = 1
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG") == "True"
@@ -66,6 +90,7 @@ INSTALLED_APPS = [
     'administrator',
     'Hotel',
     'payments',
+    'tasks',
 ]
 
 MIDDLEWARE = [
@@ -155,6 +180,20 @@ STATIC_URL = 'static/'
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = '/media/'
 
+# Los archivos subidos se guardan por contenido (sha256) y se deduplican (Hotel.storage)
+STORAGES = {
+    'default': {'BACKEND': 'Hotel.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Entrega de media por el servidor web: 'x-accel-redirect' (nginx), 'x-sendfile' o vacío (solo con DEBUG, desde Django)
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '')
+# Location `internal` de nginx que apunta a MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_LOCATION = os.getenv('MEDIA_ACCEL_REDIRECT_LOCATION', '/protected-media/')
+# Segundos de caché de los archivos que no son blobs (los blobs son inmutables)
+MEDIA_CACHE_MAX_AGE = 60 * 60
+# Tiempo que se conserva un blob sin referencias antes de borrarlo (collect_media_blobs)
+MEDIA_BLOB_GRACE_PERIOD = timedelta(days=1)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
@@ -181,4 +220,94 @@ if DEBUG:
 # CRONJOBS
 CRONJOBS = [
     ('59 23 * * *', 'payments.cron.verify_expiration_reservations'),
+    ('* * * * *', 'payments.cron.release_expired_holds'),
 ]
+
+# TASKS
+# Cola de tareas en la base de datos (tasks.queue, `manage.py run_tasks`)
+TASK_WORKER_CONCURRENCY = int(os.getenv('TASK_WORKER_CONCURRENCY', 4))
+TASK_POLL_INTERVAL = 1
+TASK_MAX_ATTEMPTS = 8
+# Segundos que un worker conserva una tarea tomada antes de que otro pueda retomarla
+TASK_LEASE_SECONDS = 300
+# Espera base y máxima (segundos) entre reintentos; se duplica en cada intento
+TASK_RETRY_BACKOFF = 5
+TASK_RETRY_MAX_DELAY = 60 * 60
+TASK_DONE_RETENTION = timedelta(days=7)
+
+# EMAIL
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'no-reply@hotels.local')
+
+# LOGGING
+# Los módulos de la aplicación registran con `logging.getLogger(__name__)`
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'default'},
+    },
+    'root': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'WARNING')},
+    'loggers': {
+        # Resumen periódico de las llamadas a Stripe
+        'payments.stripe_client': {'level': os.getenv('STRIPE_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# RESERVATIONS
+# Intentos y espera base (segundos) cuando la base de datos reporta contención al reservar
+RESERVATION_RETRY_ATTEMPTS = 5
+RESERVATION_RETRY_BACKOFF = 0.05
+# Segundos que se apartan las habitaciones de una reserva nueva mientras se paga
+RESERVATION_HOLD_TTL = 15 * 60
+# Filas por bloque en la expiración nocturna de reservas (payments.cron)
+RESERVATION_EXPIRY_CHUNK_SIZE = 1000
+# Segundos que es válida una cotización (reservations/quote/) y su `quote_token`
+RESERVATION_QUOTE_TTL = 10 * 60
+
+# HOTELS
+# Hoteles por bloque al exportar el catálogo completo (all_hotels/export/)
+HOTEL_EXPORT_CHUNK_SIZE = 200
+# Radio (km) de la primera caja al buscar los hoteles más cercanos sin radio (hotels_nearby/)
+NEARBY_HOTELS_INITIAL_RADIUS_KM = 10
+# Radio (km) máximo hasta el que se amplía esa caja; más lejos no se buscan hoteles (el mismo tope que `radius`)
+NEARBY_HOTELS_MAX_RADIUS_KM = 500
+# Backend de búsqueda de texto completo (hotels/?search=); sin definir, FTS5 en SQLite y
+# DatabaseSearchBackend (que no necesita FTS5) en las demás bases de datos
+HOTEL_SEARCH_BACKEND = os.getenv('HOTEL_SEARCH_BACKEND')
+# Variantes (tamaño máximo en px) que genera la cola de tareas de cada imagen, en WebP y JPEG
+IMAGE_VARIANTS = {
+    'thumbnail': (320, 240),
+    'medium': (1024, 768),
+}
+# Límites de las imágenes subidas: bytes y píxeles (ancho x alto)
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+
+
+# CACHE
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Con varios procesos usa una caché compartida (p. ej. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# y CACHE_LOCATION=redis://...) para que las invalidaciones lleguen a todos
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'hotels'),
+        'TIMEOUT': 300,
+    }
+}
+
+if CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        'CULL_FREQUENCY': 3,
+    }
+
+# Segundos que se guarda la representación serializada de un hotel (Hotel.cache)
+HOTEL_CACHE_TIMEOUT = int(os.getenv('HOTEL_CACHE_TIMEOUT', 60 * 60))
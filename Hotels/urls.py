@@ -15,11 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import routers
 from django.conf import settings
-from django.conf.urls.static import static
 from Hotel.views import HotelViewSet, ServicesHotelViewSet, ImageViewSet, RoomTypeViewSet
+from Hotel.media import serve_media
 
 
 # Api router
@@ -38,8 +38,6 @@ urlpatterns = [
     path("api/v1/", include(router.urls)),
     path("api/v1/", include("Hotel.urls")),
     path("api/v1/", include("payments.urls")),
+    # Media routes: only with DEBUG or MEDIA_SENDFILE (then the web server sends the bytes), 404 otherwise
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.*)$", serve_media, name="media"),
 ]
-
-# Server static files in development server
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,140 @@
+"""
+Benchmarks de los endpoints principales, ejecutados dentro del proceso (`manage.py run_benchmarks`).
+
+Cada endpoint se llama una vez en frío (caché vacía), `requests` veces para medir la latencia
+(p50/p95) y una vez más contando las consultas y otra con `tracemalloc` para el pico de memoria,
+de modo que la instrumentación no altere la latencia medida.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from authentication.models import Customer, Hotelier
+from Hotel.models import Hotel
+from payments.models import Reservation
+from payments.stripe_standin import sign_payload
+import json, time, tracemalloc
+
+WEBHOOK_SECRET = "whsec_benchmark"
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values: list, pct: float) -> float:
+    """
+    percentile([1, 2, 3, 4], 50) == 2\n
+    Percentil por rango más cercano.
+    """
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def measure(call, requests: int) -> dict:
+    """
+    Mide `call(index)`, que hace una petición y devuelve la respuesta.
+    """
+    def timed(index) -> float:
+        started = time.perf_counter()
+        response = call(index)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise BenchmarkError(f"{response.status_code}: {getattr(response, 'data', response.content)!r}")
+        return elapsed
+
+    first = timed(0)
+    latencies = [timed(index) for index in range(1, requests + 1)]
+
+    with CaptureQueriesContext(connection) as queries:
+        call(requests + 1)
+    # Se cuenta antes de la siguiente petición, que vacía el registro de consultas
+    query_count = len(queries)
+
+    tracemalloc.start()
+    try:
+        call(requests + 2)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "first_ms": round(first, 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "queries": query_count,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def endpoints() -> dict:
+    """
+    {nombre: call(index)} de los endpoints a medir, con datos tomados de la base de datos.
+    """
+    hotel_ids = [str(pk) for pk in Hotel.objects.order_by("pk").values_list("pk", flat=True)[:50]]
+    customer = Customer.objects.select_related("user").order_by().first()
+    hotelier = Hotelier.objects.select_related("user").order_by().first()
+    reservation_id = Reservation.objects.order_by().values_list("pk", flat=True).first()
+    if not hotel_ids or customer is None or hotelier is None:
+        raise BenchmarkError("The database has no hotels or users; run seed_data first.")
+
+    anonymous, as_customer, as_hotelier = APIClient(), APIClient(), APIClient()
+    as_customer.force_authenticate(customer.user)
+    as_hotelier.force_authenticate(hotelier.user)
+
+    def webhook(index):
+        # Cada petición es un evento nuevo, que se guarda para procesarse después
+        payload = json.dumps({
+            "object": "event", "id": f"evt_benchmark_{time.time_ns()}_{index}", "type": "payment_intent.succeeded",
+            "created": int(time.time()), "data": {"object": {
+                "object": "payment_intent", "id": f"pi_benchmark_{index}", "amount": 100000,
+                "metadata": {"order_id": str(reservation_id)},
+            }},
+        })
+        return anonymous.post(
+            "/api/v1/handle-payment-event/", payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, WEBHOOK_SECRET),
+        )
+
+    return {
+        "hotels/": lambda index: anonymous.get("/api/v1/hotels/"),
+        "all_hotels/": lambda index: anonymous.get("/api/v1/all_hotels/"),
+        "room_availability/": lambda index: anonymous.get("/api/v1/room_availability/", {
+            "id_hotel": hotel_ids[index % len(hotel_ids)], "date_from": "2030-04-01", "date_to": "2030-04-04",
+        }),
+        "reservations/ (customer)": lambda index: as_customer.get("/api/v1/reservations/"),
+        "reservations/ (hotelier)": lambda index: as_hotelier.get("/api/v1/reservations/", {"status": "RE"}),
+        "handle-payment-event/": webhook,
+    }
+
+
+def run(requests: int) -> dict:
+    results = {}
+    for name, call in endpoints().items():
+        cache.clear()
+        results[name] = measure(call, requests)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regresiones de `results` respecto a `baseline` (ambos con el formato de `run_benchmarks`):
+    p95 más de `tolerance` veces mayor o más consultas, por tamaño y endpoint.
+    """
+    regressions = []
+    baseline_sizes = {size["hotels"]: size for size in baseline.get("sizes", [])}
+    for size in results["sizes"]:
+        previous = baseline_sizes.get(size["hotels"])
+        if previous is None:
+            continue
+        for name, stats in size["endpoints"].items():
+            before = previous["endpoints"].get(name)
+            if before is None:
+                continue
+            if stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{size['hotels']} hotels, {name}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+            if stats["queries"] > before["queries"]:
+                regressions.append(f"{size['hotels']} hotels, {name}: queries {before['queries']} -> {stats['queries']}")
+    return regressions
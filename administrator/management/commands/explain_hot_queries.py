@@ -0,0 +1,99 @@
+from datetime import timedelta
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+from authentication.models import Customer, Hotelier
+from Hotel.models import Hotel, RoomType
+from Hotel.views import HotelSearchViewSet
+from payments.models import Reservation, RoomReservation, RoomNightInventory, StripeEvent
+from payments.views import ReservationReadOnlyViewSet
+from tasks.models import Task
+import uuid
+
+
+def view_queryset(viewset_class, user=None, **params):
+    """
+    El queryset filtrado que la vista arma para una petición GET con `params`.
+    """
+    request = Request(RequestFactory().get("/", params))
+    request.user = user or AnonymousUser()
+    view = viewset_class(request=request, format_kwarg=None, action="list", args=(), kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+def hot_queries() -> list[tuple[str, object]]:
+    """
+    (nombre, queryset) de las consultas más frecuentes, con valores tomados de la base de datos.
+    """
+    hotel = Hotel.objects.order_by().first()
+    room_type = RoomType.objects.order_by().first()
+    customer = Customer.objects.select_related("user").order_by().first()
+    hotelier = Hotelier.objects.select_related("user").order_by().first()
+    hotel_id = hotel.pk if hotel else uuid.uuid4()
+    room_type_id = room_type.pk if room_type else uuid.uuid4()
+    checkin = timezone.localdate() + timedelta(days=30)
+    checkout = checkin + timedelta(days=3)
+    now = timezone.now()
+
+    queries = [
+        ("hotels/ (page)", Hotel.objects.all()[:9]),
+        ("hotels/ of a hotelier", Hotel.objects.filter(hotelier_id=hotelier.pk if hotelier else uuid.uuid4())),
+        ("hotel_search/", view_queryset(
+            HotelSearchViewSet, city=hotel.city if hotel else "Cancún", date_from=checkin, date_to=checkout, guests=2,
+        )[:9]),
+        ("room_availability/", RoomType.objects.with_rooms_available(checkin, checkout).filter(hotel_id=hotel_id)),
+        ("hotel_room-type/ of a hotel", RoomType.objects.filter(hotel_id=hotel_id)),
+    ]
+    if customer:
+        queries.append(("reservations/ of a customer", view_queryset(ReservationReadOnlyViewSet, customer.user)[:9]))
+    if hotelier:
+        queries.append((
+            "reservations/?status=RE of a hotelier",
+            view_queryset(ReservationReadOnlyViewSet, hotelier.user, status="RE")[:9],
+        ))
+    queries += [
+        ("reservations to expire (payments.cron)", Reservation.objects.filter(
+            status="RE", checkout__lt=timezone.localdate()).values_list("id", flat=True)[:1000]),
+        ("expired holds (payments.cron.release_expired_holds)", Reservation.objects.filter(
+            status="PE", hold_expires_at__lt=now).values_list("id", flat=True)[:1000]),
+        ("booked rooms (inventory.count_booked_rooms)", RoomReservation.objects.filter(
+            customer_reservation__status__in=["PE", "RE"], customer_reservation__checkout__gt=timezone.localdate(),
+            room_type__isnull=False,
+        ).values_list("room_type_id", "rooms", "customer_reservation__checkin", "customer_reservation__checkout")),
+        ("reservations of a room type", RoomReservation.objects.filter(
+            room_type_id=room_type_id, customer_reservation__status="RE", customer_reservation__checkin__lt=checkout,
+            customer_reservation__checkout__gt=checkin,
+        )),
+        ("refund (charge.refunded)", Reservation.objects.filter(payment_intent="pi_0000000000")),
+        ("night inventory (inventory.reserve_rooms)", RoomNightInventory.objects.filter(
+            room_type_id=room_type_id, night__gte=checkin, night__lt=checkout, booked__lte=1)),
+        ("due tasks (tasks.queue.claim)", Task.objects.filter(
+            Q(status="PE") | Q(status="RU", locked_until__lt=now), run_at__lte=now).order_by("run_at", "id")[:4]),
+        ("done tasks (tasks.queue.purge_done)", Task.objects.filter(status="DO", updated_at__lt=now)),
+        ("due Stripe events (payments.events.claim_events)", StripeEvent.objects.filter(
+            Q(status="PE") | Q(status="RU", locked_until__lt=now), next_attempt_at__lte=now,
+        ).order_by("created", "received_at")[:100]),
+    ]
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the query plan (EXPLAIN / EXPLAIN QUERY PLAN on SQLite) of the hot queries of the API, "
+        "to check which indexes they use. Run it against a seeded database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sql", action="store_true", help="Also print the SQL of each query.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}, hotels: {Hotel.objects.count()}, reservations: {Reservation.objects.count()}")
+        for name, queryset in hot_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            if options["sql"]:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
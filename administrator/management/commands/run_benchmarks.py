@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from administrator.benchmarks import BenchmarkError, WEBHOOK_SECRET, compare, run
+from administrator.seed import flush, seed
+import django, json, platform, time
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database at each data size and benchmarks the main endpoints in-process, "
+        "writing p50/p95 latency, query counts and peak memory to a JSON file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[100, 1000],
+            help="Comma separated numbers of hotels, e.g. 100,1000,10000.",
+        )
+        parser.add_argument("--customers-per-hotel", type=int, default=5)
+        parser.add_argument("--reservations-per-customer", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark-results.json")
+        parser.add_argument("--baseline", default=None, help="Previous results to compare with.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 increase over the baseline (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        results = {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": options["seed"],
+            "requests": options["requests"],
+            "sizes": [],
+        }
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, DEBUG=False):
+                for hotels in options["sizes"]:
+                    results["sizes"].append(self.benchmark(hotels, options))
+        except BenchmarkError as err:
+            raise CommandError(f"Benchmark request failed: {err}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options["output"], "w") as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                regressions = compare(results, json.load(baseline), options["tolerance"])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def benchmark(self, hotels: int, options) -> dict:
+        flush()
+        started = time.perf_counter()
+        stats = seed(
+            hotels=hotels,
+            customers=hotels * options["customers_per_hotel"],
+            reservations_per_customer=options["reservations_per_customer"],
+            seed=options["seed"],
+        )
+        seed_seconds = time.perf_counter() - started
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{stats['hotels']} hotels, {stats['customers']} customers, {stats['reservations']} reservations "
+            f"(seeded in {seed_seconds:.1f}s)"
+        ))
+
+        endpoints = run(options["requests"])
+        for name, endpoint in endpoints.items():
+            self.stdout.write(
+                f"  {name:<28} p50 {endpoint['p50_ms']:>8.2f} ms  p95 {endpoint['p95_ms']:>8.2f} ms  "
+                f"{endpoint['queries']:>3} queries  peak {endpoint['peak_kib']:>9.1f} KiB"
+            )
+        return {**stats, "seed_seconds": round(seed_seconds, 2), "endpoints": endpoints}
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from administrator.seed import flush, seed
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates deterministic synthetic data: hotels with room types, services, images and coordinates, "
+        "and customers with reservations spread over several years."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hotels", type=int, default=1000)
+        parser.add_argument("--customers", type=int, default=5000)
+        parser.add_argument("--reservations-per-customer", type=int, default=5, help="Average reservations per customer.")
+        parser.add_argument("--years", type=int, default=3, help="Years of past reservations.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--flush", action="store_true", help="Delete the previously generated data first.")
+        parser.add_argument("--flush-only", action="store_true", help="Only delete the previously generated data.")
+
+    def handle(self, *args, **options):
+        if options["flush"] or options["flush_only"]:
+            self.stdout.write(f"Deleted {flush()} generated users and their data.")
+            if options["flush_only"]:
+                return
+
+        started = time.perf_counter()
+        stats = seed(
+            hotels=options["hotels"],
+            customers=options["customers"],
+            reservations_per_customer=options["reservations_per_customer"],
+            years=options["years"],
+            seed=options["seed"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{name}: {total}" for name, total in stats.items()) + f" in {time.perf_counter() - started:.1f}s."
+        ))
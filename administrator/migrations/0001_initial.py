@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Categoría de imagen',
+                'verbose_name_plural': 'Categorías de imágenes',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Services',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Nombre')),
+            ],
+            options={
+                'verbose_name': 'Servicio',
+            },
+        ),
+    ]
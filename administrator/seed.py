@@ -0,0 +1,188 @@
+"""
+Datos sintéticos para medir la API a escala (`manage.py seed_data`, `manage.py run_benchmarks`).
+
+Todo se inserta con `bulk_create`, así que no se envían señales: no se encolan cuentas de Stripe
+ni variantes de imágenes. Al terminar se reconstruyen el inventario por noche y el índice de
+búsqueda. Con la misma semilla se generan los mismos datos (incluidos los ids). Los usuarios
+generados tienen correos `seed-hotelier-<n>@example.com` y `seed-customer-<n>@example.com`
+(`EMAIL_PATTERN`), que es lo único que borra `flush`.
+
+Tampoco se vacía la caché, que puede ser compartida (clientes de Stripe, cotizaciones): solo se
+invalidan las entradas que cambian los datos generados (`invalidate_caches`).
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from authentication.models import CustomUser, Customer, Hotelier
+from administrator.models import Services, ImageCategory
+from Hotel.models import Hotel, LocationCoordinates, ServicesHotel, Image, RoomType
+from Hotel.cache import bump_catalog_version, bump_autocomplete_version, mark_changed
+from Hotel.search import get_search_backend
+from authentication.stripe_cache import forget_customer
+from payments.models import Reservation, RoomReservation
+from payments.inventory import rebuild_inventory
+import random, uuid
+
+EMAIL_PREFIX = "seed-"
+EMAIL_PATTERN = rf"^{EMAIL_PREFIX}(hotelier|customer)-[0-9]+@example\.com$"
+DESTINATIONS = [
+    ("Cancún", "Quintana Roo", 21.1619, -86.8515),
+    ("Playa del Carmen", "Quintana Roo", 20.6296, -87.0739),
+    ("Tulum", "Quintana Roo", 20.2114, -87.4654),
+    ("Mérida", "Yucatán", 20.9674, -89.5926),
+    ("Oaxaca de Juárez", "Oaxaca", 17.0732, -96.7266),
+    ("Puerto Vallarta", "Jalisco", 20.6534, -105.2253),
+    ("Guadalajara", "Jalisco", 20.6597, -103.3496),
+    ("Ciudad de México", "Ciudad de México", 19.4326, -99.1332),
+    ("San Miguel de Allende", "Guanajuato", 20.9144, -100.7452),
+    ("Los Cabos", "Baja California Sur", 22.8905, -109.9167),
+    ("Mazatlán", "Sinaloa", 23.2494, -106.4111),
+    ("Acapulco", "Guerrero", 16.8531, -99.8237),
+]
+SERVICES = ["Wifi", "Alberca", "Estacionamiento", "Gimnasio", "Spa", "Desayuno", "Bar", "Aire acondicionado"]
+IMAGE_CATEGORIES = ["Fachada", "Habitación", "Alberca", "Restaurante"]
+ROOM_TYPES = [("Sencilla", 1), ("Doble", 2), ("Familiar", 4), ("Suite", 2)]
+
+
+def seeded_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def invalidate_caches(user_ids=()) -> None:
+    """
+    Invalida lo que cambian las inserciones y borrados masivos, que no envían señales: las
+    representaciones de los hoteles (con la versión del catálogo, que forma parte de todas sus
+    llaves), el autocompletado, las marcas de los GET condicionales y los clientes de Stripe de `user_ids`.
+    """
+    bump_catalog_version()
+    bump_autocomplete_version()
+    for name in ("hotels", "reservations", "catalog"):
+        mark_changed(name)
+    for user_id in user_ids:
+        forget_customer(user_id)
+
+
+def flush() -> int:
+    """
+    Borra los datos generados por `seed`. Devuelve el número de usuarios borrados.
+    """
+    with transaction.atomic():
+        reservations = Reservation.objects.filter(customer__user__email__regex=EMAIL_PATTERN)
+        RoomReservation.objects.filter(customer_reservation__in=reservations).delete()
+        reservations.delete()
+        users = CustomUser.objects.filter(email__regex=EMAIL_PATTERN)
+        user_ids = list(users.values_list("id", flat=True))
+        users.delete()
+    get_search_backend().rebuild()
+    invalidate_caches(user_ids)
+    return len(user_ids)
+
+
+def seed(hotels: int, customers: int, reservations_per_customer: int = 5, years: int = 3, seed: int = 0,
+         batch_size: int = 1000) -> dict:
+    """
+    stats = seed(hotels=1000, customers=5000, seed=42)\n
+    Genera `hotels` hoteles (con tipos de habitación, servicios, imágenes y coordenadas) y
+    `customers` clientes con en promedio `reservations_per_customer` reservas repartidas desde hace
+    `years` años hasta el año siguiente.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    Services.objects.bulk_create([Services(name=name) for name in SERVICES], ignore_conflicts=True)
+    ImageCategory.objects.bulk_create([ImageCategory(name=name) for name in IMAGE_CATEGORIES], ignore_conflicts=True)
+    services = list(Services.objects.filter(name__in=SERVICES).order_by("name"))
+    categories = list(ImageCategory.objects.filter(name__in=IMAGE_CATEGORIES).order_by("name"))
+
+    with transaction.atomic():
+        hotelier_users = [
+            CustomUser(id=seeded_uuid(rng), email=f"{EMAIL_PREFIX}hotelier-{index}@example.com",
+                       username=f"{EMAIL_PREFIX}hotelier-{index}", password="!", is_hotelier=True, is_customer=False)
+            for index in range(max(1, hotels // 10))
+        ]
+        customer_users = [
+            CustomUser(id=seeded_uuid(rng), email=f"{EMAIL_PREFIX}customer-{index}@example.com",
+                       username=f"{EMAIL_PREFIX}customer-{index}", password="!")
+            for index in range(customers)
+        ]
+        CustomUser.objects.bulk_create(hotelier_users + customer_users, batch_size=batch_size)
+        Hotelier.objects.bulk_create([Hotelier(user=user) for user in hotelier_users], batch_size=batch_size)
+        Customer.objects.bulk_create([Customer(user=user) for user in customer_users], batch_size=batch_size)
+
+        hotel_rows, coordinates, hotel_services, images, room_types = [], [], [], [], []
+        for index in range(hotels):
+            city, state, latitude, longitude = rng.choice(DESTINATIONS)
+            hotel = Hotel(
+                id=seeded_uuid(rng), hotelier_id=rng.choice(hotelier_users).id, name=f"Hotel {city} {index}",
+                image=f"seed/hotels/{index}.jpg", description=f"Hotel de prueba en {city}, {state}.",
+                phone="9980000000", address=f"Calle {index}", city=city, state=state, rating=rng.randint(0, 5),
+            )
+            hotel_rows.append(hotel)
+            coordinates.append(LocationCoordinates(
+                hotel=hotel,
+                latitude=Decimal(latitude + rng.uniform(-0.2, 0.2)).quantize(Decimal("0.000001")),
+                longitude=Decimal(longitude + rng.uniform(-0.2, 0.2)).quantize(Decimal("0.000001")),
+            ))
+            hotel_services += [
+                ServicesHotel(id=seeded_uuid(rng), hotel=hotel, service=service, price=Decimal(rng.randint(0, 50) * 10 or 10))
+                for service in rng.sample(services, rng.randint(2, len(services)))
+            ]
+            images += [
+                Image(id=seeded_uuid(rng), hotel=hotel, category=category, image=f"seed/images/{index}-{position}.jpg")
+                for position, category in enumerate(rng.sample(categories, 3))
+            ]
+            room_types += [
+                RoomType(id=seeded_uuid(rng), hotel=hotel, type=name, capacity=capacity,
+                         price=Decimal(rng.randint(50, 500) * 10) + Decimal("0.99"), rooms=rng.randint(5, 30))
+                for name, capacity in rng.sample(ROOM_TYPES, rng.randint(1, len(ROOM_TYPES)))
+            ]
+
+        Hotel.objects.bulk_create(hotel_rows, batch_size=batch_size)
+        LocationCoordinates.objects.bulk_create(coordinates, batch_size=batch_size)
+        ServicesHotel.objects.bulk_create(hotel_services, batch_size=batch_size)
+        Image.objects.bulk_create(images, batch_size=batch_size)
+        RoomType.objects.bulk_create(room_types, batch_size=batch_size)
+
+        room_types_by_hotel = {}
+        for room_type in room_types:
+            room_types_by_hotel.setdefault(room_type.hotel_id, []).append(room_type)
+
+        reservations, bedrooms = [], []
+        first_day = today - timedelta(days=365 * years)
+        span = 365 * (years + 1)
+        for user in customer_users if hotels else []:
+            for _ in range(rng.randint(0, 2 * reservations_per_customer)):
+                hotel = rng.choice(hotel_rows)
+                checkin = first_day + timedelta(days=rng.randrange(span))
+                checkout = checkin + timedelta(days=rng.randint(1, 7))
+                if checkout <= today:
+                    status = rng.choices(["EX", "CA", "RF"], weights=[90, 7, 3])[0]
+                else:
+                    status = rng.choices(["RE", "FA", "CA"], weights=[80, 15, 5])[0]
+                reservation = Reservation(
+                    id=seeded_uuid(rng), hotel=hotel, customer_id=user.id, name=user.username, email=user.email,
+                    phone="9980000000", checkin=checkin, checkout=checkout, status=status,
+                )
+                amount = Decimal("0.00")
+                for room_type in rng.sample(room_types_by_hotel[hotel.id], min(2, len(room_types_by_hotel[hotel.id]))):
+                    rooms = rng.randint(1, 2)
+                    amount += room_type.price * rooms * (checkout - checkin).days
+                    bedrooms.append(RoomReservation(id=seeded_uuid(rng), customer_reservation=reservation, room_type=room_type, rooms=rooms))
+                if status != "FA":
+                    reservation.amount = amount
+                    reservation.payment_intent = f"pi_seed{reservation.id.hex[:20]}"
+                reservations.append(reservation)
+
+        Reservation.objects.bulk_create(reservations, batch_size=batch_size)
+        RoomReservation.objects.bulk_create(bedrooms, batch_size=batch_size)
+
+    nights = rebuild_inventory(today, batch_size=batch_size)
+    get_search_backend().rebuild()
+    invalidate_caches()
+    return {
+        "hotels": len(hotel_rows),
+        "room_types": len(room_types),
+        "customers": len(customer_users),
+        "reservations": len(reservations),
+        "inventory_nights": nights,
+    }
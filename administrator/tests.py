@@ -1,3 +1,73 @@
-from django.test import TestCase
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from authentication.models import CustomUser
+from Hotel.cache import get_versions
+from Hotel.models import Hotel
+from Hotel.tests_utils import create_customer, create_hotelier
+from payments.models import Reservation, RoomNightInventory
+from .benchmarks import WEBHOOK_SECRET, compare, percentile, run
+from .seed import flush, seed
 
 # Create your tests here.
+class MigrationsTests(TestCase):
+
+    def test_models_match_migrations(self):
+        # Falla si un cambio de esquema no trae su migración
+        call_command("makemigrations", "--check", "--dry-run", stdout=StringIO())
+
+
+class ExplainHotQueriesTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        create_hotelier()
+        create_customer()
+
+        out = StringIO()
+        call_command("explain_hot_queries", stdout=out)
+        for index in ("reservation_customer_idx", "reservation_status_out_idx", "room_type_hotel_capacity_idx", "task_status_run_at_idx"):
+            self.assertIn(index, out.getvalue())
+
+
+class SeedAndBenchmarkTests(TestCase):
+
+    def test_seed_is_deterministic(self):
+        stats = seed(hotels=5, customers=10, seed=7)
+        ids = set(Reservation.objects.values_list("id", flat=True))
+        self.assertEqual((stats["hotels"], Hotel.objects.count(), stats["reservations"]), (5, 5, len(ids)))
+        self.assertTrue(RoomNightInventory.objects.exists())
+
+        flush()
+        self.assertFalse(Reservation.objects.exists() or Hotel.objects.exists())
+        self.assertEqual(seed(hotels=5, customers=10, seed=7), stats)
+        self.assertEqual(set(Reservation.objects.values_list("id", flat=True)), ids)
+
+    def test_flush_keeps_real_users_and_the_cache(self):
+        seed(hotels=2, customers=3, seed=1)
+        real = CustomUser.objects.bulk_create([
+            CustomUser(email="seed-lover@gmail.com", username="seed-lover"),
+            CustomUser(email="seed-customer-1@example.com.mx", username="lookalike"),
+        ])
+        cache.set("stripe:customers:cus_real", {"id": "cus_real"})
+        catalog_version, _ = get_versions([])
+
+        self.assertEqual(flush(), 3 + 1)
+        self.assertEqual(set(CustomUser.objects.values_list("username", flat=True)), {user.username for user in real})
+        self.assertEqual(cache.get("stripe:customers:cus_real"), {"id": "cus_real"})
+        self.assertNotEqual(get_versions([])[0], catalog_version)
+
+    @override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+    def test_benchmark_results(self):
+        seed(hotels=3, customers=5, seed=1)
+        results = run(requests=3)
+        self.assertIn("handle-payment-event/", results)
+        for stats in results.values():
+            self.assertGreater(stats["queries"], 0)
+            self.assertLessEqual(stats["p50_ms"], stats["p95_ms"])
+
+        size = {"hotels": 3, "endpoints": {"hotels/": {"p95_ms": 10.0, "queries": 3}}}
+        slower = {"hotels": 3, "endpoints": {"hotels/": {"p95_ms": 20.0, "queries": 4}}}
+        self.assertEqual(compare({"sizes": [size]}, {"sizes": [size]}, 0.25), [])
+        self.assertEqual(len(compare({"sizes": [slower]}, {"sizes": [size]}, 0.25)), 2)
+        self.assertEqual((percentile([4, 1, 3, 2], 50), percentile([4, 1, 3, 2], 95)), (2, 4))
@@ -2,12 +2,12 @@ from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
+from tasks.queue import enqueue
+from .stripe_cache import cache_customer, retrieve_customer
 import stripe, uuid
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
 # Create your models here.
 def path_to_avatar(instance, filename):
     return f"avatars/{filename}"
@@ -34,39 +34,50 @@ class Hotelier(models.Model):
 
 User = get_user_model()
 
-@receiver(post_save, sender=User)
-def set_hotelier_as_staff(sender, instance, created, **kwargs):
-    if not created and getattr(instance, '_profile_created', False):
+@receiver(pre_save, sender=User)
+def set_user_roles(sender, instance, **kwargs):
+    if not instance._state.adding:
         return
 
-    if instance.is_hotelier and not hasattr(instance, 'hoteliers'):
+    if instance.is_hotelier:
         instance.is_customer = False
-        connect_account = create_connect_account(instance.id, instance.email)
-        if connect_account is not None:
-            Hotelier.objects.create(user=instance, connect_account=connect_account.id)
-        else:
-            Hotelier.objects.create(user=instance)
-    elif instance.is_customer and not hasattr(instance, 'customers'):
-        Customer.objects.create(user=instance)
+    elif instance.is_customer:
         instance.is_hotelier = False
         instance.is_staff = False
         instance.is_superuser = False
-        create_stripe_customer(instance.id, instance.email)
 
-    instance._profile_created = True
-    instance.save()
+
+@receiver(post_save, sender=User)
+def set_hotelier_as_staff(sender, instance, created, **kwargs):
+    """
+    Crea el perfil del usuario nuevo y encola la creación de su cuenta en Stripe, que se ejecuta
+    fuera de la petición (`tasks`) y solo si el registro se confirma.
+    """
+    if not created:
+        return
+
+    if instance.is_hotelier:
+        Hotelier.objects.create(user=instance)
+        enqueue("authentication.provision_connect_account", {"user_id": str(instance.id)})
+    elif instance.is_customer:
+        Customer.objects.create(user=instance)
+        enqueue("authentication.provision_stripe_customer", {"user_id": str(instance.id)})
 
 
-def create_stripe_customer(id, email):
+def create_stripe_customer(id, email, raise_errors=False):
     try:
         customer = stripe.Customer.create(
             id=id,
             email=email,
+            idempotency_key=f"customer-{id}",
         )
     except stripe.error.StripeError as e:
+        if raise_errors:
+            raise e
         print(f"Error creating client in Stripe: {e}")
         return
 
+    cache_customer(customer)
     return customer
 
 
@@ -77,7 +88,7 @@ def get_or_create_customer(request_user) -> tuple[stripe.Customer, bool]:
     create = False
     user_id = str(request_user.customers.user_id)
     try:
-        customer = stripe.Customer.retrieve(user_id)
+        customer = retrieve_customer(user_id)
     except stripe.error.InvalidRequestError:
         customer = create_stripe_customer(user_id, request_user.email)
         if customer:
@@ -95,6 +106,7 @@ def create_connect_account(id: str, email: str, raise_errors=False):
             country="MX",
             email=email,
             metadata={"hotelier_id": id},
+            idempotency_key=f"connect-account-{id}",
         )
     except Exception as err:
         if raise_errors:
@@ -104,7 +116,7 @@ def create_connect_account(id: str, email: str, raise_errors=False):
     return connect_account
 
 
-def get_or_create_connect_account(request_user) -> tuple[stripe.Account, bool]:
+def get_or_create_connect_account(request_user) -> tuple[str, bool]:
     """
     connect_account, create = get_or_create_connect_account(request.user)
     """
@@ -117,7 +129,8 @@ def get_or_create_connect_account(request_user) -> tuple[stripe.Account, bool]:
     except ValueError:
         connect_account = create_connect_account(user_id, request_user.email, True)
         if connect_account:
-            request_user.hoteliers.update(connect_account=connect_account).save()
+            connect_account = connect_account.id
+            Hotelier.objects.filter(user_id=user_id).update(connect_account=connect_account)
             create = True
         else:
             raise ValueError(f"An error occurred while trying to create connect account.")
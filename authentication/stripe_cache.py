@@ -0,0 +1,80 @@
+"""
+Caché local de los clientes de Stripe y de sus métodos de pago.
+
+Un cliente de Stripe no deja de existir salvo que se borre (`customer.deleted`), así que basta con
+consultarlo una vez por TTL. La lista de métodos de pago se invalida con los webhooks
+`setup_intent.*` y `payment_method.*` y cuando nosotros desvinculamos una tarjeta; el TTL solo cubre
+los eventos que no lleguen.
+
+Solo se guarda el contenido de los objetos (`to_dict()`), nunca el objeto de Stripe, que lleva la
+llave secreta con la que se pidió; al leerlos se reconstruyen con `construct_from` y usan la llave
+configurada en el proceso que los lee.
+"""
+from django.conf import settings
+from django.core.cache import cache
+import stripe
+
+
+def customer_key(customer_id) -> str:
+    return f"stripe:customers:{customer_id}"
+
+
+def payment_methods_key(customer_id) -> str:
+    return f"stripe:customers:{customer_id}:payment_methods"
+
+
+def cache_object(key: str, stripe_object: stripe.StripeObject, timeout: int) -> None:
+    cache.set(key, stripe_object.to_dict(), timeout=timeout)
+
+
+def cached_object(key: str, stripe_class):
+    """
+    stripe_class | None = cached_object(customer_key(customer_id), stripe.Customer)
+    """
+    values = cache.get(key)
+    return None if values is None else stripe_class.construct_from(values, None)
+
+
+def cache_customer(customer: stripe.Customer) -> None:
+    cache_object(customer_key(customer.id), customer, settings.STRIPE_CUSTOMER_CACHE_TIMEOUT)
+
+
+def retrieve_customer(customer_id) -> stripe.Customer:
+    """
+    Igual que `stripe.Customer.retrieve`, incluida la `InvalidRequestError` si no existe.
+    """
+    customer = cached_object(customer_key(customer_id), stripe.Customer)
+    if customer is None:
+        customer = stripe.Customer.retrieve(customer_id)
+        cache_customer(customer)
+    return customer
+
+
+def list_payment_methods(customer: stripe.Customer) -> stripe.ListObject:
+    key = payment_methods_key(customer.id)
+    payment_methods = cached_object(key, stripe.ListObject)
+    if payment_methods is None:
+        payment_methods = customer.list_payment_methods()
+        cache_object(key, payment_methods, settings.STRIPE_PAYMENT_METHODS_CACHE_TIMEOUT)
+    return payment_methods
+
+
+def retrieve_payment_method(customer: stripe.Customer, payment_method_id: str) -> stripe.PaymentMethod:
+    """
+    Busca primero en la lista en caché; si la tarjeta no está (o la lista no está en caché) la pide a Stripe.
+    """
+    payment_methods = cached_object(payment_methods_key(customer.id), stripe.ListObject)
+    if payment_methods is not None:
+        for payment_method in payment_methods.data:
+            if payment_method.id == payment_method_id:
+                return payment_method
+    return customer.retrieve_payment_method(payment_method_id)
+
+
+def invalidate_payment_methods(customer_id) -> None:
+    if customer_id:
+        cache.delete(payment_methods_key(customer_id))
+
+
+def forget_customer(customer_id) -> None:
+    cache.delete_many([customer_key(customer_id), payment_methods_key(customer_id)])
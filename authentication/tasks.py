@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils.translation import gettext as _
+from tasks.queue import task
+from .models import CustomUser, Hotelier, create_connect_account, create_stripe_customer
+from .stripe_cache import cache_customer
+import stripe
+
+
+@task("authentication.provision_connect_account")
+def provision_connect_account(user_id: str) -> None:
+    hotelier = Hotelier.objects.select_related("user").get(user_id=user_id)
+    if hotelier.connect_account:
+        return
+    # La llave de idempotencia hace que un reintento devuelva la misma cuenta en lugar de crear otra
+    connect_account = create_connect_account(user_id, hotelier.user.email, raise_errors=True)
+    Hotelier.objects.filter(user_id=user_id, connect_account__isnull=True).update(connect_account=connect_account.id)
+
+
+@task("authentication.provision_stripe_customer")
+def provision_stripe_customer(user_id: str) -> None:
+    user = CustomUser.objects.get(id=user_id)
+    try:
+        create_stripe_customer(user_id, user.email, raise_errors=True)
+    except stripe.error.InvalidRequestError as error:
+        # Ya se creó en un intento anterior (el id del cliente es el del usuario)
+        if error.code != "resource_already_exists":
+            raise
+        cache_customer(stripe.Customer.retrieve(user_id))
+
+
+@task("authentication.send_password_reset")
+def send_password_reset(email: str, token: str) -> None:
+    send_mail(
+        subject=_("Password reset"),
+        message=_("Use the token '%(token)s' to reset your password at %(url)s.") % {
+            "token": token, "url": f"{settings.URLFRONTEND}/reset-password/?token={token}",
+        },
+        from_email=None,
+        recipient_list=[email],
+    )
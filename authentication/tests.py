@@ -1,3 +1,75 @@
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from .models import CustomUser, Customer, get_or_create_customer
+from tasks.models import Task
+from .stripe_cache import (
+    customer_key, payment_methods_key, list_payment_methods, retrieve_customer, retrieve_payment_method,
+    invalidate_payment_methods,
+)
+import pickle, stripe
 
 # Create your tests here.
+class StripeCustomerCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.bulk_create([CustomUser(email="customer@example.com", username="customer")])[0]
+        Customer.objects.create(user=self.user)
+        self.customer = stripe.Customer.construct_from({"id": str(self.user.id), "object": "customer"}, "sk_test")
+        self.payment_methods = stripe.ListObject.construct_from({
+            "object": "list", "has_more": False, "url": f"/v1/customers/{self.user.id}/payment_methods",
+            "data": [{"id": "pm_1", "object": "payment_method", "customer": str(self.user.id)}],
+        }, "sk_test")
+
+    def test_customer_and_payment_methods_cached(self):
+        with mock.patch("stripe.Customer.retrieve", return_value=self.customer) as retrieve, \
+                mock.patch.object(stripe.Customer, "list_payment_methods", return_value=self.payment_methods) as listing:
+            for _ in range(3):
+                customer, created = get_or_create_customer(self.user)
+                self.assertFalse(created)
+                self.assertEqual(list_payment_methods(customer).data[0].id, "pm_1")
+                self.assertEqual(retrieve_payment_method(customer, "pm_1").id, "pm_1")
+            self.assertEqual((retrieve.call_count, listing.call_count), (1, 1))
+
+            invalidate_payment_methods(customer.id)
+            list_payment_methods(customer)
+            self.assertEqual((retrieve.call_count, listing.call_count), (1, 2))
+
+    def test_cache_holds_no_api_key(self):
+        with mock.patch("stripe.Customer.retrieve", return_value=self.customer), \
+                mock.patch.object(stripe.Customer, "list_payment_methods", return_value=self.payment_methods):
+            customer, created = get_or_create_customer(self.user)
+            list_payment_methods(customer)
+
+        for key in (customer_key(self.user.id), payment_methods_key(self.user.id)):
+            self.assertIsInstance(cache.get(key), dict)
+            self.assertNotIn(b"sk_test", pickle.dumps(cache.get(key)))
+        payment_method = retrieve_payment_method(retrieve_customer(self.user.id), "pm_1")
+        self.assertIsInstance(payment_method, stripe.PaymentMethod)
+        self.assertEqual(payment_method.customer, str(self.user.id))
+
+
+class SignUpTests(TestCase):
+
+    def test_signup_queues_stripe_provisioning(self):
+        with mock.patch("stripe.Customer.create") as create_customer, mock.patch("stripe.Account.create") as create_account:
+            for email, is_hotelier in (("customer@example.com", False), ("hotelier@example.com", True)):
+                response = self.client.post("/api/v1/auth/signup/", {
+                    "email": email, "username": email.split("@")[0], "password": "password123", "is_hotelier": is_hotelier,
+                })
+                self.assertEqual(response.status_code, 201)
+            create_customer.assert_not_called()
+            create_account.assert_not_called()
+
+        customer = CustomUser.objects.get(email="customer@example.com")
+        hotelier = CustomUser.objects.get(email="hotelier@example.com")
+        self.assertTrue(customer.is_customer and not customer.is_hotelier and hasattr(customer, "customers"))
+        self.assertTrue(hotelier.is_hotelier and not hotelier.is_customer and hasattr(hotelier, "hoteliers"))
+        self.assertEqual(
+            sorted(Task.objects.values_list("name", "payload")),
+            [
+                ("authentication.provision_connect_account", {"user_id": str(hotelier.id)}),
+                ("authentication.provision_stripe_customer", {"user_id": str(customer.id)}),
+            ],
+        )
@@ -1,4 +1,5 @@
 from django.contrib.auth import authenticate, login, logout
+from django.db import transaction
 from django.dispatch import receiver
 from rest_framework import status, generics
 from rest_framework.response import Response
@@ -6,6 +7,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django_rest_passwordreset.signals import reset_password_token_created
 from .serializers import UserSerializer
+from .tasks import send_password_reset
 
 # Create your views here.
 class UserDetailView(APIView):
@@ -38,8 +40,13 @@ class LogoutView(APIView):
 class SignUpView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        # El usuario, su perfil y la tarea de Stripe se confirman juntos
+        return super().create(request, *args, **kwargs)
+
 
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, *args, **kwargs):
-    # Aqui deberiamos mandar el correo al cliente
-    print(f"Recupera la contraseña del correo '{reset_password_token.user.email}' usando el token '{reset_password_token.key}' desde la API http://localhost:8000/api/auth/reset/confirm/.")
+    # El correo se envía desde la cola de tareas, fuera de la petición
+    send_password_reset.delay(email=reset_password_token.user.email, token=reset_password_token.key)
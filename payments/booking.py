@@ -0,0 +1,102 @@
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import transaction, OperationalError
+from django.utils import timezone
+from .models import Reservation, RoomReservation
+from .serializers import ReservationSerializer, QuotedReservationSerializer
+from .inventory import change_reservation_status, reserve_rooms, RoomsNotAvailable
+from .pricing import price_reservation
+import random, time
+
+
+def retry_on_contention(func):
+    """
+    Reintenta `func` cuando la base de datos reporta contención (bloqueo de SQLite, deadlock o
+    fallo de serialización en PostgreSQL), con espera exponencial y un número acotado de intentos.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = settings.RESERVATION_RETRY_ATTEMPTS
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError:
+                if attempt == attempts:
+                    raise
+                time.sleep(settings.RESERVATION_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+    return wrapper
+
+
+def hold_expires_at():
+    return timezone.now() + timedelta(seconds=settings.RESERVATION_HOLD_TTL)
+
+
+@retry_on_contention
+def create_reservation(customer_id: str, data: dict) -> tuple[bool, dict, dict]:
+    """
+    created: bool, data: serializer.data | serializer.errors, price: dict | None = create_reservation(customer_id, data)\n
+    La reserva y sus habitaciones se guardan en una sola transacción junto con el apartado de las
+    habitaciones: la reserva queda pendiente de pago (`PE`) hasta `RESERVATION_HOLD_TTL` segundos y
+    el inventario se consume de forma condicional, así que si no queda cupo se rechaza aquí, antes
+    de crear el intento de pago. Las líneas del mismo tipo de habitación se suman.
+    `price` es el de `pricing.price_reservation`, con los tipos de habitación que el serializer ya cargó.
+    """
+    data = data.copy()
+    data["customer"] = customer_id
+    serializer = ReservationSerializer(data=data)
+    if not serializer.is_valid():
+        return False, serializer.errors, None
+
+    # Todo lo que lee la base de datos va dentro de la transacción: si `retry_on_contention` reintenta,
+    # no debe quedar una reserva ya confirmada de un intento anterior
+    try:
+        with transaction.atomic():
+            reservation = serializer.save(status="PE", hold_expires_at=hold_expires_at())
+            reserve_rooms(reservation)
+            validated_data = serializer.validated_data
+            price = price_reservation(validated_data["checkin"], validated_data["checkout"], validated_data["bedrooms"])
+            return True, serializer.data, price
+    except RoomsNotAvailable as err:
+        return False, {"detail": str(err)}, None
+
+
+@retry_on_contention
+def confirm_reservation(reservation_id, **fields):
+    """
+    reservation = confirm_reservation(order_id, payment_intent="pi_...", amount=1500)\n
+    Pasa la reserva a `RE`. Si sigue apartada (`PE`) sus habitaciones ya están en el inventario; si
+    el apartado venció y se liberó, se vuelven a consumir y se lanza `RoomsNotAvailable` cuando
+    otra reserva se quedó con las últimas habitaciones.
+    """
+    return change_reservation_status(reservation_id, "RE", hold_expires_at=None, **fields)
+
+
+@retry_on_contention
+def create_reservation_from_quote(customer_id: str, data: dict) -> tuple[bool, dict, dict]:
+    """
+    created: bool, data: serializer.data | serializer.errors, price: dict | None = create_reservation_from_quote(customer_id, data)\n
+    data => {"quote_token": "...", "name": "username", "email": "user@email.com", "phone": "9133455783"}\n
+    Crea la reserva con el hotel, las fechas, las habitaciones y el precio de la cotización, sin
+    volver a consultar los precios. Las habitaciones se apartan igual que en `create_reservation`.
+    """
+    serializer = QuotedReservationSerializer(data=data)
+    if not serializer.is_valid():
+        return False, serializer.errors, None
+
+    contact = serializer.validated_data.copy()
+    quote = contact.pop("quote_token")
+    try:
+        with transaction.atomic():
+            reservation = Reservation.objects.create(
+                hotel_id=quote["hotel"], customer_id=customer_id, checkin=quote["checkin"], checkout=quote["checkout"],
+                status="PE", hold_expires_at=hold_expires_at(), **contact,
+            )
+            RoomReservation.objects.bulk_create([
+                RoomReservation(customer_reservation=reservation, room_type_id=room["room_type"], rooms=room["rooms"])
+                for room in quote["bedrooms"]
+            ])
+            reserve_rooms(reservation)
+            return True, ReservationSerializer(reservation).data, quote["price"]
+    except RoomsNotAvailable as err:
+        return False, {"detail": str(err)}, None
@@ -1,15 +1,71 @@
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from .models import Reservation
+from .models import Reservation, RoomNightInventory
+from .inventory import release_hold
+import logging, time
 
-def verify_expiration_reservations():
-    expired_reservations = Reservation.objects.filter(checkout__lt=timezone.now())
+logger = logging.getLogger(__name__)
 
-    for reservation in expired_reservations:
-        room_reservations = reservation.bedrooms.all()
 
-        for room_reservation in room_reservations:
-            room_reservation.status = "EX"
-            room_reservation.save(update_fields=['status'])
+def verify_expiration_reservations(chunk_size: int = None) -> dict:
+    """
+    stats = verify_expiration_reservations()\n
+    Marca como expiradas (`EX`) las reservas activas cuya fecha de salida ya pasó y elimina del
+    inventario las noches anteriores a hoy. Todo se hace con UPDATE/DELETE por bloques de
+    `chunk_size` filas, cada bloque en su propia transacción, para que los bloqueos sean cortos.
+    Es idempotente: una segunda ejecución no encuentra filas que tocar.
 
-        reservation.status = "EX"
-        reservation.save(update_fields=['status'])
+    Las reservas expiradas solo ocupan noches pasadas, así que en lugar de descontarlas del
+    inventario una por una basta con descartar esas noches, que ya no se consultan.
+    """
+    chunk_size = chunk_size or settings.RESERVATION_EXPIRY_CHUNK_SIZE
+    today = timezone.localdate()
+    started = time.monotonic()
+
+    expired = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Reservation.objects.filter(status="RE", checkout__lt=today).values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            expired += Reservation.objects.filter(id__in=ids, status="RE").update(status="EX", updated_at=timezone.now())
+
+    pruned = 0
+    while True:
+        with transaction.atomic():
+            ids = list(RoomNightInventory.objects.filter(night__lt=today).values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            pruned += RoomNightInventory.objects.filter(id__in=ids).delete()[0]
+
+    stats = {"expired": expired, "inventory_pruned": pruned, "elapsed": round(time.monotonic() - started, 3)}
+    logger.info("Expired %(expired)s reservations and pruned %(inventory_pruned)s inventory nights in %(elapsed)ss", stats)
+    return stats
+
+
+def release_expired_holds(chunk_size: int = None) -> dict:
+    """
+    stats = release_expired_holds()\n
+    Libera las habitaciones de las reservas que siguen pendientes de pago (`PE`) después de
+    `hold_expires_at` y las marca como fallidas (`FA`). Cada reserva se libera en su propia
+    transacción con `inventory.release_hold`, que no toca las que el pago ya confirmó.
+    """
+    chunk_size = chunk_size or settings.RESERVATION_EXPIRY_CHUNK_SIZE
+    started = time.monotonic()
+
+    released = 0
+    while True:
+        ids = list(
+            Reservation.objects.filter(status="PE", hold_expires_at__lt=timezone.now())
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        released += sum(release_hold(reservation_id) for reservation_id in ids)
+
+    stats = {"released": released, "elapsed": round(time.monotonic() - started, 3)}
+    logger.info("Released %(released)s expired room holds in %(elapsed)ss", stats)
+    return stats
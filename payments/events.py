@@ -0,0 +1,196 @@
+"""
+Almacén y procesamiento de los eventos del webhook de Stripe.
+
+El webhook solo verifica la firma y guarda el evento (`store_event`); el id del evento es la llave
+primaria, así que los reintentos y entregas duplicadas de Stripe no se procesan dos veces. Los
+eventos guardados los procesa `manage.py process_stripe_events` por lotes, en el orden en que Stripe
+los creó. Un evento que falla se reintenta con backoff exponencial y después de
+`STRIPE_EVENT_MAX_ATTEMPTS` queda como `DE` (dead letter); `manage.py replay_stripe_events` los
+vuelve a encolar. Los manejadores deben ser idempotentes: un evento puede procesarse otra vez al
+reintentarlo o al repetirlo.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from authentication.stripe_cache import invalidate_payment_methods, forget_customer
+from tasks.queue import retry_delay
+from .models import Reservation, StripeEvent
+from .inventory import change_reservation_status, RoomsNotAvailable
+from .booking import confirm_reservation
+import logging, stripe, traceback
+
+logger = logging.getLogger(__name__)
+
+handlers = {}
+
+
+def handles(*event_types: str):
+    """
+    Registra el manejador de uno o más tipos de evento; `"setup_intent.*"` abarca todo el grupo.
+    """
+    def decorator(func):
+        for event_type in event_types:
+            handlers[event_type] = func
+        return func
+    return decorator
+
+
+def get_handler(event_type: str):
+    return handlers.get(event_type) or handlers.get(f"{event_type.split('.')[0]}.*")
+
+
+def store_event(event: stripe.Event) -> bool:
+    """
+    stored = store_event(event)\n
+    Guarda el evento si no se había recibido antes. Devuelve si es nuevo.
+    """
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                id=event.id,
+                type=event.type,
+                payload=event.to_dict(),
+                created=datetime.fromtimestamp(event.created, tz=dt_timezone.utc),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def claim_events(limit: int) -> list[StripeEvent]:
+    """
+    Toma hasta `limit` eventos vencidos (pendientes o con la concesión expirada), los más antiguos primero.
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.STRIPE_EVENT_LEASE_SECONDS)
+    claimable = Q(status="PE") | Q(status="RU", locked_until__lt=now)
+    ids = list(
+        StripeEvent.objects.filter(claimable, next_attempt_at__lte=now)
+        .order_by("created", "received_at").values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+
+    # Si otro proceso tomó alguno entre la lectura y la actualización, la condición lo excluye
+    StripeEvent.objects.filter(claimable, id__in=ids).update(
+        status="RU", locked_until=locked_until, attempts=F("attempts") + 1,
+    )
+    return list(StripeEvent.objects.filter(id__in=ids, status="RU", locked_until=locked_until).order_by("created", "received_at"))
+
+
+def process_event(stored: StripeEvent) -> bool:
+    """
+    Ejecuta el manejador de un evento ya tomado y registra el resultado. Devuelve si terminó bien.
+    """
+    lease = StripeEvent.objects.filter(pk=stored.pk, status="RU", locked_until=stored.locked_until)
+    handler = get_handler(stored.type)
+    try:
+        if handler is None:
+            logger.info("Stripe event %s not handled: %s", stored.id, stored.type)
+        else:
+            handler(stripe.Event.construct_from(stored.payload, stripe.api_key))
+    except Exception as error:
+        dead = stored.attempts >= settings.STRIPE_EVENT_MAX_ATTEMPTS
+        logger.log(
+            logging.ERROR if dead else logging.WARNING,
+            "Stripe event %s %s failed (attempt %s/%s): %s",
+            stored.id, stored.type, stored.attempts, settings.STRIPE_EVENT_MAX_ATTEMPTS, error,
+        )
+        lease.update(
+            status="DE" if dead else "PE",
+            next_attempt_at=timezone.now() + retry_delay(stored.attempts),
+            locked_until=None,
+            last_error="".join(traceback.format_exception(error))[-4000:],
+        )
+        return False
+
+    lease.update(status="DO", locked_until=None, processed_at=timezone.now(), last_error="")
+    return True
+
+
+def process_events(batch_size: int = None) -> tuple[int, int]:
+    """
+    processed, failed = process_events()\n
+    Procesa un lote de eventos, uno tras otro en el orden en que Stripe los creó.
+    """
+    processed = failed = 0
+    for stored in claim_events(batch_size or settings.STRIPE_EVENT_BATCH_SIZE):
+        if process_event(stored):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
+
+
+def replay_events(since=None, until=None, event_type: str = None, statuses=None) -> int:
+    """
+    replayed = replay_events(since=datetime(2024, 4, 1, tzinfo=utc), statuses=["DE"])\n
+    Vuelve a encolar los eventos creados en Stripe dentro del rango, con sus intentos en cero.
+    """
+    events = StripeEvent.objects.exclude(status="RU")
+    if since is not None:
+        events = events.filter(created__gte=since)
+    if until is not None:
+        events = events.filter(created__lt=until)
+    if event_type:
+        events = events.filter(type=event_type)
+    if statuses:
+        events = events.filter(status__in=statuses)
+    return events.update(status="PE", attempts=0, next_attempt_at=timezone.now(), locked_until=None)
+
+
+@handles("payment_intent.succeeded")
+def confirm_payment(event: stripe.Event) -> None:
+    payment_intent = event.data.object
+    order_id = payment_intent.metadata["order_id"]
+    payment = {"payment_intent": payment_intent.id, "amount": payment_intent.amount / 100}
+    if Reservation.objects.filter(Q(payment_intent=payment_intent.id) | Q(status="RF"), id=order_id).exists():
+        # Ya se aplicó este pago o ya se reembolsó (reintento fuera de orden o replay); no se debe
+        # reactivar una reserva reembolsada
+        return
+    try:
+        confirm_reservation(order_id, **payment)
+    except RoomsNotAvailable:
+        # El apartado venció antes del pago y otra reserva se quedó con las últimas habitaciones
+        stripe.Refund.create(payment_intent=payment_intent.id, idempotency_key=f"refund-{payment_intent.id}")
+        change_reservation_status(order_id, "RF", **payment)
+
+
+@handles("charge.refunded")
+def refund_payment(event: stripe.Event) -> None:
+    """
+    Marca la reserva como reembolsada junto con el `payment_intent`, aunque su pago todavía no se
+    haya aplicado: si `payment_intent.succeeded` falló y se reintenta después de este evento, ya no
+    la confirma. Por eso se busca por `metadata.order_id` (el cargo hereda los metadatos del
+    PaymentIntent) y solo si no lo trae, por `payment_intent`.
+    """
+    charge = event.data.object
+    if not charge.refunded:
+        return
+    metadata = getattr(charge, "metadata", None)
+    if metadata is not None and "order_id" in metadata:
+        reservation = Reservation.objects.filter(id=metadata["order_id"]).first()
+    else:
+        reservation = Reservation.objects.filter(payment_intent=charge.payment_intent).first()
+    if reservation is not None:
+        change_reservation_status(reservation.id, "RF", payment_intent=charge.payment_intent)
+
+
+@handles("setup_intent.*")
+def refresh_setup_intent_customer(event: stripe.Event) -> None:
+    invalidate_payment_methods(event.data.object.customer)
+
+
+@handles("payment_method.*")
+def refresh_payment_method_customer(event: stripe.Event) -> None:
+    payment_method = event.data.object
+    # Al desvincularse, el cliente solo queda en `previous_attributes`
+    previous = getattr(event.data, "previous_attributes", None)
+    invalidate_payment_methods(payment_method.customer or getattr(previous, "customer", None))
+
+
+@handles("customer.deleted")
+def delete_customer(event: stripe.Event) -> None:
+    forget_customer(event.data.object.id)
@@ -0,0 +1,166 @@
+from collections import Counter
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from .models import Reservation, RoomReservation, RoomNightInventory
+
+# Estados que ocupan inventario: apartada mientras se paga (`PE`) y confirmada (`RE`)
+HOLDING_STATUSES = ("PE", "RE")
+
+
+class RoomsNotAvailable(Exception):
+    """
+    No quedan suficientes habitaciones del tipo `room_type` en alguna noche de la estancia.
+    """
+
+    def __init__(self, room_type):
+        self.room_type = room_type
+        super().__init__(f"The room type `{room_type}` does not have enough rooms.")
+
+
+def stay_nights(checkin, checkout) -> list:
+    """
+    stay_nights(date(2024, 4, 1), date(2024, 4, 3)) -> [date(2024, 4, 1), date(2024, 4, 2)]
+    """
+    return [checkin + timedelta(days=day) for day in range((checkout - checkin).days)]
+
+
+def requested_rooms(bedrooms: list) -> Counter:
+    """
+    requested_rooms([{"room_type": room_type, "rooms": 3}, {"room_type": room_type.id, "rooms": 3}]) -> Counter({room_type.id: 6})\n
+    Suma las habitaciones pedidas por tipo; `room_type` puede venir como instancia o como id.
+    """
+    rooms = Counter()
+    for room in bedrooms:
+        rooms[getattr(room["room_type"], "pk", room["room_type"])] += room["rooms"]
+    return rooms
+
+
+def reserve_rooms(reservation: Reservation) -> None:
+    """
+    Suma las habitaciones de la reserva al inventario de cada noche de la estancia.
+
+    El incremento es condicional (`booked <= rooms - pedidas`), así que dos reservas concurrentes
+    nunca pueden sobrevender una noche. Si alguna noche no tiene cupo se lanza `RoomsNotAvailable`
+    y la transacción del llamador deshace los incrementos ya hechos.
+    """
+    nights = stay_nights(reservation.checkin, reservation.checkout)
+    for bedroom in reservation.bedrooms.exclude(room_type=None).select_related("room_type"):
+        RoomNightInventory.objects.bulk_create(
+            [RoomNightInventory(room_type_id=bedroom.room_type_id, night=night) for night in nights],
+            ignore_conflicts=True,
+        )
+        updated = RoomNightInventory.objects.filter(
+            room_type_id=bedroom.room_type_id,
+            night__gte=reservation.checkin,
+            night__lt=reservation.checkout,
+            booked__lte=bedroom.room_type.rooms - bedroom.rooms,
+        ).update(booked=F("booked") + bedroom.rooms)
+        if updated != len(nights):
+            raise RoomsNotAvailable(bedroom.room_type)
+
+
+def release_rooms(reservation: Reservation) -> None:
+    """
+    Resta las habitaciones de la reserva del inventario de cada noche de la estancia.
+    """
+    for bedroom in reservation.bedrooms.exclude(room_type=None):
+        RoomNightInventory.objects.filter(
+            room_type_id=bedroom.room_type_id, night__gte=reservation.checkin, night__lt=reservation.checkout
+        ).update(booked=Greatest(F("booked") - bedroom.rooms, Value(0)))
+
+
+def change_reservation_status(reservation_id, new_status: str, **fields) -> Reservation:
+    """
+    reservation = change_reservation_status(order_id, "RE", payment_intent="pi_...", amount=1500)\n
+    Cambia el estado de la reserva y mantiene el inventario cuando la reserva entra o sale de
+    `HOLDING_STATUSES`: al cancelarla (`CA`), reembolsarla (`RF`) o vencer su apartado (`FA`) sus
+    habitaciones vuelven a quedar libres. Pasar de `PE` a `RE` no toca el inventario.
+    """
+    with transaction.atomic():
+        reservation = Reservation.objects.select_for_update().get(id=reservation_id)
+        previous_status = reservation.status
+        for field, value in fields.items():
+            setattr(reservation, field, value)
+        reservation.status = new_status
+        reservation.save()
+
+        holding, will_hold = previous_status in HOLDING_STATUSES, new_status in HOLDING_STATUSES
+        if not holding and will_hold:
+            reserve_rooms(reservation)
+        elif holding and not will_hold:
+            release_rooms(reservation)
+
+    return reservation
+
+
+def release_hold(reservation_id) -> bool:
+    """
+    released = release_hold(order_id)\n
+    Libera las habitaciones apartadas de una reserva que sigue pendiente de pago (`PE`) y la marca
+    como fallida (`FA`). No hace nada si el pago ya la confirmó. Devuelve si la liberó.
+    """
+    with transaction.atomic():
+        reservation = Reservation.objects.select_for_update().filter(id=reservation_id, status="PE").first()
+        if reservation is None:
+            return False
+        reservation.status = "FA"
+        reservation.hold_expires_at = None
+        reservation.save(update_fields=["status", "hold_expires_at", "updated_at"])
+        release_rooms(reservation)
+    return True
+
+
+def count_booked_rooms(since) -> Counter:
+    """
+    Calcula desde las reservas activas y apartadas las habitaciones ocupadas por (room_type_id, night) a partir de `since`.
+    """
+    booked = Counter()
+    bedrooms = RoomReservation.objects.filter(
+        customer_reservation__status__in=HOLDING_STATUSES,
+        customer_reservation__checkout__gt=since,
+        room_type__isnull=False,
+    ).values_list("room_type_id", "rooms", "customer_reservation__checkin", "customer_reservation__checkout")
+
+    for room_type_id, rooms, checkin, checkout in bedrooms.iterator():
+        for night in stay_nights(max(checkin, since), checkout):
+            booked[(room_type_id, night)] += rooms
+
+    return booked
+
+
+def rebuild_inventory(since, batch_size: int = 1000) -> int:
+    """
+    Reconstruye el inventario a partir de `since` usando las reservas activas y apartadas. Devuelve las filas escritas.
+    """
+    booked = count_booked_rooms(since)
+    with transaction.atomic():
+        RoomNightInventory.objects.filter(night__gte=since).delete()
+        RoomNightInventory.objects.bulk_create(
+            [
+                RoomNightInventory(room_type_id=room_type_id, night=night, booked=rooms)
+                for (room_type_id, night), rooms in booked.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(booked)
+
+
+def verify_inventory(since) -> list[tuple]:
+    """
+    Devuelve las diferencias [(room_type_id, night, expected, stored)] entre el inventario y las reservas activas y apartadas.
+    """
+    expected = count_booked_rooms(since)
+    stored = {
+        (room_type_id, night): rooms
+        for room_type_id, night, rooms in RoomNightInventory.objects.filter(night__gte=since)
+        .values_list("room_type_id", "night", "booked")
+        .iterator()
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys(), key=lambda item: (str(item[0]), item[1])):
+        if expected.get(key, 0) != stored.get(key, 0):
+            mismatches.append((key[0], key[1], expected.get(key, 0), stored.get(key, 0)))
+    return mismatches
@@ -0,0 +1,95 @@
+"""
+Reservas concurrentes contra un solo tipo de habitación (`manage.py booking_load_test` y las pruebas).
+
+Cada reserva se crea con `booking.create_reservation`, que aparta las habitaciones o la rechaza, y
+se confirma con `booking.confirm_reservation`, como lo haría el webhook al recibir el pago. Una
+confirmación sin cupo sería un cobro que hay que reembolsar, así que se cuenta como `refunded`.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from datetime import timedelta
+from django.db import connection, OperationalError
+from django.utils import timezone
+from authentication.models import CustomUser, Customer, Hotelier
+from Hotel.models import Hotel, RoomType
+from .booking import create_reservation, confirm_reservation
+from .inventory import RoomsNotAvailable, count_booked_rooms
+import random, time, uuid
+
+
+def create_fixtures(rooms: int) -> tuple:
+    """
+    hotel, room_type, customer = create_fixtures(rooms=20)
+    """
+    # bulk_create no envía `post_save`, así que no se crean cuentas en Stripe para estos usuarios
+    suffix = uuid.uuid4().hex[:8]
+    hotelier_user, customer_user = CustomUser.objects.bulk_create([
+        CustomUser(email=f"load-test-hotelier-{suffix}@example.com", username=f"load-test-hotelier-{suffix}",
+                   is_hotelier=True, is_customer=False),
+        CustomUser(email=f"load-test-customer-{suffix}@example.com", username=f"load-test-customer-{suffix}"),
+    ])
+    customer = Customer.objects.create(user=customer_user)
+    hotel = Hotel.objects.create(
+        hotelier=Hotelier.objects.create(user=hotelier_user), name=f"Load test {suffix}", image="images/load-test.jpg",
+        description="Load test", phone="0000000000", address="Load test", city="Load test", state="Load test", rating=0,
+    )
+    room_type = RoomType.objects.create(hotel=hotel, type="Load test", capacity=2, price="100.00", rooms=rooms)
+    return hotel, room_type, customer
+
+
+def run_bookings(room_type: RoomType, customer: Customer, bookings: int, threads: int, nights: int = 3,
+                 max_rooms_per_booking: int = 2, seed: int = None) -> dict:
+    """
+    result = run_bookings(room_type, customer, bookings=300, threads=16)\n
+    result => {
+        "outcomes": Counter({"confirmed": 30, "rejected": 270}),   # también "refunded" y "contention_exhausted"
+        "elapsed": 1.52,
+        "booked": {date(2025, 4, 1): 20, ...},      # habitaciones ocupadas por noche según las reservas
+        "oversold": {},                             # noches con más habitaciones que `room_type.rooms`
+        "ledger_drift": {},                         # noches donde el inventario no coincide con las reservas
+    }
+    """
+    rng = random.Random(seed)
+    checkin = timezone.localdate() + timedelta(days=365)
+    checkout = checkin + timedelta(days=nights)
+    requested = [rng.randint(1, max_rooms_per_booking) for _ in range(bookings)]
+
+    def book(index):
+        payload = {
+            "hotel": str(room_type.hotel_id),
+            "name": f"Load test {index}",
+            "email": f"load-test-{index}@example.com",
+            "phone": "0000000000",
+            "checkin": checkin.isoformat(),
+            "checkout": checkout.isoformat(),
+            "bedrooms": [{"room_type": str(room_type.id), "rooms": requested[index]}],
+        }
+        try:
+            created, data, _ = create_reservation(str(customer.user_id), payload)
+            if not created:
+                return "rejected"
+            confirm_reservation(data["id"])
+            return "confirmed"
+        except RoomsNotAvailable:
+            return "refunded"
+        except OperationalError:
+            return "contention_exhausted"
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        outcomes = Counter(executor.map(book, range(bookings)))
+    elapsed = time.perf_counter() - started
+
+    booked = {night: rooms for (rt_id, night), rooms in count_booked_rooms(checkin).items() if rt_id == room_type.id}
+    ledger = dict(room_type.night_inventory.values_list("night", "booked"))
+    return {
+        "outcomes": outcomes,
+        "elapsed": elapsed,
+        "booked": booked,
+        "oversold": {night: rooms for night, rooms in booked.items() if rooms > room_type.rooms},
+        "ledger_drift": {
+            night: (rooms, ledger.get(night, 0)) for night, rooms in booked.items() if ledger.get(night, 0) != rooms
+        },
+    }
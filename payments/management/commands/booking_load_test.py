@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from payments.load_test import create_fixtures, run_bookings
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires parallel bookings (create + payment confirmation) against a single room type in a "
+        "throwaway test database, checks that no night was oversold or refunded and reports the throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=300)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--rooms", type=int, default=20, help="Rooms of the room type under test.")
+        parser.add_argument("--nights", type=int, default=3)
+        parser.add_argument("--max-rooms-per-booking", type=int, default=2)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            _, room_type, customer = create_fixtures(options["rooms"])
+            result = run_bookings(
+                room_type, customer, bookings=options["bookings"], threads=options["threads"],
+                nights=options["nights"], max_rooms_per_booking=options["max_rooms_per_booking"], seed=options["seed"],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"Bookings: {options['bookings']} on {options['threads']} threads in {result['elapsed']:.2f}s "
+                          f"({options['bookings'] / result['elapsed']:.1f} bookings/s)")
+        for outcome, total in sorted(result["outcomes"].items()):
+            self.stdout.write(f"  {outcome}: {total}")
+        self.stdout.write(f"Rooms booked per night (capacity {room_type.rooms}): "
+                          + ", ".join(f"{night}={rooms}" for night, rooms in sorted(result["booked"].items())))
+
+        if result["oversold"]:
+            raise CommandError(f"Oversold nights: {result['oversold']}")
+        if result["ledger_drift"]:
+            raise CommandError(f"Inventory does not match the confirmed reservations: {result['ledger_drift']}")
+        if result["outcomes"]["refunded"]:
+            raise CommandError(f"{result['outcomes']['refunded']} bookings were charged without rooms and refunded.")
+        self.stdout.write(self.style.SUCCESS("No oversold nights and no refunds."))
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from payments.events import process_events
+import signal, time
+
+
+class Command(BaseCommand):
+    help = "Processes the stored Stripe webhook events in order, by batches, until stopped (or until drained with --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Defaults to STRIPE_EVENT_BATCH_SIZE.")
+        parser.add_argument("--poll-interval", type=float, default=None, help="Seconds to wait when there are no events.")
+        parser.add_argument("--once", action="store_true", help="Exit when there are no due events left.")
+
+    def handle(self, *args, **options):
+        poll_interval = options["poll_interval"] if options["poll_interval"] is not None else settings.STRIPE_EVENT_POLL_INTERVAL
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+
+        processed = failed = 0
+        while not self.stopping:
+            batch = process_events(options["batch_size"])
+            processed += batch[0]
+            failed += batch[1]
+            if not any(batch):
+                if options["once"]:
+                    break
+                close_old_connections()
+                time.sleep(poll_interval)
+
+        self.stdout.write(self.style.SUCCESS(f"Stripe events: {processed} processed, {failed} failed."))
+
+    def stop(self, signum, frame):
+        # Termina el lote en curso y sale
+        self.stopping = True
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.inventory import rebuild_inventory, verify_inventory
+
+
+class Command(BaseCommand):
+    help = "Rebuilds (or verifies with --verify) the per-night room inventory from the active reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=lambda value: timezone.datetime.strptime(value, "%Y-%m-%d").date(),
+            default=None,
+            help="First night to rebuild/verify, YYYY-MM-DD. Defaults to today.",
+        )
+        parser.add_argument("--verify", action="store_true", help="Only compare the inventory, do not write.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = options["since"] or timezone.localdate()
+
+        if options["verify"]:
+            mismatches = verify_inventory(since)
+            for room_type_id, night, expected, stored in mismatches:
+                self.stdout.write(f"{room_type_id} {night}: expected {expected}, stored {stored}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} inventory nights do not match the reservations.")
+            self.stdout.write(self.style.SUCCESS(f"Inventory is consistent since {since}."))
+            return
+
+        rows = rebuild_inventory(since, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Inventory rebuilt since {since}: {rows} nights written."))
@@ -0,0 +1,33 @@
+from argparse import ArgumentTypeError
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.events import replay_events
+
+
+def parse_datetime(value: str) -> datetime:
+    # `type=` de argparse: con ArgumentTypeError se muestra el uso del comando y no un traceback
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ArgumentTypeError(f"Incorrect date `{value}`. Expected YYYY-MM-DD or YYYY-MM-DDTHH:MM.")
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+class Command(BaseCommand):
+    help = "Queues the stored Stripe events created in a time range to be processed again by process_stripe_events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=parse_datetime, default=None, help="Events created from this date (inclusive).")
+        parser.add_argument("--until", type=parse_datetime, default=None, help="Events created before this date.")
+        parser.add_argument("--type", default=None, help="Only this event type, e.g. payment_intent.succeeded.")
+        parser.add_argument(
+            "--status", action="append", choices=["PE", "DO", "DE"], default=None,
+            help="Only events in this status (repeatable). Defaults to every status.",
+        )
+
+    def handle(self, *args, **options):
+        if options["since"] is None and options["until"] is None and not options["status"]:
+            raise CommandError("Give a time range (--since/--until) or --status to replay.")
+        replayed = replay_events(options["since"], options["until"], options["type"], options["status"])
+        self.stdout.write(self.style.SUCCESS(f"{replayed} Stripe events queued again."))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from payments.stripe_standin import make_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for the Stripe endpoints the payment flows use. "
+        "Point the app at it with STRIPE_API_BASE=http://<host>:<port>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument("--latency-ms", type=float, default=0, help="Artificial latency added to every call.")
+        parser.add_argument(
+            "--webhook-url", default=None,
+            help="Where to POST signed payment_intent.succeeded events, e.g. http://127.0.0.1:8000/api/v1/handle-payment-event/",
+        )
+
+    def handle(self, *args, **options):
+        server = make_server(
+            options["host"], options["port"],
+            latency=options["latency_ms"] / 1000,
+            webhook_url=options["webhook_url"],
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Stripe stand-in listening on http://{options['host']}:{options['port']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:49
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('Hotel', '0001_initial'),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=40, verbose_name='Nombre')),
+                ('email', models.EmailField(max_length=150, verbose_name='Correo')),
+                ('phone', models.CharField(max_length=20, verbose_name='Teléfono')),
+                ('checkin', models.DateField(verbose_name='Fecha de llegada')),
+                ('checkout', models.DateField(verbose_name='Fecha de salida')),
+                ('status', models.CharField(choices=[('RE', 'Reserved'), ('EX', 'Expired'), ('CA', 'Cancelled'), ('RF', 'Refunded'), ('FA', 'Failed')], default='FA', editable=False, max_length=2)),
+                ('amount', models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('payment_intent', models.CharField(editable=False, max_length=50, null=True, verbose_name='Intento de pago')),
+                ('create_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado el')),
+                ('customer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='authentication.customer', verbose_name='Cliente')),
+                ('hotel', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='Hotel.hotel', verbose_name='Hotel')),
+            ],
+            options={
+                'verbose_name': 'Reservación',
+                'verbose_name_plural': 'Reservaciones',
+                'ordering': ['-create_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomReservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('rooms', models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(50)], verbose_name='Total de habitaciones')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado el')),
+                ('customer_reservation', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bedrooms', to='payments.reservation', verbose_name='Reservación')),
+                ('room_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='room_reservations', to='Hotel.roomtype', verbose_name='Tipo de Habitación')),
+            ],
+            options={
+                'verbose_name': 'Reserva de habitación',
+                'verbose_name_plural': 'Reservas de habitación',
+            },
+        ),
+    ]
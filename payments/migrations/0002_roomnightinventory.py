@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0002_initial'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNightInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField(verbose_name='Noche')),
+                ('booked', models.PositiveIntegerField(default=0, verbose_name='Habitaciones reservadas')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='night_inventory', to='Hotel.roomtype', verbose_name='Tipo de Habitación')),
+            ],
+            options={
+                'verbose_name': 'Inventario por noche',
+                'verbose_name_plural': 'Inventario por noche',
+                'constraints': [models.UniqueConstraint(fields=('room_type', 'night'), name='unique_room_type_night')],
+            },
+        ),
+    ]
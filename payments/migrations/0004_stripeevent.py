@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_reservation_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Id del evento')),
+                ('type', models.CharField(max_length=100, verbose_name='Tipo')),
+                ('payload', models.JSONField(verbose_name='Evento')),
+                ('created', models.DateTimeField(verbose_name='Creado en Stripe')),
+                ('status', models.CharField(choices=[('PE', 'Pending'), ('RU', 'Processing'), ('DO', 'Processed'), ('DE', 'Dead')], default='PE', max_length=2)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Procesar a partir de')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Tomado hasta')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Recibido el')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesado el')),
+            ],
+            options={
+                'verbose_name': 'Evento de Stripe',
+                'verbose_name_plural': 'Eventos de Stripe',
+                'ordering': ['created', 'received_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='stripe_event_status_idx'), models.Index(fields=['created'], name='stripe_event_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0007_hotel_hotel_rating_name_idx_and_more'),
+        ('authentication', '0001_initial'),
+        ('payments', '0004_stripeevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', '-create_at'], name='reservation_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['hotel', 'status', '-create_at'], name='reservation_hotel_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'checkout'], name='reservation_status_out_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['payment_intent'], name='reservation_intent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['room_type', 'customer_reservation'], name='room_reservation_type_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from collections import Counter
+from datetime import timedelta
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_room_night_inventory(apps, schema_editor):
+    """
+    Llena el inventario por noche con las reservas activas (`RE`) que ya existían, igual que
+    `manage.py rebuild_room_inventory`; sin esto todo lo reservado aparecería libre.
+    """
+    RoomReservation = apps.get_model("payments", "RoomReservation")
+    RoomNightInventory = apps.get_model("payments", "RoomNightInventory")
+    today = timezone.localdate()
+
+    booked = Counter()
+    bedrooms = RoomReservation.objects.filter(
+        customer_reservation__status="RE", customer_reservation__checkout__gt=today, room_type__isnull=False,
+    ).values_list("room_type_id", "rooms", "customer_reservation__checkin", "customer_reservation__checkout")
+    for room_type_id, rooms, checkin, checkout in bedrooms.iterator():
+        night = max(checkin, today)
+        while night < checkout:
+            booked[(room_type_id, night)] += rooms
+            night += timedelta(days=1)
+
+    RoomNightInventory.objects.filter(night__gte=today).delete()
+    RoomNightInventory.objects.bulk_create(
+        [RoomNightInventory(room_type_id=room_type_id, night=night, booked=rooms) for (room_type_id, night), rooms in booked.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_reservation_reservation_customer_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_room_night_inventory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0007_hotel_hotel_rating_name_idx_and_more'),
+        ('authentication', '0001_initial'),
+        ('payments', '0006_backfill_room_night_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Habitaciones apartadas hasta'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('PE', 'Pending payment'), ('RE', 'Reserved'), ('EX', 'Expired'), ('CA', 'Cancelled'), ('RF', 'Refunded'), ('FA', 'Failed')], default='FA', editable=False, max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'hold_expires_at'], name='reservation_hold_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Hotel', '0008_updated_at_indexes'),
+        ('authentication', '0001_initial'),
+        ('payments', '0007_reservation_hold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', 'updated_at'], name='reservation_customer_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['hotel', 'updated_at'], name='reservation_hotel_upd_idx'),
+        ),
+    ]
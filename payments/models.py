@@ -1,15 +1,20 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext as _
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from authentication.models import Customer
 from Hotel.models import Hotel, RoomType
+from Hotel.cache import mark_changed
 from decimal import Decimal
 import uuid
 
 # Create your models here.
 class Reservation(models.Model):
     RESERVATION_STATUS = (
+        ('PE', _('Pending payment')),
         ('RE', _('Reserved')),
         ('EX', _('Expired')),
         ('CA', _('Cancelled')),
@@ -28,7 +33,9 @@ class Reservation(models.Model):
     status = models.CharField(max_length=2, choices=RESERVATION_STATUS, default='FA', editable=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal("0.01"))], null=True, editable=False)
     payment_intent = models.CharField(max_length=50, null=True, verbose_name="Intento de pago", editable=False)
+    hold_expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Habitaciones apartadas hasta", editable=False)
     create_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado el", editable=False)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Actualizado el")
 
     def clean(self, *args, **kwargs):
         super(Reservation, self).clean(*args, **kwargs)
@@ -39,6 +46,20 @@ class Reservation(models.Model):
         verbose_name = "Reservación"
         verbose_name_plural = "Reservaciones"
         ordering = ["-create_at"]
+        indexes = [
+            # Reservaciones del cliente y de los hoteles del hotelero (reservations/), más recientes primero
+            models.Index(fields=["customer", "-create_at"], name="reservation_customer_idx"),
+            models.Index(fields=["hotel", "status", "-create_at"], name="reservation_hotel_status_idx"),
+            # Reservas activas por fecha de salida (expiración en `cron` y reconstrucción del inventario)
+            models.Index(fields=["status", "checkout"], name="reservation_status_out_idx"),
+            # Reembolsos (`charge.refunded`)
+            models.Index(fields=["payment_intent"], name="reservation_intent_idx"),
+            # Apartados vencidos (`cron.release_expired_holds`)
+            models.Index(fields=["status", "hold_expires_at"], name="reservation_hold_idx"),
+            # Última modificación para los GET condicionales de reservations/
+            models.Index(fields=["customer", "updated_at"], name="reservation_customer_upd_idx"),
+            models.Index(fields=["hotel", "updated_at"], name="reservation_hotel_upd_idx"),
+        ]
 
 
 class RoomReservation(models.Model):
@@ -59,3 +80,67 @@ class RoomReservation(models.Model):
     class Meta:
         verbose_name = "Reserva de habitación"
         verbose_name_plural = "Reservas de habitación"
+        indexes = [
+            # Habitaciones reservadas de un tipo, unidas con el estado y las fechas de su reservación
+            models.Index(fields=["room_type", "customer_reservation"], name="room_reservation_type_idx"),
+        ]
+
+
+class RoomNightInventory(models.Model):
+    room_type = models.ForeignKey(
+        RoomType, on_delete=models.CASCADE, related_name="night_inventory", verbose_name="Tipo de Habitación"
+    )
+    night = models.DateField(verbose_name="Noche")
+    booked = models.PositiveIntegerField(default=0, verbose_name="Habitaciones reservadas")
+
+    class Meta:
+        verbose_name = "Inventario por noche"
+        verbose_name_plural = "Inventario por noche"
+        constraints = [
+            models.UniqueConstraint(fields=["room_type", "night"], name="unique_room_type_night"),
+        ]
+
+    def __str__(self):
+        return f'{self.room_type_id} | {self.night} | {self.booked}'
+
+
+class StripeEvent(models.Model):
+    """
+    Evento recibido en el webhook de Stripe, guardado tal cual llegó. El id del evento es la llave
+    primaria, así que una entrega repetida no crea otra fila; `manage.py process_stripe_events` lo procesa.
+    """
+    EVENT_STATUS = (
+        ('PE', _('Pending')),
+        ('RU', _('Processing')),
+        ('DO', _('Processed')),
+        ('DE', _('Dead')),
+    )
+
+    id = models.CharField(max_length=255, primary_key=True, verbose_name="Id del evento")
+    type = models.CharField(max_length=100, verbose_name="Tipo")
+    payload = models.JSONField(verbose_name="Evento")
+    created = models.DateTimeField(verbose_name="Creado en Stripe")
+    status = models.CharField(max_length=2, choices=EVENT_STATUS, default='PE')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Procesar a partir de")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Tomado hasta")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name="Recibido el")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Procesado el")
+
+    class Meta:
+        verbose_name = "Evento de Stripe"
+        verbose_name_plural = "Eventos de Stripe"
+        ordering = ["created", "received_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="stripe_event_status_idx"),
+            models.Index(fields=["created"], name="stripe_event_created_idx"),
+        ]
+
+    def __str__(self):
+        return f'{self.id} | {self.type} | {self.status}'
+
+
+@receiver(post_delete, sender=Reservation)
+def mark_reservation_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: mark_changed("reservations"))
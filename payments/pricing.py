@@ -0,0 +1,67 @@
+"""
+Cálculo del precio de una reserva en `Decimal`, sin pasar por flotantes.
+
+Los tipos de habitación se reutilizan si ya vienen cargados (p. ej. en `validated_data` de
+`ReservationSerializer`); los que llegan como id se cargan juntos en una sola consulta.
+"""
+from decimal import Decimal, ROUND_DOWN
+from django.conf import settings
+from Hotel.models import RoomType
+
+CENT = Decimal("0.01")
+
+
+def to_cents(amount: Decimal) -> int:
+    """
+    to_cents(Decimal("1234.50")) == 123450\n
+    """
+    return int((amount / CENT).to_integral_value(rounding=ROUND_DOWN))
+
+
+def load_room_types(bedrooms: list, queryset=None) -> dict:
+    """
+    Devuelve {id: RoomType} de las habitaciones pedidas, consultando solo las que llegaron como id.
+    """
+    room_types = {room["room_type"].pk: room["room_type"] for room in bedrooms if isinstance(room["room_type"], RoomType)}
+    missing = {room["room_type"] for room in bedrooms if not isinstance(room["room_type"], RoomType)}
+    if missing:
+        room_types.update((queryset if queryset is not None else RoomType.objects.all()).in_bulk(missing))
+    return room_types
+
+
+def price_reservation(checkin, checkout, bedrooms: list) -> dict:
+    """
+    price = price_reservation(date(2024, 4, 1), date(2024, 4, 3), [{"room_type": room_type, "rooms": 3}])\n
+    price => {
+        "nights": 2,
+        "lines": [{"room_type": room_type, "rooms": 3, "price": Decimal("100.00"), "subtotal": Decimal("600.00")}],
+        "subtotal": Decimal("600.00"),
+        "fee": Decimal("60.00"),
+        "amount": 60000,        # centavos que se cobran
+        "fee_amount": 6000,     # centavos de la comisión de la plataforma
+    }
+    """
+    nights = (checkout - checkin).days
+    room_types = load_room_types(bedrooms)
+
+    lines = []
+    for room in bedrooms:
+        room_type = room_types[getattr(room["room_type"], "pk", room["room_type"])]
+        lines.append({
+            "room_type": room_type,
+            "rooms": room["rooms"],
+            "price": room_type.price,
+            "subtotal": room_type.price * room["rooms"] * nights,
+        })
+
+    subtotal = sum((line["subtotal"] for line in lines), Decimal("0.00"))
+    # La comisión se trunca al centavo, como se hacía al convertirla a entero
+    fee = (subtotal * settings.APPLICATION_FEE_AMOUNT).quantize(CENT, rounding=ROUND_DOWN)
+    return {
+        "nights": nights,
+        "lines": lines,
+        "subtotal": subtotal,
+        "fee": fee,
+        "amount": to_cents(subtotal),
+        "fee_amount": to_cents(fee),
+    }
@@ -0,0 +1,76 @@
+"""
+Cotizaciones de corta duración que se reutilizan al pagar.
+
+`POST reservations/quote/` guarda en caché el precio calculado por `pricing.price_reservation` y
+devuelve un token firmado que lo identifica. Cotizaciones idénticas (mismo hotel, fechas,
+habitaciones y versión del hotel) comparten la entrada, así que las consultas repetidas al navegar
+no vuelven a calcular el precio; solo se revisa otra vez la disponibilidad (`QuoteSerializer`). Los endpoints de pago aceptan `quote_token` en lugar
+de `hotel`, fechas y `bedrooms` y crean la reserva con el precio cotizado (`booking.create_reservation_from_quote`).
+
+La cotización caduca a los `RESERVATION_QUOTE_TTL` segundos. Si en ese tiempo se agotan las
+habitaciones, el apartado al crear la reserva lo detecta y se rechaza antes de cobrar, igual que sin cotización.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+from Hotel.cache import get_versions
+import hashlib, json
+
+SIGNING_SALT = "payments.quotes"
+
+
+def quote_id(data: dict) -> str:
+    """
+    Identificador de una cotización válida (`QuoteSerializer.validated_data`).
+    """
+    _, versions = get_versions([data["hotel"]])
+    key = {
+        "hotel": str(data["hotel"]),
+        "version": versions[data["hotel"]],
+        "checkin": data["checkin"].isoformat(),
+        "checkout": data["checkout"].isoformat(),
+        "bedrooms": sorted((str(getattr(room["room_type"], "pk", room["room_type"])), room["rooms"]) for room in data["bedrooms"]),
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+
+
+def quote_key(quote_id: str) -> str:
+    return f"payments:quotes:{quote_id}"
+
+
+def get_quote(quote_id: str) -> dict:
+    return cache.get(quote_key(quote_id))
+
+
+def save_quote(quote_id: str, data: dict, price: dict) -> dict:
+    """
+    quote = save_quote(quote_id, data, price)\n
+    quote => {"token": "...", "expires_at": datetime, "hotel": UUID, "checkin": date, "checkout": date,
+              "bedrooms": [{"room_type": UUID, "rooms": 3}], "price": price}
+    """
+    lines = [{**line, "room_type": {"pk": line["room_type"].pk, "type": line["room_type"].type}} for line in price["lines"]]
+    quote = {
+        "token": signing.dumps(quote_id, salt=SIGNING_SALT),
+        "expires_at": timezone.now() + timedelta(seconds=settings.RESERVATION_QUOTE_TTL),
+        "hotel": data["hotel"],
+        "checkin": data["checkin"],
+        "checkout": data["checkout"],
+        "bedrooms": [{"room_type": line["room_type"]["pk"], "rooms": line["rooms"]} for line in lines],
+        "price": {**price, "lines": lines},
+    }
+    cache.set(quote_key(quote_id), quote, timeout=settings.RESERVATION_QUOTE_TTL)
+    return quote
+
+
+def load_quote(token: str) -> dict:
+    """
+    quote: dict | None = load_quote(request.data["quote_token"])\n
+    Devuelve None si el token no es válido o la cotización ya caducó.
+    """
+    try:
+        quote_id = signing.loads(token, salt=SIGNING_SALT, max_age=settings.RESERVATION_QUOTE_TTL)
+    except signing.BadSignature:
+        return None
+    return get_quote(quote_id)
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext as _
 from rest_framework import serializers
 from .models import *
+from .inventory import reserve_rooms, release_rooms, requested_rooms, RoomsNotAvailable, HOLDING_STATUSES
+from .quotes import quote_id, get_quote, load_quote
 from Hotel.models import Hotel, RoomType
 
 
@@ -30,35 +35,174 @@ class ReservationSerializer(serializers.ModelSerializer):
 
     bedrooms = NestedRoomReservationSerializer(many=True)
 
+    def validate(self, attrs):
+        """
+        Las mismas reglas que `QuoteSerializer.validate`: al menos una noche y habitaciones del hotel
+        de la reserva. En una actualización parcial se completan con los valores guardados.
+        """
+        checkin = attrs.get("checkin", getattr(self.instance, "checkin", None))
+        checkout = attrs.get("checkout", getattr(self.instance, "checkout", None))
+        if checkin is not None and checkout is not None and checkin >= checkout:
+            raise serializers.ValidationError({"checkin": _("The arrival date must be before the departure date.")})
+
+        hotel_id = attrs["hotel"].pk if "hotel" in attrs else getattr(self.instance, "hotel_id", None)
+        if "bedrooms" in attrs:
+            room_types = [room["room_type"] for room in attrs["bedrooms"]]
+        elif "hotel" in attrs and self.instance is not None:
+            room_types = [bedroom.room_type for bedroom in self.instance.bedrooms.select_related("room_type")]
+        else:
+            room_types = []
+        for room_type in room_types:
+            if room_type is not None and room_type.hotel_id != hotel_id:
+                raise serializers.ValidationError({"bedrooms": f"The room type `{room_type.pk}` does not belong to the hotel."})
+        return attrs
+
+    @transaction.atomic
     def create(self, validated_data):
         bedrooms_data = validated_data.pop("bedrooms")
         reservation = Reservation.objects.create(**validated_data)
-        for room_item in bedrooms_data:
-            RoomReservation.objects.create(customer_reservation=reservation, **room_item)
-
+        RoomReservation.objects.bulk_create([
+            RoomReservation(customer_reservation=reservation, **room_item) for room_item in bedrooms_data
+        ])
         return reservation
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        """
+        Las habitaciones se comparan por tipo con las guardadas: se insertan, actualizan y borran
+        solo las que cambiaron, con una consulta por operación. Si la reserva ocupa inventario (`PE` o `RE`),
+        el inventario se ajusta al nuevo rango y habitaciones, o se deshace todo si ya no hay cupo.
+        """
         bedrooms_data = validated_data.pop("bedrooms", None)
-        instance.hotel = validated_data.get("name", instance.name)
-        instance.customer = validated_data.get("description", instance.description)
-        instance.name = validated_data.get("phone", instance.phone)
-        instance.email = validated_data.get("address", instance.address)
-        instance.phone = validated_data.get("city", instance.city)
-        instance.checkin = validated_data.get("state", instance.state)
-        instance.checkout = validated_data.get("rating", instance.rating)
-
-        for room_item_data in bedrooms_data:
-            room_item = instance.bedrooms.get(id=room_item_data.get("id"))
-            if room_item:
-                room_item.room_type = room_item_data.get("room_type", room_item.room_type)
-                room_item.rooms = room_item_data.get("rooms", room_item.rooms)
-                room_item.save()
+        # Se parte de la fila bloqueada: `instance` puede tener un estado o fechas viejos
+        current = Reservation.objects.select_for_update().get(pk=instance.pk)
+        instance.status = current.status
+        reserved = current.status in HOLDING_STATUSES
+        if reserved:
+            release_rooms(current)
+
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        if bedrooms_data is not None:
+            self.upsert_bedrooms(instance, bedrooms_data)
+
+        if reserved:
+            try:
+                reserve_rooms(instance)
+            except RoomsNotAvailable as err:
+                raise serializers.ValidationError({"detail": str(err)})
+        return instance
+
+    @staticmethod
+    def upsert_bedrooms(instance, bedrooms_data: list) -> None:
+        rooms_by_type = requested_rooms(bedrooms_data)
+
+        current, stale = {}, []
+        for bedroom in instance.bedrooms.all():
+            if bedroom.room_type_id in rooms_by_type and bedroom.room_type_id not in current:
+                current[bedroom.room_type_id] = bedroom
             else:
-                RoomReservation.objects.create(customer_reservation=instance, **room_item_data)
+                stale.append(bedroom.pk)
+
+        changed = []
+        for room_type_id, bedroom in current.items():
+            if bedroom.rooms != rooms_by_type[room_type_id]:
+                bedroom.rooms = rooms_by_type[room_type_id]
+                changed.append(bedroom)
+
+        if stale:
+            RoomReservation.objects.filter(pk__in=stale).delete()
+        if changed:
+            RoomReservation.objects.bulk_update(changed, ["rooms"])
+        RoomReservation.objects.bulk_create([
+            RoomReservation(customer_reservation=instance, room_type_id=room_type_id, rooms=rooms)
+            for room_type_id, rooms in rooms_by_type.items() if room_type_id not in current
+        ])
+
+
+class QuoteSerializer(serializers.Serializer):
+    """
+    Valida una cotización y reemplaza cada `room_type` por su instancia, anotada con
+    `rooms_available`; todos los tipos de habitación se cargan en una sola consulta. Si la misma
+    cotización sigue en caché (`quotes`), se agrega en `quote` y solo se vuelve a revisar la
+    disponibilidad (la misma consulta, sin precios): las reservas hechas desde entonces no cambian
+    su llave, así que un hotel agotado no debe seguir recibiendo cotizaciones válidas.
+    """
+
+    class NestedBedroomSerializer(serializers.Serializer):
+        room_type = serializers.UUIDField()
+        rooms = serializers.IntegerField(min_value=1, max_value=50)
+
+    hotel = serializers.UUIDField()
+    checkin = serializers.DateField()
+    checkout = serializers.DateField()
+    bedrooms = NestedBedroomSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        if attrs["checkin"] >= attrs["checkout"]:
+            raise serializers.ValidationError({"checkin": _("The arrival date must be before the departure date.")})
+
+        attrs["quote_id"] = quote_id(attrs)
+        attrs["quote"] = get_quote(attrs["quote_id"])
+
+        rooms = requested_rooms(attrs["bedrooms"])
+        room_types = RoomType.objects.with_rooms_available(attrs["checkin"], attrs["checkout"]).filter(
+            hotel_id=attrs["hotel"]
+        )
+        if attrs["quote"] is not None:
+            room_types = room_types.only("id", "type", "rooms")
+        room_types = room_types.in_bulk(list(rooms))
+        for room_type_id, requested in rooms.items():
+            room_type = room_types.get(room_type_id)
+            if room_type is None:
+                raise serializers.ValidationError({"bedrooms": f"The room type `{room_type_id}` does not belong to the hotel."})
+            if room_type.rooms_available < requested:
+                raise serializers.ValidationError({"detail": f"The room type `{room_type.type}` does not have enough rooms."})
+        if attrs["quote"] is not None:
+            return attrs
+        for room in attrs["bedrooms"]:
+            room["room_type"] = room_types[room["room_type"]]
+        return attrs
+
+
+class QuotedReservationSerializer(serializers.ModelSerializer):
+    """
+    Datos de contacto de una reserva cuyo hotel, fechas y habitaciones vienen de una cotización.
+    """
+    quote_token = serializers.CharField(write_only=True)
 
-        instance.save()
-        return instance
+    class Meta:
+        model = Reservation
+        fields = ("quote_token", "name", "email", "phone")
+
+    def validate_quote_token(self, value):
+        quote = load_quote(value)
+        if quote is None:
+            raise serializers.ValidationError(_("The quote is invalid or has expired."))
+        return quote
+
+
+class PriceSerializer(serializers.Serializer):
+    """
+    Representación del resultado de `pricing.price_reservation`.
+    """
+
+    class NestedLineSerializer(serializers.Serializer):
+        room_type = serializers.UUIDField(source="room_type.pk")
+        type = serializers.CharField(source="room_type.type")
+        rooms = serializers.IntegerField()
+        price = serializers.DecimalField(max_digits=12, decimal_places=2)
+        subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+    nights = serializers.IntegerField()
+    lines = NestedLineSerializer(many=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    fee = serializers.DecimalField(max_digits=12, decimal_places=2)
+    currency = serializers.SerializerMethodField()
+
+    def get_currency(self, price) -> str:
+        return settings.CURRENCY_CODE
 
 
 class ReservationReadOnlySerializer(serializers.ModelSerializer):
@@ -0,0 +1,101 @@
+"""
+Configuración compartida del cliente HTTP de Stripe.
+
+Todas las llamadas a Stripe usan un mismo `requests.Session` con un pool de conexiones persistentes,
+timeouts de conexión y lectura acotados y los reintentos de la librería (`max_network_retries`),
+que agrega llaves de idempotencia a los POST y espera con backoff exponencial entre intentos.
+Cada intento se mide en `metrics` por método y ruta, y cada `STRIPE_METRICS_LOG_INTERVAL` segundos
+el proceso registra el resumen acumulado (`payments.stripe_client`, nivel INFO).
+"""
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from threading import Lock
+from urllib.parse import urlsplit
+import logging, re, requests, stripe, time
+
+logger = logging.getLogger(__name__)
+
+# Los ids de Stripe (cus_..., pm_..., pi_...) y los uuid de nuestros clientes se agrupan en la ruta
+RESOURCE_ID = re.compile(r"/(?:[a-z]{2,6}_[A-Za-z0-9]{10,}|[0-9a-f-]{36})(?=/|$)")
+
+
+class StripeMetrics:
+    """
+    Conteo, errores y latencia (total y máxima, en segundos) por "MÉTODO /ruta/{id}".
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+        self.reported_at = time.monotonic()
+
+    def record(self, method: str, url: str, elapsed: float, status_code: int = None) -> None:
+        endpoint = f"{method.upper()} {RESOURCE_ID.sub('/{id}', urlsplit(url).path)}"
+        failed = status_code is None or status_code >= 500
+        with self.lock:
+            stats = self.calls.setdefault(endpoint, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["errors"] += failed
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            now = time.monotonic()
+            report = now - self.reported_at >= settings.STRIPE_METRICS_LOG_INTERVAL
+            if report:
+                self.reported_at = now
+
+        log = logger.warning if elapsed >= settings.STRIPE_SLOW_CALL_SECONDS or failed else logger.debug
+        log("Stripe %s -> %s in %.3fs", endpoint, status_code, elapsed)
+        if report:
+            self.log_summary()
+
+    def log_summary(self) -> None:
+        for endpoint, stats in sorted(self.snapshot().items()):
+            logger.info(
+                "Stripe %s: %s calls, %s errors, mean %.3fs, max %.3fs",
+                endpoint, stats["count"], stats["errors"], stats["mean"], stats["max"],
+            )
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                endpoint: {**stats, "mean": stats["total"] / stats["count"]}
+                for endpoint, stats in self.calls.items()
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.calls.clear()
+
+
+metrics = StripeMetrics()
+
+
+class InstrumentedRequestsClient(stripe.RequestsClient):
+
+    def request(self, method, url, headers, post_data=None):
+        started = time.perf_counter()
+        status_code = None
+        try:
+            content, status_code, response_headers = super().request(method, url, headers, post_data)
+            return content, status_code, response_headers
+        finally:
+            metrics.record(method, url, time.perf_counter() - started, status_code)
+
+
+def build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure_stripe() -> None:
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = InstrumentedRequestsClient(
+        timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+        session=build_session(),
+    )
+    if settings.STRIPE_API_BASE:
+        stripe.api_base = settings.STRIPE_API_BASE
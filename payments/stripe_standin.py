@@ -0,0 +1,206 @@
+"""
+Servidor HTTP local que imita los endpoints de Stripe que usamos, para probar y medir los flujos de
+pago sin red. Guarda todo en memoria, puede agregar latencia artificial y, si se le da la URL del
+webhook, envía `payment_intent.succeeded` firmado con `STRIPE_WEBHOOK_SECRET` al confirmar un pago.
+
+Se usa con `STRIPE_API_BASE=http://127.0.0.1:<puerto>` (ver `manage.py stripe_standin`).
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qsl, urlsplit
+from urllib.request import Request, urlopen
+import hashlib, hmac, json, re, secrets, time
+
+
+def decode_form(body: str) -> dict:
+    """
+    decode_form("metadata[order_id]=1&expand[0]=x") == {"metadata": {"order_id": "1"}, "expand": {"0": "x"}}\n
+    """
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = re.findall(r"[^\[\]]+", key)
+        target = data
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return data
+
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{secrets.token_hex(12)}"
+
+
+def sign_payload(payload: str, secret: str) -> str:
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class StripeStandIn:
+    """
+    Estado y lógica de los endpoints; `routes` asocia (método, patrón) con el manejador.
+    """
+
+    def __init__(self, latency: float = 0, webhook_url: str = None, webhook_secret: str = None):
+        self.latency = latency
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.lock = Lock()
+        self.objects = {}
+        self.routes = [
+            ("POST", r"/v1/customers", self.create_customer),
+            ("GET", r"/v1/customers/(?P<id>[^/]+)", self.retrieve_customer),
+            ("GET", r"/v1/customers/(?P<id>[^/]+)/payment_methods", self.list_payment_methods),
+            ("GET", r"/v1/customers/(?P<id>[^/]+)/payment_methods/(?P<pm>[^/]+)", self.retrieve_payment_method),
+            ("POST", r"/v1/payment_methods/(?P<pm>[^/]+)/detach", self.detach_payment_method),
+            ("POST", r"/v1/setup_intents", self.create_setup_intent),
+            ("POST", r"/v1/payment_intents", self.create_payment_intent),
+            ("POST", r"/v1/refunds", self.create_refund),
+            ("POST", r"/v1/accounts", self.create_account),
+            ("POST", r"/v1/account_links", self.create_account_link),
+            ("POST", r"/v1/accounts/(?P<id>[^/]+)/login_links", self.create_login_link),
+        ]
+
+    def dispatch(self, method: str, path: str, data: dict) -> tuple[int, dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                with self.lock:
+                    return handler(data, **match.groupdict())
+        return self.missing(path)
+
+    def save(self, obj: dict) -> dict:
+        self.objects[obj["id"]] = obj
+        return obj
+
+    @staticmethod
+    def missing(resource: str) -> tuple[int, dict]:
+        return 404, {"error": {
+            "type": "invalid_request_error", "code": "resource_missing", "message": f"No such resource: '{resource}'",
+        }}
+
+    def create_customer(self, data):
+        customer = {"object": "customer", "id": data.get("id") or new_id("cus"), "email": data.get("email"), "metadata": {}}
+        self.save(customer)
+        # Cada cliente nuevo tiene una tarjeta guardada para poder probar `payment_with_saved_card`
+        self.save({
+            "object": "payment_method", "id": new_id("pm"), "type": "card", "customer": customer["id"],
+            "card": {"brand": "visa", "last4": "4242", "exp_month": 12, "exp_year": 2030},
+        })
+        return 200, customer
+
+    def retrieve_customer(self, data, id):
+        if id not in self.objects:
+            return self.missing(id)
+        return 200, self.objects[id]
+
+    def customer_payment_methods(self, customer_id) -> list:
+        return [
+            obj for obj in self.objects.values()
+            if obj["object"] == "payment_method" and obj["customer"] == customer_id
+        ]
+
+    def list_payment_methods(self, data, id):
+        if id not in self.objects:
+            return self.missing(id)
+        return 200, {
+            "object": "list", "url": f"/v1/customers/{id}/payment_methods", "has_more": False,
+            "data": self.customer_payment_methods(id),
+        }
+
+    def retrieve_payment_method(self, data, id, pm):
+        if pm not in self.objects or self.objects[pm]["customer"] != id:
+            return self.missing(pm)
+        return 200, self.objects[pm]
+
+    def detach_payment_method(self, data, pm):
+        if pm not in self.objects:
+            return self.missing(pm)
+        self.objects[pm]["customer"] = None
+        return 200, self.objects[pm]
+
+    def create_setup_intent(self, data):
+        setup_intent = {"object": "setup_intent", "id": new_id("seti"), "customer": data.get("customer"), "status": "requires_payment_method"}
+        setup_intent["client_secret"] = f"{setup_intent['id']}_secret_{secrets.token_hex(8)}"
+        return 200, self.save(setup_intent)
+
+    def create_payment_intent(self, data):
+        confirmed = data.get("confirm") == "true"
+        payment_intent = {
+            "object": "payment_intent", "id": new_id("pi"), "amount": int(data.get("amount", 0)),
+            "currency": data.get("currency", "mxn").lower(), "customer": data.get("customer"),
+            "payment_method": data.get("payment_method"), "metadata": data.get("metadata", {}),
+            "application_fee_amount": int(data.get("application_fee_amount", 0)),
+            "status": "succeeded" if confirmed else "requires_payment_method",
+        }
+        payment_intent["client_secret"] = f"{payment_intent['id']}_secret_{secrets.token_hex(8)}"
+        self.save(payment_intent)
+        if confirmed:
+            self.send_event("payment_intent.succeeded", payment_intent)
+        return 200, payment_intent
+
+    def create_refund(self, data):
+        refund = {"object": "refund", "id": new_id("re"), "payment_intent": data.get("payment_intent"), "status": "succeeded"}
+        return 200, self.save(refund)
+
+    def create_account(self, data):
+        account = {"object": "account", "id": new_id("acct"), "type": data.get("type"), "email": data.get("email")}
+        return 200, self.save(account)
+
+    def create_account_link(self, data):
+        return 200, {"object": "account_link", "url": f"https://connect.stripe.test/setup/{data.get('account')}"}
+
+    def create_login_link(self, data, id):
+        return 200, {"object": "login_link", "url": f"https://connect.stripe.test/express/{id}"}
+
+    def send_event(self, event_type: str, obj: dict) -> None:
+        if not self.webhook_url:
+            return
+        event = {"object": "event", "id": new_id("evt"), "type": event_type, "data": {"object": obj}, "created": int(time.time())}
+        payload = json.dumps(event)
+        request = Request(self.webhook_url, data=payload.encode(), method="POST", headers={
+            "Content-Type": "application/json", "Stripe-Signature": sign_payload(payload, self.webhook_secret or ""),
+        })
+        # Fuera del lock y de la respuesta, como haría Stripe
+        Thread(target=lambda: urlopen(request, timeout=10).close(), daemon=True).start()
+
+
+def make_handler(standin: StripeStandIn):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def handle_request(self, method: str):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode() if length else url.query
+            status_code, payload = standin.dispatch(method, url.path, decode_form(body))
+            content = json.dumps(payload).encode()
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.send_header("Request-Id", new_id("req"))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_DELETE(self):
+            self.handle_request("DELETE")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(host: str = "127.0.0.1", port: int = 12111, **options) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(StripeStandIn(**options)))
+    server.daemon_threads = True
+    return server
@@ -1,3 +1,600 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from threading import Thread
+from unittest import mock
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from Hotel.models import RoomType
+from Hotel.tests_utils import create_customer, create_hotel, create_hotelier
+from .models import Reservation, RoomReservation, RoomNightInventory, StripeEvent
+from .booking import confirm_reservation, create_reservation
+from .cron import release_expired_holds, verify_expiration_reservations
+from .inventory import RoomsNotAvailable, change_reservation_status, rebuild_inventory, verify_inventory
+from .load_test import create_fixtures, run_bookings
+from .management.commands.replay_stripe_events import Command as ReplayStripeEventsCommand
+from .pricing import price_reservation
+from .serializers import ReservationSerializer
+from .stripe_client import configure_stripe, metrics
+from .stripe_standin import make_server, sign_payload
+import importlib, json, stripe
 
 # Create your tests here.
+class StripeStandInTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = make_server(port=0)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        # `configure_stripe` cambia la configuración global de la librería; se restaura completa
+        for name in ("api_key", "api_base", "default_http_client", "max_network_retries"):
+            self.addCleanup(setattr, stripe, name, getattr(stripe, name))
+        self.enterContext(override_settings(STRIPE_API_BASE=self.api_base, STRIPE_SECRET_KEY="sk_test_standin"))
+        configure_stripe()
+
+    def test_saved_cards_flow(self):
+        user = create_customer().user
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get("/api/v1/cards/")
+        self.assertEqual(response.status_code, 404)
+        response = client.get("/api/v1/cards/")
+        self.assertEqual(response.data["data"][0]["card"]["last4"], "4242")
+
+        payment_method = response.data["data"][0]["id"]
+        self.assertEqual(client.delete(f"/api/v1/cards/{payment_method}/").status_code, 204)
+        self.assertEqual(client.get("/api/v1/cards/").status_code, 404)
+
+        calls = metrics.snapshot()
+        # El cliente se crea en la primera petición y después solo se lee de la caché
+        self.assertEqual(calls["GET /v1/customers/{id}"]["count"], 1)
+        self.assertEqual(calls["POST /v1/customers"]["count"], 1)
+        self.assertEqual(calls["GET /v1/customers/{id}/payment_methods"]["count"], 2)
+        self.assertEqual(calls["POST /v1/payment_methods/{id}/detach"]["count"], 1)
+
+    def test_missing_resource(self):
+        with self.assertRaises(stripe.error.InvalidRequestError):
+            stripe.Customer.retrieve("cus_missing")
+
+    @override_settings(STRIPE_METRICS_LOG_INTERVAL=0)
+    def test_metrics_summary_logged(self):
+        with self.assertLogs("payments.stripe_client", "INFO") as logs:
+            stripe.Customer.create(email="customer@example.com")
+        self.assertIn("Stripe POST /v1/customers: 1 calls, 0 errors", "\n".join(logs.output))
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test", TASK_RETRY_BACKOFF=0, TASK_RETRY_MAX_DELAY=0)
+class StripeEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hotel = create_hotel(create_hotelier())
+        cls.room_type = RoomType.objects.create(hotel=hotel, type="Doble", capacity=2, price="100.00", rooms=5)
+        cls.reservation = Reservation.objects.create(
+            hotel=hotel, customer=create_customer(), name="Cliente", email="customer@example.com",
+            phone="9981234567", checkin=date(2030, 4, 1), checkout=date(2030, 4, 3),
+        )
+        RoomReservation.objects.create(customer_reservation=cls.reservation, room_type=cls.room_type, rooms=2)
+
+    def post_event(self, event_id: str, event_type: str, obj: dict, created: int = 1700000000):
+        payload = json.dumps({"object": "event", "id": event_id, "type": event_type, "created": created, "data": {"object": obj}})
+        return self.client.post(
+            "/api/v1/handle-payment-event/", payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, "whsec_test"),
+        )
+
+    def process(self):
+        call_command("process_stripe_events", "--once", stdout=StringIO())
+
+    def payment_intent(self, order_id) -> dict:
+        return {"object": "payment_intent", "id": "pi_1", "amount": 40000, "metadata": {"order_id": str(order_id)}}
+
+    def test_webhook_stores_events_once(self):
+        with mock.patch("payments.events.confirm_reservation") as confirm:
+            for _ in range(2):
+                self.assertEqual(self.post_event("evt_1", "payment_intent.succeeded", self.payment_intent(self.reservation.id)).status_code, 200)
+            self.assertEqual(self.post_event("evt_2", "invoice.paid", {"object": "invoice", "id": "in_1"}).status_code, 200)
+            confirm.assert_not_called()
+
+        self.assertEqual(StripeEvent.objects.count(), 2)
+        self.assertEqual(self.client.post("/api/v1/handle-payment-event/", "{}", content_type="application/json",
+                                          HTTP_STRIPE_SIGNATURE="t=1,v1=bad").status_code, 400)
+
+    def test_events_processed_in_order_and_replayed(self):
+        self.post_event("evt_refund", "charge.refunded", {"object": "charge", "id": "ch_1", "refunded": True, "payment_intent": "pi_1"}, created=1700000010)
+        self.post_event("evt_paid", "payment_intent.succeeded", self.payment_intent(self.reservation.id), created=1700000000)
+        self.process()
+
+        self.reservation.refresh_from_db()
+        self.assertEqual((self.reservation.status, self.reservation.payment_intent), ("RF", "pi_1"))
+        self.assertEqual(set(StripeEvent.objects.values_list("status", flat=True)), {"DO"})
+        self.assertFalse(RoomNightInventory.objects.filter(booked__gt=0).exists())
+
+        # Repetir el pago no reactiva la reserva reembolsada
+        call_command("replay_stripe_events", "--since", "2023-11-14", stdout=StringIO())
+        self.assertEqual(set(StripeEvent.objects.values_list("status", flat=True)), {"PE"})
+        self.process()
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, "RF")
+
+    def test_replay_rejects_bad_dates_with_the_usage(self):
+        parser = ReplayStripeEventsCommand().create_parser("manage.py", "replay_stripe_events")
+        parser.called_from_command_line = True
+        stderr = StringIO()
+        with mock.patch("sys.stderr", stderr), self.assertRaises(SystemExit):
+            parser.parse_args(["--since", "ayer"])
+        self.assertIn("usage:", stderr.getvalue())
+        self.assertIn("Incorrect date `ayer`", stderr.getvalue())
+
+    def test_refund_before_a_retried_payment(self):
+        charge = {
+            "object": "charge", "id": "ch_1", "refunded": True, "payment_intent": "pi_1",
+            "metadata": {"order_id": str(self.reservation.id)},
+        }
+        self.post_event("evt_paid", "payment_intent.succeeded", self.payment_intent(self.reservation.id), created=1700000000)
+        self.post_event("evt_refund", "charge.refunded", charge, created=1700000010)
+
+        # El pago falla y queda para reintentarse; el reembolso, posterior, se procesa antes y el
+        # reintento del pago (sin backoff en estas pruebas) ya no confirma la reserva reembolsada
+        with mock.patch("payments.events.confirm_reservation", side_effect=RuntimeError("temporary")) as confirm:
+            self.process()
+        self.assertEqual(confirm.call_count, 1)
+        self.assertEqual(StripeEvent.objects.get(id="evt_paid").attempts, 2)
+        self.assertEqual(set(StripeEvent.objects.values_list("status", flat=True)), {"DO"})
+
+        self.reservation.refresh_from_db()
+        self.assertEqual((self.reservation.status, self.reservation.payment_intent), ("RF", "pi_1"))
+        self.assertFalse(RoomNightInventory.objects.filter(booked__gt=0).exists())
+
+    @override_settings(STRIPE_EVENT_MAX_ATTEMPTS=2)
+    def test_failed_event_is_dead_lettered(self):
+        self.post_event("evt_missing", "payment_intent.succeeded", self.payment_intent("00000000-0000-0000-0000-000000000000"))
+        self.process()
+        self.process()
+
+        event = StripeEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ("DE", 2))
+        self.assertIn("DoesNotExist", event.last_error)
+        self.assertEqual(event.created, datetime.fromtimestamp(1700000000, tz=dt_timezone.utc))
+
+
+class QuoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = create_hotel(create_hotelier())
+        cls.single = RoomType.objects.create(hotel=cls.hotel, type="Sencilla", capacity=1, price=Decimal("99.99"), rooms=5)
+        cls.double = RoomType.objects.create(hotel=cls.hotel, type="Doble", capacity=2, price=Decimal("150.05"), rooms=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def quote(self, **changes):
+        data = {
+            "hotel": str(self.hotel.id), "checkin": "2030-04-01", "checkout": "2030-04-04",
+            "bedrooms": [{"room_type": str(self.single.id), "rooms": 3}, {"room_type": str(self.double.id), "rooms": 1}],
+            **changes,
+        }
+        return self.client.post("/api/v1/reservations/quote/", data, content_type="application/json")
+
+    def test_price_reservation_is_exact(self):
+        price = price_reservation(date(2030, 4, 1), date(2030, 4, 4), [
+            {"room_type": self.single, "rooms": 3}, {"room_type": self.double.id, "rooms": 1},
+        ])
+        self.assertEqual(price["nights"], 3)
+        self.assertEqual(price["subtotal"], Decimal("1350.06"))
+        self.assertEqual((price["amount"], price["fee_amount"]), (135006, 13500))
+
+    def test_quote_endpoint(self):
+        with self.assertNumQueries(1):
+            response = self.quote()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["subtotal"], "1350.06")
+        self.assertEqual(response.json()["fee"], "135.00")
+        self.assertEqual([line["subtotal"] for line in response.json()["lines"]], ["899.91", "450.15"])
+
+        self.assertEqual(self.quote(bedrooms=[{"room_type": str(self.double.id), "rooms": 2}]).status_code, 400)
+        self.assertEqual(self.quote(checkout="2030-04-01").status_code, 400)
+
+    def test_quote_token_reused_at_payment(self):
+        token = self.quote().json()["quote_token"]
+        # La cotización en caché solo vuelve a revisar la disponibilidad
+        with self.assertNumQueries(1):
+            self.assertEqual(self.quote().json()["quote_token"], token)
+
+        user = create_customer().user
+        client = APIClient()
+        client.force_authenticate(user)
+        customer = stripe.Customer.construct_from({"id": str(user.id), "object": "customer"}, "sk_test")
+        with mock.patch("payments.views.get_or_create_customer", return_value=(customer, False)), \
+                mock.patch("stripe.PaymentIntent.create", return_value=mock.Mock(client_secret="pi_secret")) as create_intent:
+            data = {"quote_token": token, "name": "Cliente", "email": "customer@example.com", "phone": "9981234567"}
+            response = client.post("/api/v1/reservations/new_card/", data, format="json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(client.post("/api/v1/reservations/new_card/", {**data, "quote_token": token + "x"}, format="json").status_code, 400)
+
+        self.assertEqual((create_intent.call_args.kwargs["amount"], create_intent.call_args.kwargs["application_fee_amount"]), (135006, 13500))
+        reservation = Reservation.objects.get()
+        self.assertEqual((reservation.hotel_id, reservation.checkin, reservation.checkout), (self.hotel.id, date(2030, 4, 1), date(2030, 4, 4)))
+        self.assertEqual(sorted(reservation.bedrooms.values_list("rooms", flat=True)), [1, 3])
+
+
+    def test_cached_quote_after_a_sell_out(self):
+        self.assertEqual(self.quote().status_code, 200)
+        # Otra reserva se queda con la única habitación doble; reservar no cambia la versión del hotel
+        RoomNightInventory.objects.create(room_type=self.double, night=date(2030, 4, 2), booked=1)
+
+        response = self.quote()
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("quote_token", response.json())
+
+
+class ReservationSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = create_hotel(create_hotelier())
+        cls.customer = create_customer()
+        cls.single, cls.double, cls.suite = [
+            RoomType.objects.create(hotel=cls.hotel, type=name, capacity=2, price=Decimal("100.00"), rooms=3)
+            for name in ("Sencilla", "Doble", "Suite")
+        ]
+
+    def data(self, bedrooms, **changes):
+        return {
+            "hotel": self.hotel.id, "customer": self.customer.pk, "name": "Cliente", "email": "customer@example.com",
+            "phone": "9981234567", "checkin": "2030-04-01", "checkout": "2030-04-03",
+            "bedrooms": [{"room_type": room_type.id, "rooms": rooms} for room_type, rooms in bedrooms], **changes,
+        }
+
+    def booked(self) -> dict:
+        return {(row.room_type.type, row.night.day): row.booked for row in RoomNightInventory.objects.filter(booked__gt=0).select_related("room_type")}
+
+    def test_create_bulk_inserts_bedrooms(self):
+        serializer = ReservationSerializer(data=self.data([(self.single, 1), (self.double, 2)]))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # SAVEPOINT, reserva, habitaciones y RELEASE
+        with self.assertNumQueries(4):
+            reservation = serializer.save()
+        self.assertEqual(reservation.bedrooms.count(), 2)
+
+    def test_rejects_empty_stays_and_other_hotels_rooms(self):
+        serializer = ReservationSerializer(data=self.data([(self.single, 1)], checkout="2030-04-01"))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("checkin", serializer.errors)
+
+        other = create_hotel(self.hotel.hotelier, name="Otro", city="Tulum")
+        foreign = RoomType.objects.create(hotel=other, type="Sencilla", capacity=2, price=Decimal("100.00"), rooms=3)
+        serializer = ReservationSerializer(data=self.data([(self.single, 1), (foreign, 1)]))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("bedrooms", serializer.errors)
+
+        # Una actualización parcial se revisa contra lo guardado
+        serializer = ReservationSerializer(data=self.data([(self.single, 1)]))
+        serializer.is_valid(raise_exception=True)
+        reservation = serializer.save()
+        self.assertFalse(ReservationSerializer(reservation, data={"checkout": "2030-03-30"}, partial=True).is_valid())
+        self.assertFalse(ReservationSerializer(reservation, data={"hotel": other.id}, partial=True).is_valid())
+        self.assertFalse(RoomNightInventory.objects.filter(booked__gt=0).exists())
+
+    def test_update_diffs_bedrooms_and_adjusts_inventory(self):
+        serializer = ReservationSerializer(data=self.data([(self.single, 1), (self.double, 2)]))
+        serializer.is_valid(raise_exception=True)
+        reservation = serializer.save()
+        confirm_reservation(reservation.id)
+        double = reservation.bedrooms.get(room_type=self.double)
+
+        serializer = ReservationSerializer(
+            reservation, data=self.data([(self.double, 3), (self.suite, 1)], checkout="2030-04-02"), partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(dict(reservation.bedrooms.values_list("room_type__type", "rooms")), {"Doble": 3, "Suite": 1})
+        self.assertEqual(reservation.bedrooms.get(room_type=self.double).pk, double.pk)
+        self.assertEqual(self.booked(), {("Doble", 1): 3, ("Suite", 1): 1})
+
+        serializer = ReservationSerializer(reservation, data={"bedrooms": [{"room_type": self.double.id, "rooms": 4}]}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(ValidationError):
+            serializer.save()
+
+
+class RoomAvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = create_hotel(create_hotelier())
+        cls.room_type = RoomType.objects.create(hotel=cls.hotel, type="Doble", capacity=2, price=Decimal("100.00"), rooms=5)
+        cls.customer = create_customer()
+        reservation = Reservation.objects.create(
+            hotel=cls.hotel, customer=cls.customer, name="Cliente", email="customer@example.com",
+            phone="9981234567", checkin=date(2030, 4, 2), checkout=date(2030, 4, 4),
+        )
+        RoomReservation.objects.create(customer_reservation=reservation, room_type=cls.room_type, rooms=2)
+        confirm_reservation(reservation.id)
+
+    def setUp(self):
+        cache.clear()
+
+    def rooms_available(self, checkin, checkout) -> int:
+        return RoomType.objects.with_rooms_available(checkin, checkout).get(pk=self.room_type.pk).rooms_available
+
+    def test_overlapping_stays_are_counted(self):
+        # Estancia que contiene la reserva, contenida en ella y que la cruza por cada extremo
+        self.assertEqual(self.rooms_available(date(2030, 4, 1), date(2030, 4, 6)), 3)
+        self.assertEqual(self.rooms_available(date(2030, 4, 3), date(2030, 4, 4)), 3)
+        self.assertEqual(self.rooms_available(date(2030, 4, 1), date(2030, 4, 3)), 3)
+        self.assertEqual(self.rooms_available(date(2030, 4, 3), date(2030, 4, 5)), 3)
+        # La noche de salida queda libre, igual que la anterior a la llegada
+        self.assertEqual(self.rooms_available(date(2030, 4, 4), date(2030, 4, 6)), 5)
+        self.assertEqual(self.rooms_available(date(2030, 3, 30), date(2030, 4, 2)), 5)
+
+    def test_lines_of_the_same_room_type_are_added_up(self):
+        def book(*rooms):
+            return create_reservation(str(self.customer.pk), {
+                "hotel": str(self.hotel.id), "name": "Cliente", "email": "customer@example.com", "phone": "9981234567",
+                "checkin": "2030-04-01", "checkout": "2030-04-03",
+                "bedrooms": [{"room_type": str(self.room_type.id), "rooms": count} for count in rooms],
+            })[0]
+
+        self.assertFalse(book(2, 2))
+        self.assertTrue(book(1, 2))
+        self.assertEqual(self.rooms_available(date(2030, 4, 2), date(2030, 4, 3)), 0)
+
+        response = self.client.post("/api/v1/reservations/quote/", {
+            "hotel": str(self.hotel.id), "checkin": "2030-04-01", "checkout": "2030-04-03",
+            "bedrooms": [{"room_type": str(self.room_type.id), "rooms": 2}, {"room_type": str(self.room_type.id), "rooms": 2}],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class RoomInventoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hotel = create_hotel(create_hotelier())
+        cls.customer = create_customer()
+        cls.room_type = RoomType.objects.create(hotel=hotel, type="Doble", capacity=2, price=Decimal("100.00"), rooms=3)
+
+    def reservation(self, checkin, checkout, rooms, status="FA"):
+        reservation = Reservation.objects.create(
+            hotel=self.room_type.hotel, customer=self.customer, name="Cliente", email="customer@example.com",
+            phone="9981234567", checkin=checkin, checkout=checkout,
+        )
+        RoomReservation.objects.create(customer_reservation=reservation, room_type=self.room_type, rooms=rooms)
+        if status != "FA":
+            Reservation.objects.filter(pk=reservation.pk).update(status=status)
+        return reservation
+
+    def booked(self) -> dict:
+        return {row.night.day: row.booked for row in RoomNightInventory.objects.filter(booked__gt=0)}
+
+    def test_reserve_and_release(self):
+        first = self.reservation(date(2030, 4, 1), date(2030, 4, 3), rooms=2)
+        confirm_reservation(first.id)
+        self.assertEqual(self.booked(), {1: 2, 2: 2})
+
+        # La noche del 2 ya no tiene dos habitaciones libres: no se toca ninguna noche
+        second = self.reservation(date(2030, 4, 2), date(2030, 4, 4), rooms=2)
+        with self.assertRaises(RoomsNotAvailable):
+            confirm_reservation(second.id)
+        self.assertEqual(self.booked(), {1: 2, 2: 2})
+        second.refresh_from_db()
+        self.assertEqual(second.status, "FA")
+
+        change_reservation_status(first.id, "CA")
+        self.assertEqual(self.booked(), {})
+        confirm_reservation(second.id)
+        self.assertEqual(self.booked(), {2: 2, 3: 2})
+
+    def test_rebuild_and_backfill(self):
+        self.reservation(date(2030, 4, 1), date(2030, 4, 3), rooms=2, status="RE")
+        self.reservation(date(2030, 4, 2), date(2030, 4, 4), rooms=1, status="RE")
+        self.reservation(date(2030, 4, 2), date(2030, 4, 4), rooms=3, status="CA")
+        expected = {1: 2, 2: 3, 3: 1}
+
+        self.assertEqual(len(verify_inventory(date(2030, 1, 1))), 3)
+        self.assertEqual(rebuild_inventory(date(2030, 1, 1)), 3)
+        self.assertEqual(self.booked(), expected)
+        self.assertEqual(verify_inventory(date(2030, 1, 1)), [])
+
+        # La migración llena el inventario de las reservas que ya existían al desplegar
+        RoomNightInventory.objects.all().delete()
+        migration = importlib.import_module("payments.migrations.0006_backfill_room_night_inventory")
+        migration.backfill_room_night_inventory(django_apps, None)
+        self.assertEqual(self.booked(), expected)
+
+
+class ReservationExpiryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel, cls.room_type, cls.customer = create_fixtures(rooms=10)
+        today = timezone.localdate()
+        cls.reservations = {}
+        for name, status, checkout in [
+            *[(f"past-{index}", "RE", today - timedelta(days=index + 1)) for index in range(5)],
+            ("today", "RE", today), ("future", "RE", today + timedelta(days=2)),
+            ("cancelled", "CA", today - timedelta(days=3)), ("pending", "PE", today - timedelta(days=3)),
+        ]:
+            cls.reservations[name] = Reservation.objects.create(
+                hotel=cls.hotel, customer=cls.customer, name=name, email="customer@example.com", phone="9981234567",
+                checkin=checkout - timedelta(days=2), checkout=checkout,
+            )
+            Reservation.objects.filter(pk=cls.reservations[name].pk).update(status=status)
+        RoomNightInventory.objects.bulk_create([
+            RoomNightInventory(room_type=cls.room_type, night=today + timedelta(days=offset), booked=1) for offset in range(-4, 2)
+        ])
+
+    def statuses(self) -> dict:
+        return dict(Reservation.objects.values_list("name", "status"))
+
+    def test_expires_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            stats = verify_expiration_reservations(chunk_size=2)
+
+        self.assertEqual((stats["expired"], stats["inventory_pruned"]), (5, 4))
+        self.assertGreaterEqual(stats["elapsed"], 0)
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "payments_reservation"')]
+        self.assertEqual(len(updates), 3)
+
+        statuses = self.statuses()
+        self.assertEqual({statuses[f"past-{index}"] for index in range(5)}, {"EX"})
+        self.assertEqual(
+            (statuses["today"], statuses["future"], statuses["cancelled"], statuses["pending"]), ("RE", "RE", "CA", "PE"),
+        )
+        self.assertEqual(
+            sorted(RoomNightInventory.objects.values_list("night", flat=True)),
+            [timezone.localdate(), timezone.localdate() + timedelta(days=1)],
+        )
+
+    def test_second_run_is_a_no_op(self):
+        verify_expiration_reservations()
+        statuses = self.statuses()
+        stats = verify_expiration_reservations()
+        self.assertEqual((stats["expired"], stats["inventory_pruned"]), (0, 0))
+        self.assertEqual(self.statuses(), statuses)
+
+
+class ReservationConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel, cls.room_type, cls.customer = create_fixtures(rooms=10)
+        cls.reservation = Reservation.objects.create(
+            hotel=cls.hotel, customer=cls.customer, name="Cliente", email="customer@example.com", phone="9981234567",
+            checkin=date(2030, 4, 1), checkout=date(2030, 4, 3),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer.user)
+
+    def test_nested_hotel_change(self):
+        url = "/api/v1/reservations/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.hotel.name = "Otro nombre"
+        self.hotel.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Otro nombre", response.content.decode())
+
+    def test_missing_reservation(self):
+        url = f"/api/v1/reservations/{self.reservation.id}/"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservation.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+class RoomHoldTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel, cls.room_type, cls.customer = create_fixtures(rooms=3)
+        cls.customer_stripe = stripe.Customer.construct_from({"id": str(cls.customer.pk), "object": "customer"}, "sk_test")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer.user)
+
+    def pay(self, rooms: int, **intent):
+        data = {
+            "hotel": str(self.hotel.id), "name": "Cliente", "email": "customer@example.com", "phone": "9981234567",
+            "checkin": "2030-04-01", "checkout": "2030-04-03", "bedrooms": [{"room_type": str(self.room_type.id), "rooms": rooms}],
+        }
+        create_intent = mock.Mock(**intent) if intent else mock.Mock(return_value=mock.Mock(client_secret="pi_secret"))
+        with mock.patch("payments.views.get_or_create_customer", return_value=(self.customer_stripe, False)), \
+                mock.patch("stripe.PaymentIntent.create", create_intent), \
+                mock.patch("payments.views.ReservationViewSet._ReservationViewSet__get_the_hotelier_is_connected_account", return_value="acct_1"):
+            response = self.client.post("/api/v1/reservations/new_card/", data, format="json")
+        return response, create_intent
+
+    def booked(self) -> list:
+        return list(RoomNightInventory.objects.order_by("night").values_list("booked", flat=True))
+
+    def test_rooms_held_before_the_payment_intent(self):
+        response, create_intent = self.pay(2)
+        self.assertEqual(response.status_code, 200, response.data)
+        reservation = Reservation.objects.get()
+        self.assertEqual(reservation.status, "PE")
+        self.assertIsNotNone(reservation.hold_expires_at)
+        self.assertEqual(self.booked(), [2, 2])
+
+        # Sin cupo se rechaza sin crear el intento de pago
+        response, create_intent = self.pay(2)
+        self.assertEqual(response.status_code, 400)
+        create_intent.assert_not_called()
+        self.assertEqual(Reservation.objects.count(), 1)
+
+        # El pago confirma la reserva sin volver a consumir el inventario
+        confirm_reservation(reservation.id, payment_intent="pi_1")
+        reservation.refresh_from_db()
+        self.assertEqual((reservation.status, reservation.hold_expires_at), ("RE", None))
+        self.assertEqual(self.booked(), [2, 2])
+
+    def test_hold_released_when_the_payment_intent_fails(self):
+        response, _ = self.pay(3, side_effect=stripe.error.APIConnectionError("Stripe is down"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Reservation.objects.get().status, "FA")
+        self.assertEqual(self.booked(), [0, 0])
+
+    def test_expired_holds_released(self):
+        self.pay(2)
+        self.pay(1)
+        expired, active = Reservation.objects.order_by("create_at")
+        confirm_reservation(active.id, payment_intent="pi_1")
+        Reservation.objects.update(hold_expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(release_expired_holds(chunk_size=1)["released"], 1)
+        self.assertEqual(self.booked(), [1, 1])
+        expired.refresh_from_db()
+        active.refresh_from_db()
+        self.assertEqual((expired.status, active.status), ("FA", "RE"))
+        self.assertEqual(release_expired_holds()["released"], 0)
+
+        # El pago de un apartado ya liberado vuelve a tomar las habitaciones si siguen libres
+        confirm_reservation(expired.id, payment_intent="pi_2")
+        self.assertEqual(self.booked(), [3, 3])
+
+
+@override_settings(RESERVATION_RETRY_ATTEMPTS=50)
+class ConcurrentBookingTests(TransactionTestCase):
+
+    def test_no_oversold_nights_and_no_refunds(self):
+        _, room_type, customer = create_fixtures(rooms=10)
+        result = run_bookings(room_type, customer, bookings=40, threads=8, nights=2, max_rooms_per_booking=1, seed=1)
+
+        self.assertEqual(result["oversold"], {})
+        self.assertEqual(result["ledger_drift"], {})
+        self.assertEqual(result["outcomes"]["refunded"], 0)
+        self.assertEqual(result["outcomes"]["contention_exhausted"], 0)
+        self.assertEqual((result["outcomes"]["confirmed"], result["outcomes"]["rejected"]), (10, 30))
+        self.assertEqual(set(result["booked"].values()), {10})
+        self.assertEqual(Reservation.objects.filter(status="RE").count(), 10)
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from django.conf import settings
 from django.utils import timezone
 from rest_framework import viewsets, status, permissions
@@ -5,14 +6,19 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from authentication.models import get_or_create_customer, get_or_create_connect_account
-from Hotel.models import RoomType, Hotel
-from Hotel.views import IsHotelier
+from authentication.stripe_cache import list_payment_methods, retrieve_payment_method, invalidate_payment_methods
+from Hotel.models import Hotel
+from Hotel.views import IsHotelier, ConditionalGetMixin, conditional_get
 from .models import *
 from .serializers import *
-import stripe
+from .booking import create_reservation, create_reservation_from_quote
+from .inventory import release_hold
+from .events import store_event
+from .pricing import price_reservation
+from .quotes import save_quote
+import logging, stripe
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-stripe_webhook_secret = settings.STRIPE_WEBHOOK_SECRET
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -34,12 +40,12 @@ class CardsViewSet(viewsets.ViewSet):
         customer, create = get_or_create_customer(request.user)
         if not create:
             try:
-                payment_methods = customer.list_payment_methods()
+                payment_methods = list_payment_methods(customer)
             except Exception as err:
                 return Response({"detail": str(err)}, status=status.HTTP_400_BAD_REQUEST)
             else:
                 if payment_methods.data:
-                    return Response(payment_methods, status=status.HTTP_200_OK)
+                    return Response(payment_methods.to_dict(), status=status.HTTP_200_OK)
 
         return Response({"detail": "No card found associated with this customer"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -48,13 +54,13 @@ class CardsViewSet(viewsets.ViewSet):
         detail = "No card found associated with this customer"
         if not create:
             try:
-                payment_method = customer.retrieve_payment_method(pk)
+                payment_method = retrieve_payment_method(customer, pk)
             except stripe.error.InvalidRequestError as ire:
                 detail = str(ire)
             except Exception as err:
                 return Response({"detail": str(err)}, status=status.HTTP_400_BAD_REQUEST)
             else:
-                return Response(payment_method, status=status.HTTP_200_OK)
+                return Response(payment_method.to_dict(), status=status.HTTP_200_OK)
 
         return Response({"detail": detail}, status=status.HTTP_404_NOT_FOUND)
 
@@ -73,11 +79,12 @@ class CardsViewSet(viewsets.ViewSet):
     def destroy(self, request, pk):
         try:
             customer, _ = get_or_create_customer(request.user)
-            customer.retrieve_payment_method(pk)
+            retrieve_payment_method(customer, pk)
         except Exception:
             return Response({"detail": "sw"}, status=status.HTTP_404_NOT_FOUND)
         else:
             stripe.PaymentMethod.detach(pk)
+            invalidate_payment_methods(customer.id)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -86,9 +93,9 @@ class ReservationViewSet(viewsets.ViewSet):
     permission_classes = (IsCustomer,)
 
     @staticmethod
-    def __create(customer_id: str, data: dict) -> tuple[bool, dict]:
+    def __create(customer_id: str, data: dict) -> tuple[bool, dict, dict]:
         """
-        created: bool, data: serializer.data | serializer.errors = create(data)\n
+        created: bool, data: serializer.data | serializer.errors, price: dict | None = create(data)\n
         customer_id => "4bffd9df-3afe-4692-ab0a-559556dc5e27"\n
         data => {
             "hotel": "812e5a62-5a4f-46b6-817d-72a9d73a41ed",
@@ -101,54 +108,26 @@ class ReservationViewSet(viewsets.ViewSet):
                 {"room_type": "3daae506-e87b-473d-a639-b762b01d0a08", "rooms": 3},
                 {"room_type": "cbc9ed75-5a98-4485-920a-359e56a2a2cd", "rooms": 1},
             ],
-        }
+        }\n
+        price => ver `pricing.price_reservation`; `price["amount"]` y `price["fee_amount"]` están en centavos\n
+        Con `quote_token` (ver `QuoteViewSet`) basta con `name`, `email` y `phone`.
         """
-        def validate_customer_rooms(bedrooms: dict, checkin: str, checkout: str):
-            for room in bedrooms:
-                rooms_available = room["room_type"].get_rooms_available(checkin, checkout)
-                if rooms_available["rooms_available"] < room["rooms"]:
-                    return False, {"detail": f"The room type `{rooms_available['type']}` does not have enough rooms."}
-            return (True,)
-
-        data["customer"] = customer_id
-        serializer = ReservationSerializer(data=data)
-        if serializer.is_valid():
-            validate_customer_rooms_ = validate_customer_rooms(
-                bedrooms=serializer.validated_data["bedrooms"],
-                checkin=serializer.validated_data["checkin"],
-                checkout=serializer.validated_data["checkout"],
-            )
-            if not validate_customer_rooms_[0]:
-                return False, validate_customer_rooms_[1]
-            serializer.save()
-            return True, serializer.data
-        else:
-            return False, serializer.errors
+        if "quote_token" in data:
+            return create_reservation_from_quote(customer_id, data)
+        return create_reservation(customer_id, data)
 
     @staticmethod
-    def __get_payment_amount(data: dict) -> tuple[int, int]:
+    @contextmanager
+    def __release_hold_on_error(reservation_id):
         """
-        Returns the price in cents and the amount of the fee\n
-        amount: int, fee_amount: int = __get_payment_amount(data)\n
-        data => {
-            "checkin": "2024-04-01",
-            "checkout": "2024-04-03",
-            "bedrooms": [
-                {"room_type": "3daae506-e87b-473d-a639-b762b01d0a08", "rooms": 3},
-                {"room_type": "cbc9ed75-5a98-4485-920a-359e56a2a2cd", "rooms": 1},
-            ],
-        }
+        Si no se pudo crear el intento de pago no habrá cobro: las habitaciones apartadas se liberan
+        de inmediato en lugar de esperar a que venza el apartado.
         """
-        bedrooms = data.get("bedrooms")
-        price = sum([RoomType.objects.get(id=i['room_type']).price * i['rooms'] for i in bedrooms])
-        listdate1 = data.get("checkin").split("-")
-        listdate2 = data.get("checkout").split("-")
-        date1 = timezone.datetime(int(listdate1[0]), int(listdate1[1]), int(listdate1[2]))
-        date2 = timezone.datetime(int(listdate2[0]), int(listdate2[1]), int(listdate2[2]))
-        days = (date2 - date1).days
-        amount = int(price * days * 100)
-        fee_amount = int(amount * settings.APPLICATION_FEE_AMOUNT)
-        return amount, fee_amount
+        try:
+            yield
+        except Exception:
+            release_hold(reservation_id)
+            raise
 
     @staticmethod
     def __get_the_hotelier_is_connected_account(hotel_id):
@@ -184,26 +163,26 @@ class ReservationViewSet(viewsets.ViewSet):
         try:
             customer, _ = get_or_create_customer(request.user)
 
-            create, data = self.__create(customer.id, request.data)
+            create, data, price = self.__create(customer.id, request.data)
             if not create:
                 return Response(data, status=status.HTTP_400_BAD_REQUEST)
 
-            amount, fee_amount = self.__get_payment_amount(data)
-            hotelier_account = self.__get_the_hotelier_is_connected_account(data.get("hotel"))
-
-            intent = stripe.PaymentIntent.create(
-                customer=customer.id,
-                setup_future_usage=settings.PAYMENT_INTENT_SETUP_FUTURE_USED,
-                amount=amount,
-                currency=settings.CURRENCY_CODE,
-                metadata={"order_id": data.get("id")},
-                receipt_email=data.get("email"),
-                description=f"Reservation {data.get('id')}",
-                #statement_descriptor=settings.STATEMENT_DESCRIPTOR,
-                #statement_descriptor_suffix=settings.STATEMENT_DESCRIPTRIPTOR_SUFFIX,
-                transfer_data={'destination': hotelier_account},
-                application_fee_amount=fee_amount,
-            )
+            with self.__release_hold_on_error(data.get("id")):
+                hotelier_account = self.__get_the_hotelier_is_connected_account(data.get("hotel"))
+
+                intent = stripe.PaymentIntent.create(
+                    customer=customer.id,
+                    setup_future_usage=settings.PAYMENT_INTENT_SETUP_FUTURE_USED,
+                    amount=price["amount"],
+                    currency=settings.CURRENCY_CODE,
+                    metadata={"order_id": data.get("id")},
+                    receipt_email=data.get("email"),
+                    description=f"Reservation {data.get('id')}",
+                    #statement_descriptor=settings.STATEMENT_DESCRIPTOR,
+                    #statement_descriptor_suffix=settings.STATEMENT_DESCRIPTRIPTOR_SUFFIX,
+                    transfer_data={'destination': hotelier_account},
+                    application_fee_amount=price["fee_amount"],
+                )
         except Exception as err:
             return Response({"detail": str(err)}, status=status.HTTP_400_BAD_REQUEST)
         else:
@@ -213,29 +192,29 @@ class ReservationViewSet(viewsets.ViewSet):
         try:
             customer, _ = get_or_create_customer(request.user)
 
-            payment_method = customer.retrieve_payment_method(request.data.pop("payment_method_id"))
-            create, data = self.__create(customer.id, request.data)
+            payment_method = retrieve_payment_method(customer, request.data.pop("payment_method_id"))
+            create, data, price = self.__create(customer.id, request.data)
             if not create:
                 return Response(data, status=status.HTTP_400_BAD_REQUEST)
 
-            amount, fee_amount = self.__get_payment_amount(data)
-            hotelier_account = self.__get_the_hotelier_is_connected_account(data.get("hotel"))
-
-            intent = stripe.PaymentIntent.create(
-                customer=customer.id,
-                amount=amount,
-                currency=settings.CURRENCY_CODE,
-                payment_method=payment_method.id,
-                metadata={"order_id": data.get("id")},
-                receipt_email=data.get("email"),
-                description=f"Reservation {data.get('id')}",
-                #statement_descriptor=settings.STATEMENT_DESCRIPTOR,
-                #statement_descriptor_suffix=settings.STATEMENT_DESCRIPTRIPTOR_SUFFIX,
-                confirm=True,
-                off_session=True,
-                transfer_data={'destination': hotelier_account},
-                application_fee_amount=fee_amount,
-            )
+            with self.__release_hold_on_error(data.get("id")):
+                hotelier_account = self.__get_the_hotelier_is_connected_account(data.get("hotel"))
+
+                intent = stripe.PaymentIntent.create(
+                    customer=customer.id,
+                    amount=price["amount"],
+                    currency=settings.CURRENCY_CODE,
+                    payment_method=payment_method.id,
+                    metadata={"order_id": data.get("id")},
+                    receipt_email=data.get("email"),
+                    description=f"Reservation {data.get('id')}",
+                    #statement_descriptor=settings.STATEMENT_DESCRIPTOR,
+                    #statement_descriptor_suffix=settings.STATEMENT_DESCRIPTRIPTOR_SUFFIX,
+                    confirm=True,
+                    off_session=True,
+                    transfer_data={'destination': hotelier_account},
+                    application_fee_amount=price["fee_amount"],
+                )
         except stripe.error.CardError as ce:
             return Response({"detail": str(ce)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as err:
@@ -244,7 +223,37 @@ class ReservationViewSet(viewsets.ViewSet):
             return Response({"clientSecret": intent.client_secret})
 
 
-class ReservationReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+class QuoteViewSet(viewsets.ViewSet):
+
+    def quote(self, request, *args, **kwargs):
+        """
+        Precio desglosado de una reserva sin crearla y un `quote_token` para pagarla con ese precio
+        mientras no caduque (`expires_at`).\n
+        data => {
+            "hotel": "812e5a62-5a4f-46b6-817d-72a9d73a41ed",
+            "checkin": "2024-04-01",
+            "checkout": "2024-04-03",
+            "bedrooms": [{"room_type": "3daae506-e87b-473d-a639-b762b01d0a08", "rooms": 3}],
+        }
+        """
+        serializer = QuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        quote = data["quote"]
+        if quote is None:
+            price = price_reservation(data["checkin"], data["checkout"], data["bedrooms"])
+            quote = save_quote(data["quote_id"], data, price)
+
+        return Response({
+            **PriceSerializer(quote["price"]).data,
+            "quote_token": quote["token"],
+            "expires_at": quote["expires_at"],
+        }, status=status.HTTP_200_OK)
+
+
+class ReservationReadOnlyViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationReadOnlySerializer
     permission_classes = (IsCustomer, IsHotelier)
@@ -257,6 +266,10 @@ class ReservationReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
         "status": ["exact"]
     }
 
+    # El hotel anidado también forma parte de la respuesta; al borrarse un hotel sus reservas quedan sin él
+    conditional_timestamps = ("updated_at", "hotel__updated_at")
+    conditional_markers = ("reservations", "hotels")
+
     def get_queryset(self):
         if self.request.user.is_hotelier:
             hotels = Hotel.objects.filter(hotelier=self.request.user.id)
@@ -264,6 +277,7 @@ class ReservationReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
         else:
             return Reservation.objects.filter(customer=self.request.user.id)
 
+    @conditional_get
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
@@ -274,6 +288,7 @@ class ReservationReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
 
         return Response(serializer.data)
     
+    @conditional_get
     def retrieve(self, request, pk, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         queryset = queryset.filter(id=pk)
@@ -284,55 +299,26 @@ class ReservationReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
 
 class PaymentEventViewSet(viewsets.ViewSet):
 
-    @staticmethod
-    def __comfirm_payment(payment_intent: stripe.PaymentIntent) -> None:
-        metadata = payment_intent.metadata
-        order_id = metadata.get("order_id")
-        reservation = Reservation.objects.get(id=order_id)
-        reservation.payment_intent = payment_intent.id
-        reservation.amount = payment_intent.amount / 100
-        reservation.status = "RE"
-        reservation.save()
-
     def handle_payment_event(self, request, *args, **kwargs):
-        event = None
-        payload = request.body
-        sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
-
+        """
+        Verifica la firma, guarda el evento y responde de inmediato; el procesamiento lo hace
+        `manage.py process_stripe_events` (ver `payments.events`).
+        """
         try:
             event = stripe.Webhook.construct_event(
-                payload=payload,
-                sig_header=sig_header,
-                secret=stripe_webhook_secret
+                payload=request.body,
+                sig_header=request.META.get("HTTP_STRIPE_SIGNATURE"),
+                secret=settings.STRIPE_WEBHOOK_SECRET
             )
-        except ValueError as err:
-            print(err)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        except stripe.error.SignatureVerificationError as err:
-            print(err)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-
-        if event.type == "payment_intent.succeeded":
-            self.__comfirm_payment(event.data.object)
-
-        elif event.type == "payment_intent.requires_action":
-            pass
-        elif event.type == "payment_intent.partially_funded":
-            pass
-        elif event.type.startswith("setup_intent"):
-            print(event.type)
-            setup_intent = event.data.object
-            print(setup_intent)
-        elif event.type == "charge.refunded":
-            pass
-        else:
-            print(f"Event not handled: {event.type}")
+        except (ValueError, stripe.error.SignatureVerificationError) as err:
+            logger.warning("Invalid Stripe webhook: %s", err)
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        if not store_event(event):
+            logger.info("Duplicate Stripe event %s (%s)", event.id, event.type)
         return Response(status=status.HTTP_200_OK)
 
 
-
 class AccountLinkGenerationViewSet(viewsets.ViewSet):
     permission_classes = (IsHotelier,)
 
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from tasks.queue import claim, run_task, purge_done
+import os, signal, socket, time
+
+
+class Command(BaseCommand):
+    help = "Runs queued tasks (tasks.Task) with a pool of worker threads until stopped (or until drained with --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None, help="Worker threads. Defaults to TASK_WORKER_CONCURRENCY.")
+        parser.add_argument("--poll-interval", type=float, default=None, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit when there are no due tasks left.")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"] or settings.TASK_WORKER_CONCURRENCY
+        poll_interval = options["poll_interval"] if options["poll_interval"] is not None else settings.TASK_POLL_INTERVAL
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+
+        done = failed = 0
+        last_purge = 0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tasks") as executor:
+            while not self.stopping:
+                tasks = claim(concurrency, worker)
+                if not tasks:
+                    if time.monotonic() - last_purge > 3600:
+                        purge_done()
+                        last_purge = time.monotonic()
+                    if options["once"]:
+                        break
+                    close_old_connections()
+                    time.sleep(poll_interval)
+                    continue
+
+                # Con un solo worker las tareas corren en este hilo
+                results = executor.map(self.run, tasks) if concurrency > 1 else map(self.run, tasks)
+                for ok in results:
+                    done += ok
+                    failed += not ok
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} stopped: {done} tasks done, {failed} failed."))
+
+    @staticmethod
+    def run(task) -> bool:
+        try:
+            return run_task(task)
+        finally:
+            close_old_connections()
+
+    def stop(self, signum, frame):
+        # Termina el lote en curso y sale
+        self.stopping = True
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tarea')),
+                ('payload', models.JSONField(default=dict, verbose_name='Argumentos')),
+                ('status', models.CharField(choices=[('PE', 'Pending'), ('RU', 'Running'), ('DO', 'Done'), ('DE', 'Dead')], default='PE', max_length=2)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('max_attempts', models.PositiveSmallIntegerField(verbose_name='Máximo de intentos')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar a partir de')),
+                ('locked_by', models.CharField(blank=True, max_length=50, null=True, verbose_name='Tomada por')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Tomada hasta')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('create_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado el')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Actualizado el')),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'indexes': [models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+# Create your models here.
+class Task(models.Model):
+    """
+    Tarea pendiente de la cola (outbox). Se inserta en la misma transacción que el cambio que la
+    origina, así que solo existe si ese cambio se confirmó; `manage.py run_tasks` la ejecuta.
+    """
+    TASK_STATUS = (
+        ('PE', _('Pending')),
+        ('RU', _('Running')),
+        ('DO', _('Done')),
+        ('DE', _('Dead')),
+    )
+
+    name = models.CharField(max_length=100, verbose_name="Tarea")
+    payload = models.JSONField(default=dict, verbose_name="Argumentos")
+    status = models.CharField(max_length=2, choices=TASK_STATUS, default='PE')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    max_attempts = models.PositiveSmallIntegerField(verbose_name="Máximo de intentos")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Ejecutar a partir de")
+    locked_by = models.CharField(max_length=50, null=True, blank=True, verbose_name="Tomada por")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Tomada hasta")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+    create_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado el")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        indexes = [
+            # Tareas vencidas por tomar (`queue.claim`) y tareas terminadas por purgar (`queue.purge_done`)
+            models.Index(fields=["status", "run_at"], name="task_status_run_at_idx"),
+            models.Index(fields=["status", "updated_at"], name="task_status_updated_idx"),
+        ]
+
+    def __str__(self):
+        return f'{self.name} | {self.status} | {self.attempts}/{self.max_attempts}'
@@ -0,0 +1,100 @@
+"""
+Cola de tareas respaldada por la base de datos.
+
+    @task("authentication.send_password_reset")
+    def send_password_reset(email, token): ...
+
+    send_password_reset.delay(email="user@email.com", token="...")
+
+`delay` solo inserta una fila en `Task` dentro de la transacción actual. Los workers
+(`manage.py run_tasks`) toman lotes de tareas con una actualización condicional, que funciona igual
+en SQLite y en PostgreSQL sin bloquear filas: cada tarea la toma un solo worker durante
+`TASK_LEASE_SECONDS`; si el worker muere, otra la retoma al vencer ese plazo. Una tarea que falla
+se reintenta con backoff exponencial y después de `max_attempts` queda como `DE` (dead letter).
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Task
+import logging, random, traceback, uuid
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name: str, max_attempts: int = None):
+    def decorator(func):
+        registry[name] = func
+        func.task_name = name
+        func.delay = lambda run_at=None, **payload: enqueue(name, payload, run_at=run_at, max_attempts=max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name: str, payload: dict, run_at=None, max_attempts: int = None) -> Task:
+    if name not in registry:
+        raise KeyError(f"Unknown task `{name}`")
+    return Task.objects.create(
+        name=name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def claim(limit: int, worker: str = None) -> list[Task]:
+    """
+    Toma hasta `limit` tareas vencidas (pendientes o con la concesión expirada), las más antiguas primero.
+    """
+    now = timezone.now()
+    token = f"{worker or 'worker'}:{uuid.uuid4().hex[:12]}"
+    claimable = Q(status="PE") | Q(status="RU", locked_until__lt=now)
+    ids = list(Task.objects.filter(claimable, run_at__lte=now).order_by("run_at", "id").values_list("id", flat=True)[:limit])
+    if not ids:
+        return []
+
+    # Si otro worker tomó alguna entre la lectura y la actualización, la condición la excluye
+    Task.objects.filter(claimable, id__in=ids).update(
+        status="RU", locked_by=token, locked_until=now + timedelta(seconds=settings.TASK_LEASE_SECONDS),
+        attempts=F("attempts") + 1,
+    )
+    return list(Task.objects.filter(locked_by=token, status="RU").order_by("run_at", "id"))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    delay = settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.TASK_RETRY_MAX_DELAY) * random.uniform(0.8, 1.2))
+
+
+def run_task(task: Task) -> bool:
+    """
+    Ejecuta una tarea ya tomada y registra el resultado. Devuelve si terminó bien.
+    """
+    lease = Task.objects.filter(pk=task.pk, locked_by=task.locked_by)
+    try:
+        registry[task.name](**task.payload)
+    except Exception as error:
+        dead = task.attempts >= task.max_attempts
+        logger.log(
+            logging.ERROR if dead else logging.WARNING,
+            "Task %s %s failed (attempt %s/%s): %s", task.pk, task.name, task.attempts, task.max_attempts, error,
+        )
+        lease.update(
+            status="DE" if dead else "PE",
+            run_at=timezone.now() + retry_delay(task.attempts),
+            locked_by=None, locked_until=None,
+            last_error="".join(traceback.format_exception(error))[-4000:],
+            updated_at=timezone.now(),
+        )
+        return False
+
+    lease.update(status="DO", locked_by=None, locked_until=None, updated_at=timezone.now())
+    return True
+
+
+def purge_done(older_than: timedelta = None) -> int:
+    cutoff = timezone.now() - (older_than or settings.TASK_DONE_RETENTION)
+    deleted, _ = Task.objects.filter(status="DO", updated_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .models import Task
+from .queue import task, claim, enqueue
+
+calls = []
+
+
+@task("tests.record")
+def record(value, fail_times=0):
+    calls.append(value)
+    if calls.count(value) <= fail_times:
+        raise RuntimeError(f"failure {value}")
+
+
+# Create your tests here.
+@override_settings(TASK_RETRY_BACKOFF=0, TASK_RETRY_MAX_DELAY=0)
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        call_command("run_tasks", "--once", "--concurrency", "1", stdout=StringIO())
+
+    def test_task_runs_once(self):
+        queued = record.delay(value="a")
+        self.assertEqual((queued.status, queued.payload), ("PE", {"value": "a"}))
+        self.run_worker()
+        self.run_worker()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, calls), ("DO", 1, ["a"]))
+
+    def test_failed_task_is_retried_then_dead_lettered(self):
+        retried = record.delay(value="retried", fail_times=1)
+        dead = enqueue("tests.record", {"value": "dead", "fail_times": 5}, max_attempts=3)
+        for _ in range(3):
+            self.run_worker()
+
+        retried.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), ("DO", 2))
+        self.assertEqual((dead.status, dead.attempts), ("DE", 3))
+        self.assertIn("failure dead", dead.last_error)
+
+    def test_claim_skips_future_and_leased_tasks(self):
+        record.delay(value="later", run_at=timezone.now() + timedelta(hours=1))
+        leased = record.delay(value="leased")
+        self.assertEqual([t.pk for t in claim(10, "first")], [leased.pk])
+        self.assertEqual(claim(10, "second"), [])
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.missing", {})